@@ -1,36 +1,45 @@
 # app/analysis/advanced_analysis.py
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from sklearn.cluster import KMeans
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import r2_score
 
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
-from analysis.data_loader import load_recovery_data, load_calendar_data
-from feature_engineering.data_wrangler import load_advanced_capability_recovery_data
+from analysis.clustering import assign_clusters, cluster_models, update_clusters
+from analysis.correlation import filtered_correlations
+from analysis.data_store import get_data_store
+from analysis.importance import FAST_TIME_BUDGET, bootstrap_importances, feature_importances
+from analysis.regression import linear_stats, solve
+from feature_engineering.matchday import matchday_offsets
 
 
 def run_regression(gps_df):
     """
     Example: Predict peak_speed from distance, distance_over_24, accel_decel_over_2_5
     """
-    df = gps_df.dropna(subset=["peak_speed", "distance", "distance_over_24", "accel_decel_over_2_5"])
-    X = df[["distance", "distance_over_24", "accel_decel_over_2_5"]]
-    y = df["peak_speed"]
-    model = LinearRegression().fit(X, y)
-    df["predicted"] = model.predict(X)
-    r2 = r2_score(y, df["predicted"])
-    return df, r2
-
-def cluster_players(gps_df):
+    features = ["distance", "distance_over_24", "accel_decel_over_2_5"]
+    df = gps_df.dropna(subset=["peak_speed"] + features)
+    # Normal equations from sufficient statistics (analysis.regression), no refit per call
+    ((coef, r2),) = solve([linear_stats(df, features, "peak_speed")])
+    df = df.assign(predicted=coef[0, 0] + df[features].to_numpy(dtype=float) @ coef[0, 1:])
+    return df, r2[0]
+
+def cluster_players(gps_df, incremental: bool = False):
     """
     Example: Use KMeans + PCA for clustering by workload metrics
+
+    incremental=True uses the persisted MiniBatchKMeans / IncrementalPCA models of
+    analysis.clustering instead: they are updated with any new GPS sessions
+    (partial_fit) and `gps_df` is only assigned to clusters, not refitted.
     """
+    if incremental:
+        update_clusters()
+        _, kmeans, pca = cluster_models()
+        return assign_clusters(gps_df), kmeans, pca
+
     cluster_data = gps_df[["player", "distance", "distance_over_24", "distance_over_27",
                            "accel_decel_over_2_5", "accel_decel_over_4_5", "peak_speed"]].dropna()
 
@@ -47,29 +56,30 @@ def cluster_players(gps_df):
 
     return cluster_data, kmeans, pca
 
-def compute_recovery_feature_importances():
+def compute_recovery_feature_importances(mode: str = "exact", time_budget: float = FAST_TIME_BUDGET,
+                                         n_resamples: int = 0):
     """
     1) Loads recovery + calendar data
     2) Merges them to identify matchdays
     3) Adds matchday ± 1 indicators
     4) Trains a RandomForest to predict 'emboss_baseline_score'
-    5) Returns a DF of feature importances + correlation matrix
+       (mode="fast": time-budgeted extra-trees, see analysis.importance)
+       n_resamples > 0: refits it on that many bootstrap resamples in the training pool
+       and adds the spread (std) and 95% interval (lower, upper) of each importance
+    5) Returns a DF of feature importances (with the mode that produced them) + the model data
     """
 
     # 1. Load data
-    recovery_df = load_recovery_data()
-    calendar_df = load_calendar_data()  # For instance, 'chelsea_fc_calendar.csv'
+    store = get_data_store()
+    recovery_df = store.get("recovery")
+    calendar_df = store.get("calendar")  # For instance, 'chelsea_fc_calendar.csv'
 
-    # 2. Identify match days in calendar
-    #    We'll assume 'event_type == "Match"' means a matchday
-    match_dates = calendar_df.loc[calendar_df["event_type"] == "Match", "event_date"].unique()
-
-    # 3. Mark MD+1, MD-1 in recovery_df
-    #    We'll assume date is a daily measure
-    #    We do a simple approach: for each date in recovery_df, if date-1 or date+1 is a match date => True
-    recovery_df["md_minus_1"] = recovery_df["date"].isin(match_dates + np.timedelta64(1, 'D'))
-    recovery_df["md_plus_1"]  = recovery_df["date"].isin(match_dates - np.timedelta64(1, 'D'))
-    # Some prefer the opposite sign, check your logic carefully.
+    # 2-3. Mark MD-1 (day before the player's next match) and MD+1 (day after the last)
+    offsets = matchday_offsets(recovery_df, calendar_df)
+    recovery_df = recovery_df.assign(
+        md_minus_1=offsets["md_minus_1"].astype(bool),
+        md_plus_1=offsets["md_plus_1"].astype(bool),
+    )
 
     # 4. Prepare features + target
     #    We'll pick the composite columns + MD indicators as features
@@ -98,21 +108,29 @@ def compute_recovery_feature_importances():
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled  = scaler.transform(X_test)
 
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X_train_scaled, y_train)
-
     # 6. Feature Importances
-    fi = model.feature_importances_
     feature_names = X.columns.tolist()
-    fi_df = pd.DataFrame({
-        "feature": feature_names,
-        "importance": fi
-    }).sort_values("importance", ascending=False).reset_index(drop=True)
+    if n_resamples > 0:
+        interval, source = bootstrap_importances(
+            "advanced.recovery_importances", pd.DataFrame(X_train_scaled, columns=feature_names), y_train,
+            mode=mode, n_resamples=n_resamples
+        )
+        fi_df = interval.rename(columns={"mean": "importance"}).assign(mode=source)
+    else:
+        fi, source = feature_importances(
+            "advanced.recovery_importances", X_train_scaled, y_train, mode=mode, time_budget=time_budget
+        )
+        fi_df = pd.DataFrame({
+            "feature": feature_names,
+            "importance": fi,
+            "mode": source
+        })
+    fi_df = fi_df.sort_values("importance", ascending=False).reset_index(drop=True)
 
     # 7. Return the DF
     return fi_df, df_model
 
-def compute_movement_recovery_correlations() -> pd.DataFrame:
+def compute_movement_recovery_correlations(players=None, date_range=None, by=("movement",)) -> pd.DataFrame:
     """
     Loads the merged capability and recovery dataset,
     and for each movement, computes the Pearson correlation coefficient
@@ -123,37 +141,25 @@ def compute_movement_recovery_correlations() -> pd.DataFrame:
        - Subjective_composite
        - emboss_baseline_score
 
+    `by` may add or swap grouping keys (e.g. ("movement", "player") or ("position",));
+    `players` / `date_range` restrict the rows. All of them are answered from the
+    cached per-(player, date) sufficient statistics in analysis.correlation.
+
     Returns:
         A DataFrame with columns: 'movement', 'Sleep_composite', 'Bio_composite',
         'Msk_joint_range_composite', 'Subjective_composite', 'emboss_baseline_score',
         where each value is the correlation coefficient.
     """
-    # Load merged data using our data wrangler; it returns (merged_df, filepath)
-    merged_df, _ = load_advanced_capability_recovery_data()
-    
-    # Define required columns (if missing, rows will be dropped)
-    required_cols = [
-        "BenchmarkPct", "Sleep_composite", "Bio_composite",
-        "Msk_joint_range_composite", "Subjective_composite", 
-        "emboss_baseline_score", "movement"
-    ]
-    df = merged_df.dropna(subset=required_cols).copy()
-    
     # Define the recovery metrics to be compared with BenchmarkPct.
     recovery_metrics = [
         "Sleep_composite", "Bio_composite", 
         "Msk_joint_range_composite", "Subjective_composite", 
         "emboss_baseline_score"
     ]
-    results = []
-    # Loop through each unique movement
-    for mov in df["movement"].unique():
-        sub_df = df[df["movement"] == mov]
-        corr_dict = {"movement": mov}
-        for metric in recovery_metrics:
-            # Compute the Pearson correlation (returns NaN if insufficient data)
-            corr_value = sub_df["BenchmarkPct"].corr(sub_df[metric])
-            corr_dict[metric] = corr_value
-        results.append(corr_dict)
-    corr_df = pd.DataFrame(results)
-    return corr_df
\ No newline at end of file
+    # Rows missing any of these (or a grouping key) are dropped, as before
+    moments = filtered_correlations(
+        "capability_recovery", recovery_metrics, ["BenchmarkPct"],
+        players=players, date_range=date_range, by=by, dropna=True,
+        attach=[key for key in by if key == "position"],
+    )
+    return moments.to_frame("BenchmarkPct")
@@ -0,0 +1,223 @@
+# app/analysis/artifacts.py
+
+import json
+import os
+import shutil
+import threading
+import time
+import joblib
+import pandas as pd
+
+from analysis.data_loader import DERIVED_DIR, filter_frame
+from analysis.filter_index import filter_index
+from feature_engineering.data_wrangler import key_index
+
+# Results of the offline precompute (analysis/precompute.py), one directory per run.
+# Serve them with VIZATHON_ARTIFACTS=1; pages compute live otherwise.
+ARTIFACT_DIR = os.path.normpath(os.path.join(DERIVED_DIR, "..", "artifacts"))
+CURRENT_PATH = os.path.join(ARTIFACT_DIR, "current.json")
+MANIFEST = "manifest.json"
+# Bump whenever the artifacts a run contains change, so older runs are not served.
+ARTIFACT_FORMAT_VERSION = 1
+# Published runs kept on disk (the current one and the ones before it, for rollback)
+ARTIFACT_KEEP = 3
+
+_run = None            # (pointer mtime, ArtifactRun) last handed out
+_run_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return os.environ.get("VIZATHON_ARTIFACTS", "0") == "1"
+
+
+def _write_json(path: str, payload: dict):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# ===================== PUBLISHING =========================
+
+def publish(artifacts: dict, sources: dict, date_keys: dict = None, keep: int = ARTIFACT_KEEP) -> str:
+    """
+    Writes one precompute run and makes it current. DataFrames are stored as Parquet,
+    anything else with joblib. The run is assembled in a staging directory and renamed
+    into place before the pointer (current.json) is swapped, so readers only ever see
+    complete runs. `sources` records the dataset versions the run was computed from,
+    `date_keys` the date column of each frame pages range-filter.
+
+    Returns the run id; all but the newest `keep` runs are removed.
+    """
+    run_id = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + joblib.hash(sources)[:8]
+    staging = os.path.join(ARTIFACT_DIR, f".{run_id}.{os.getpid()}.tmp")
+    os.makedirs(staging, exist_ok=True)
+
+    files = {}
+    for name, value in artifacts.items():
+        if isinstance(value, pd.DataFrame):
+            files[name] = f"{name}.parquet"
+            value.to_parquet(os.path.join(staging, files[name]), index=False)
+        else:
+            files[name] = f"{name}.joblib"
+            joblib.dump(value, os.path.join(staging, files[name]))
+    _write_json(os.path.join(staging, MANIFEST), {
+        "run_id": run_id,
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+        "sources": sources,
+        "date_keys": date_keys or {},
+        "artifacts": files,
+    })
+
+    os.replace(staging, os.path.join(ARTIFACT_DIR, run_id))
+    _write_json(CURRENT_PATH, {"run_id": run_id})
+    _prune(keep, run_id)
+    return run_id
+
+
+def _prune(keep: int, current: str):
+    # Run ids start with their UTC timestamp, so name order is publication order;
+    # staging directories (".<run id>...") belong to runs still being written.
+    runs = sorted(name for name in os.listdir(ARTIFACT_DIR)
+                  if not name.startswith(".") and os.path.isfile(os.path.join(ARTIFACT_DIR, name, MANIFEST)))
+    for name in runs[:max(len(runs) - keep, 0)]:
+        if name != current:
+            shutil.rmtree(os.path.join(ARTIFACT_DIR, name), ignore_errors=True)
+
+
+# ===================== READING =========================
+
+class ArtifactRun:
+    """
+    One published precompute run, read lazily: each artifact is loaded on first use
+    and kept for the lifetime of the run, shared by every session.
+
+    Frames are served with the DataStore's reading interface (`get()`, `version()`,
+    `players()`, `date_bounds()`, `indexed()`), so a page can take either as its data source.
+    """
+
+    def __init__(self, run_dir: str, manifest: dict):
+        self.run_dir = run_dir
+        self.run_id = manifest["run_id"]
+        self.created = manifest["created"]
+        self.sources = manifest["sources"]
+        self._date_keys = manifest["date_keys"]
+        self._files = manifest["artifacts"]
+        self._loaded = {}
+        self._indexes = {}   # frame artifact -> FilterIndex
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._files
+
+    def read(self, name: str):
+        """The artifact `name` as it was computed (a DataFrame or a joblib object)."""
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+            if name not in self._files:
+                raise KeyError(f"Run {self.run_id} has no artifact '{name}'")
+            path = os.path.join(self.run_dir, self._files[name])
+            value = pd.read_parquet(path) if path.endswith(".parquet") else joblib.load(path)
+            self._loaded[name] = value
+            return value
+
+    def get(self, dataset: str, players=None, date_range=None) -> pd.DataFrame:
+        """A frame artifact, optionally restricted to `players` and an inclusive `date_range`."""
+        date_key = self._date_keys.get(dataset, "date")
+        frame = self.filter_index(dataset).take(self.read(dataset), date_key, players, date_range)
+        return frame.copy(deep=False)
+
+    def filter_index(self, dataset: str):
+        """Row positions of a frame artifact by player, date and group (analysis.filter_index)."""
+        index = self._indexes.get(dataset)
+        if index is None:
+            index = filter_index(self.read(dataset), self._date_keys.get(dataset, "date"))
+            self._indexes[dataset] = index
+        return index
+
+    def version(self, dataset: str) -> str:
+        """Version token of a frame artifact, as DataStore.version(): a run never changes."""
+        return f"{self.run_id}:{dataset}"
+
+    def players(self, dataset: str) -> list:
+        """Sorted player names present in a frame artifact."""
+        return self.filter_index(dataset).players
+
+    def date_bounds(self, dataset: str) -> tuple:
+        """(min, max) of the date column a frame artifact is range-filtered on."""
+        return self.filter_index(dataset).date_bounds()
+
+    def indexed(self, dataset: str) -> pd.DataFrame:
+        """A frame artifact keyed on a sorted (player, date) MultiIndex, as DataStore.indexed()."""
+        key = f"{dataset}:indexed"
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+        frame = key_index(self.read(dataset), self._date_keys.get(dataset, "date"))
+        with self._lock:
+            self._loaded[key] = frame
+        return frame
+
+    def importances(self, mode: str = "exact") -> dict:
+        """chart id -> (importances indexed by feature, label) of the precomputed fits."""
+        frame = self.read("importances")
+        frame = frame[frame["mode"] == mode]
+        return {
+            chart_id: (group.set_index("feature")["importance"], group["label"].iloc[0])
+            for chart_id, group in frame.groupby("chart_id", sort=False)
+        }
+
+    def summaries(self) -> dict:
+        """Home page summary name -> Series of values by player, best first."""
+        frame = self.read("summaries")
+        return {
+            name: group.set_index("player")["value"].rename_axis(None)
+            for name, group in frame.groupby("summary", sort=False)
+        }
+
+    def ranking(self, dataset: str, players=None, date_range=None) -> pd.DataFrame:
+        """
+        Per-player mean of the metric ranked for `dataset`, best first, over the selected
+        players and dates: sums of the precomputed per-(player, date) totals.
+        """
+        totals = self.read("rankings")
+        totals = totals[totals["dataset"] == dataset]
+        metric = totals["metric"].iloc[0]
+        totals = filter_frame(totals, "date", players, date_range)
+        sums = totals.groupby("player", observed=True)[["total", "count"]].sum()
+        means = (sums["total"] / sums["count"]).rename(metric)
+        return means.sort_values(ascending=False).reset_index()
+
+
+def current_run():
+    """The run current.json points at, or None if nothing usable was published."""
+    global _run
+    try:
+        mtime = os.stat(CURRENT_PATH).st_mtime_ns
+    except OSError:
+        return None
+    with _run_lock:
+        if _run is not None and _run[0] == mtime:
+            return _run[1]
+        try:
+            with open(CURRENT_PATH, encoding="utf-8") as f:
+                run_dir = os.path.join(ARTIFACT_DIR, json.load(f)["run_id"])
+            with open(os.path.join(run_dir, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return None
+        if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            return None
+        _run = (mtime, ArtifactRun(run_dir, manifest))
+        return _run[1]
+
+
+def serving_run():
+    """
+    The ArtifactRun pages read from in artifact mode (VIZATHON_ARTIFACTS=1): it stands in
+    for the DataStore, so a page's frames and precomputed results all come from the last
+    published precompute run. None to compute live.
+    """
+    return current_run() if is_enabled() else None
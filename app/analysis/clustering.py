@@ -0,0 +1,158 @@
+# app/analysis/clustering.py
+
+import os
+import threading
+import joblib
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+from analysis.data_loader import DERIVED_DIR, persist_best_effort
+from analysis.data_store import get_data_store
+
+CLUSTER_FEATURES = ["distance", "distance_over_24", "distance_over_27",
+                    "accel_decel_over_2_5", "accel_decel_over_4_5", "peak_speed"]
+N_CLUSTERS = 3
+N_COMPONENTS = 2
+# Sessions are fed to partial_fit in date order, this many at a time
+BATCH_SIZE = 1024
+
+CLUSTER_DIR = os.path.join(DERIVED_DIR, "clusters")
+STATE_PATH = os.path.join(CLUSTER_DIR, "state.joblib")
+PROJECTION_PATH = os.path.join(CLUSTER_DIR, "projection.parquet")
+
+PROJECTION_COLUMNS = ["player", "date"] + CLUSTER_FEATURES + ["cluster", "PC1", "PC2"]
+
+_state = None
+_projection = None
+_lock = threading.Lock()
+
+
+def _new_state() -> dict:
+    return {
+        "scaler": StandardScaler(),
+        "kmeans": MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=42, n_init=3),
+        "pca": IncrementalPCA(n_components=N_COMPONENTS),
+        "watermarks": {},      # player -> last session date fed to the models
+        "gps_version": None,   # DataStore version of gps the state is up to date with
+        "pending": None,       # sessions held back until a batch is big enough to fit
+    }
+
+
+def _load_state():
+    global _state, _projection
+    if _state is not None:
+        return
+    try:
+        _state = joblib.load(STATE_PATH)
+        _projection = pd.read_parquet(PROJECTION_PATH)
+        if not set(PROJECTION_COLUMNS) <= set(_projection.columns):
+            raise ValueError("Projection predates the stored features: refit")
+    except Exception:
+        _state, _projection = _new_state(), pd.DataFrame(columns=PROJECTION_COLUMNS)
+
+
+def _save_state():
+    persist_best_effort(STATE_PATH, lambda path: joblib.dump(_state, path))
+    persist_best_effort(PROJECTION_PATH, lambda path: _projection.to_parquet(path, index=False))
+
+
+def _is_fitted() -> bool:
+    return hasattr(_state["kmeans"], "cluster_centers_")
+
+
+def _fit_batch(X):
+    _state["scaler"].partial_fit(X)
+    X_scaled = _state["scaler"].transform(X)
+    _state["kmeans"].partial_fit(X_scaled)
+    _state["pca"].partial_fit(X_scaled)
+
+
+def _assign(sessions: pd.DataFrame) -> pd.DataFrame:
+    # Labels and projection of `sessions` (player, date, features) from the current models
+    X_scaled = _state["scaler"].transform(sessions[CLUSTER_FEATURES].to_numpy(dtype=float))
+    pcs = _state["pca"].transform(X_scaled)
+    return sessions.assign(cluster=_state["kmeans"].predict(X_scaled), PC1=pcs[:, 0], PC2=pcs[:, 1])
+
+
+def assign_clusters(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cluster label and PCA projection of each session in `df` from the current models,
+    without fitting. Returns player, date, the features, cluster, PC1 and PC2.
+    """
+    with _lock:
+        _load_state()
+        if not _is_fitted():
+            raise RuntimeError("No cluster model yet: run update_clusters() first")
+        return _assign(df[["player", "date"] + CLUSTER_FEATURES].dropna())
+
+
+def update_clusters() -> pd.DataFrame:
+    """
+    Brings the incremental cluster models up to date with the GPS dataset: sessions
+    after each player's watermark are fed to the scaler, MiniBatchKMeans and
+    IncrementalPCA via partial_fit, in date order and in batches, and added to the
+    cached projection. Whenever the models move, every stored session is re-assigned
+    from its retained features, so all labels and coordinates come from one model state.
+    Model state and projection are persisted under output/cache/clusters/.
+
+    Returns the cached projection: player, date, the features, cluster, PC1, PC2 per session.
+    """
+    global _projection
+    store = get_data_store()
+    with _lock:
+        _load_state()
+        version = store.version("gps")
+        if _state["gps_version"] == version:
+            return _projection
+
+        gps = store.get("gps")[["player", "date"] + CLUSTER_FEATURES].dropna()
+        marks = pd.to_datetime(gps["player"].astype(object).map(_state["watermarks"]))
+        new = gps[marks.isna() | (gps["date"] > marks)]
+        if _state["pending"] is not None:
+            new = pd.concat([_state["pending"], new.astype({"player": object})], ignore_index=True)
+        new = new.sort_values("date", kind="stable")
+
+        # Fit full batches; a short tail waits for more sessions unless nothing is fitted yet
+        n_full = len(new) - len(new) % BATCH_SIZE
+        if not _is_fitted() and len(new) >= max(N_CLUSTERS, N_COMPONENTS):
+            n_full = len(new)
+        for start in range(0, n_full, BATCH_SIZE):
+            _fit_batch(new[CLUSTER_FEATURES].iloc[start:start + BATCH_SIZE].to_numpy(dtype=float))
+        _state["pending"] = new.iloc[n_full:].astype({"player": object}) if n_full < len(new) else None
+
+        if _is_fitted() and len(new):
+            sessions = new[["player", "date"] + CLUSTER_FEATURES].astype({"player": object})
+            kept = _projection[~_projection.set_index(["player", "date"]).index.isin(
+                sessions.set_index(["player", "date"]).index)]
+            if len(kept):
+                sessions = pd.concat([kept[["player", "date"] + CLUSTER_FEATURES], sessions], ignore_index=True)
+            # partial_fit moved the models: re-assign every stored session, not just the new ones
+            _projection = _assign(sessions)
+
+        latest = new.groupby(new["player"].astype(object))["date"].max()
+        for player, date in latest.items():
+            _state["watermarks"][player] = max(date, _state["watermarks"].get(player, date))
+        _state["gps_version"] = version
+        _save_state()
+        return _projection
+
+
+def cluster_models() -> tuple:
+    """The current (scaler, MiniBatchKMeans, IncrementalPCA)."""
+    with _lock:
+        _load_state()
+        return _state["scaler"], _state["kmeans"], _state["pca"]
+
+
+def reset_clusters():
+    """Drops the incremental models and projection; the next update refits from scratch."""
+    global _state, _projection
+    with _lock:
+        _state, _projection = None, None
+        for path in (STATE_PATH, PROJECTION_PATH):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,171 @@
+# app/analysis/correlation.py
+
+import numpy as np
+import pandas as pd
+
+from analysis.data_loader import filter_frame
+from analysis.data_store import get_data_store
+from feature_engineering.player_day import PLAYER_DAY, attach_player_day
+from utils.lru import LRUCache
+
+MOMENTS_CACHE_SIZE = 16
+_CHUNK_VALUES = 1 << 20
+
+_moments_cache = LRUCache(max_size=MOMENTS_CACHE_SIZE)  # (dataset, version, x, y, by, dropna, attach) -> Moments
+
+
+class Moments:
+    """
+    Pairwise sufficient statistics of Pearson correlation between every x column and
+    every y column, per group: for each (group, x_i, y_j) the count n of rows where both
+    are present and the sums of x, y, x², y² and xy over those rows (on values centred
+    by the column means, for numerical stability).
+
+    The statistics are additive, so any coarser grouping or any subset of groups
+    (`select()`, `rollup()`) is a sum over groups, without revisiting the rows.
+    """
+
+    STATS = ("n", "sx", "sy", "sxx", "syy", "sxy")
+
+    def __init__(self, keys: pd.DataFrame, x_cols, y_cols, stats: dict):
+        self.keys = keys.reset_index(drop=True)   # one row per group
+        self.x_cols = list(x_cols)
+        self.y_cols = list(y_cols)
+        self.stats = stats                        # name -> array (groups, x, y)
+
+    def select(self, mask) -> "Moments":
+        """The groups where `mask` (aligned to `keys`) is true."""
+        mask = np.asarray(mask, dtype=bool)
+        return Moments(self.keys[mask], self.x_cols, self.y_cols,
+                       {name: values[mask] for name, values in self.stats.items()})
+
+    def rollup(self, by=()) -> "Moments":
+        """Sums the statistics over every key not in `by` (all of them by default)."""
+        by = list(by)
+        if by:
+            codes, uniques = pd.MultiIndex.from_frame(self.keys[by]).factorize(sort=True)
+            keys = uniques.to_frame(index=False, name=by)
+        else:
+            codes, keys = np.zeros(len(self.keys), dtype=np.intp), pd.DataFrame(index=[0])
+        stats = {}
+        for name, values in self.stats.items():
+            summed = np.zeros((len(keys),) + values.shape[1:])
+            np.add.at(summed, codes, values)
+            stats[name] = summed
+        return Moments(keys, self.x_cols, self.y_cols, stats)
+
+    def corr(self, min_periods: int = 2) -> np.ndarray:
+        """Correlation tensor (groups, x, y); NaN where fewer than `min_periods` pairs."""
+        s = self.stats
+        n = s["n"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = n * s["sxy"] - s["sx"] * s["sy"]
+            var_x = n * s["sxx"] - s["sx"] ** 2
+            var_y = n * s["syy"] - s["sy"] ** 2
+            r = cov / np.sqrt(var_x * var_y)
+        # Constant columns: variance is zero up to rounding of the sums
+        flat_x = var_x <= 1e-10 * n * s["sxx"]
+        flat_y = var_y <= 1e-10 * n * s["syy"]
+        r[(n < min_periods) | flat_x | flat_y] = np.nan
+        return np.clip(r, -1.0, 1.0)
+
+    def to_frame(self, y_col: str = None) -> pd.DataFrame:
+        """
+        One row per group: its keys and the correlation of `y_col` with every x column
+        (or, with y_col=None and a single group, the x × y correlation matrix).
+        """
+        r = self.corr()
+        if y_col is None:
+            return pd.DataFrame(r[0], index=self.x_cols, columns=self.y_cols)
+        values = pd.DataFrame(r[:, :, self.y_cols.index(y_col)], columns=self.x_cols)
+        return pd.concat([self.keys, values], axis=1)
+
+
+def grouped_moments(df: pd.DataFrame, x_cols, y_cols=None, by=(), dropna: bool = False) -> Moments:
+    """
+    Moments of `df` per `by` group in one vectorised pass over the rows: the group keys
+    are factorised once, rows are ordered by group, and each row's x × y products of the
+    masked, centred values are summed per group with one np.add.reduceat. Missing
+    values are excluded pairwise; `dropna=True` first drops rows with any missing
+    value (listwise).
+    """
+    x_cols = list(x_cols)
+    y_cols = list(x_cols if y_cols is None else y_cols)
+    by = list(by)
+    if dropna:
+        df = df.dropna(subset=list(dict.fromkeys(x_cols + y_cols)))
+    if by:
+        df = df.dropna(subset=by)
+
+    if by:
+        codes, uniques = pd.MultiIndex.from_frame(df[by]).factorize(sort=True)
+        keys = uniques.to_frame(index=False, name=by)
+    else:
+        codes, keys = np.zeros(len(df), dtype=np.intp), pd.DataFrame(index=[0])
+    # Rows of a group are contiguous after a stable sort on the code
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+
+    X = df[x_cols].to_numpy(dtype=np.float64)[order]
+    Y = df[y_cols].to_numpy(dtype=np.float64)[order]
+    mx, my = ~np.isnan(X), ~np.isnan(Y)
+    X = np.where(mx, X - np.nanmean(X, axis=0) if len(X) else X, 0.0)
+    Y = np.where(my, Y - np.nanmean(Y, axis=0) if len(Y) else Y, 0.0)
+    mx, my = mx.astype(np.float64), my.astype(np.float64)
+
+    shape = (len(keys), len(x_cols), len(y_cols))
+    stats = {name: np.zeros(shape) for name in Moments.STATS}
+    # Rows are taken in chunks so the (rows, x, y) products stay within _CHUNK_VALUES
+    step = max(1, _CHUNK_VALUES // max(len(x_cols) * len(y_cols), 1))
+    for start in range(0, len(df), step):
+        rows = slice(start, start + step)
+        x, y, ax, ay, chunk = X[rows], Y[rows], mx[rows], my[rows], codes[rows]
+        # Start of each group's run within the chunk; a group split across chunks adds twice
+        starts = np.flatnonzero(np.r_[True, chunk[1:] != chunk[:-1]])
+        groups = chunk[starts]
+        for name, left, right in (("n", ax, ay), ("sx", x, ay), ("sy", ax, y),
+                                  ("sxx", x * x, ay), ("syy", ax, y * y), ("sxy", x, y)):
+            stats[name][groups] += np.add.reduceat(left[:, :, None] * right[:, None, :], starts, axis=0)
+    return Moments(keys, x_cols, y_cols, stats)
+
+
+def store_moments(dataset: str, x_cols, y_cols=None, by=("player",), dropna: bool = False,
+                  attach=()) -> Moments:
+    """
+    grouped_moments() of a DataStore dataset, computed once per dataset version and
+    reused by every filtered view (select() / rollup() on the groups). `attach` names
+    player-day columns (e.g. "position") to look up first, so they can be grouped on.
+    """
+    store = get_data_store()
+    version = store.version(dataset)
+    if attach:
+        version += "+" + store.version(PLAYER_DAY)
+    key = (dataset, version, tuple(x_cols), tuple(y_cols or ()), tuple(by), dropna, tuple(attach))
+
+    def compute():
+        frame = store.get(dataset)
+        if attach:
+            frame = attach_player_day(frame, store.indexed(PLAYER_DAY), list(attach))
+        return grouped_moments(frame, x_cols, y_cols, by, dropna)
+    return _moments_cache.get_or_create(key, compute)
+
+
+def filtered_correlations(dataset: str, x_cols, y_cols=None, players=None, date_range=None,
+                          date_col: str = "date", by=(), dropna: bool = False, attach=()) -> Moments:
+    """
+    Moments for a sidebar-filtered view of `dataset`, grouped by `by`: the
+    per-(player, date, *by) moments are cached, a view only selects and sums them.
+    """
+    moments = store_moments(dataset, x_cols, y_cols, by=moment_grain(by, date_col), dropna=dropna, attach=attach)
+    return select_moments(moments, players, date_range, date_col, by)
+
+
+def moment_grain(by=(), date_col: str = "date") -> tuple:
+    """The (player, date, *by) grouping filtered_correlations() caches moments at."""
+    return ("player", date_col) + tuple(key for key in by if key not in ("player", date_col))
+
+
+def select_moments(moments: Moments, players=None, date_range=None, date_col: str = "date", by=()) -> Moments:
+    """Sums moments cached at moment_grain(by) over the selected players and dates, per `by`."""
+    view = filter_frame(moments.keys, date_col, players, date_range)
+    return moments.select(moments.keys.index.isin(view.index)).rollup(by)
@@ -1,68 +1,433 @@
 # file: app/analysis/data_loader.py
 
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
+from analysis.schema import SCHEMAS, SCHEMA_VERSION, apply_schema, memory_usage_bytes, player_dtype
 
-def load_gps_data() -> pd.DataFrame:
+try:
+    import pyarrow
+    import pyarrow.parquet  # noqa: F401 -- only needed for the Parquet cache
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "csv")
+# Derived tables (built from the datasets, never edited by hand) are persisted here
+DERIVED_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "output", "cache")
+
+# Bump whenever the way cached frames are produced changes, so stale caches rebuild.
+CACHE_FORMAT_VERSION = 2
+CACHE_SUFFIX = ".parquet"
+CACHE_META = "_meta.json"
+CACHE_PART = "part-{:05d}.parquet"
+# Appended batches land in their own part files; past this many the cache is compacted.
+MAX_CACHE_PARTS = 64
+# Rows are written in date order, so each row group covers a narrow date span and its
+# min/max statistics let date-range filters skip whole groups.
+ROW_GROUP_SIZE = 50_000
+
+_log = logging.getLogger(__name__)
+
+
+# ===================== COLUMNAR CACHE =========================
+
+def _source_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def version_token(signature: dict) -> str:
+    """Version string for a dataset_signature(); what DataStore.version() returns."""
+    return f"{signature['mtime_ns']}-{signature['size']}"
+
+
+def _source_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_dir(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + CACHE_SUFFIX
+
+
+def _read_meta(cache_dir: str):
+    try:
+        with open(os.path.join(cache_dir, CACHE_META), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir: str, meta: dict):
+    tmp_path = os.path.join(cache_dir, f".{CACHE_META}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(cache_dir, CACHE_META))
+
+
+def _cache_is_fresh(csv_path: str, meta) -> bool:
     """
-    Loads GPS data from /data/gps_data.csv.
+    A cache is fresh when the CSV's mtime and size match the recorded ones. If
+    only the mtime moved (e.g. the file was touched or re-copied), the content
+    hash decides, and the recorded signature is refreshed so the next check is cheap.
     """
-    script_dir = os.path.dirname(__file__)  # e.g. .../app/analysis
-    gps_path = os.path.join(script_dir, "..", "..", "data", "csv", "gps_data.csv")
-    return pd.read_csv(gps_path, parse_dates=["date"])
+    if not meta or meta.get("format_version") != CACHE_FORMAT_VERSION:
+        return False
+    if meta.get("schema_version") != SCHEMA_VERSION:
+        return False
+    signature = _source_signature(csv_path)
+    if meta.get("mtime_ns") == signature["mtime_ns"] and meta.get("size") == signature["size"]:
+        return True
+    if meta.get("size") != signature["size"] or not meta.get("sha256"):
+        return False
+    if _source_hash(csv_path) != meta["sha256"]:
+        return False
+    try:
+        _write_meta(_cache_dir(csv_path), {**meta, **signature})
+    except OSError:
+        pass
+    return True
+
+
+def _cache_parts(cache_dir: str) -> list:
+    return sorted(
+        name for name in os.listdir(cache_dir)
+        if name.startswith("part-") and name.endswith(".parquet")
+    )
+
 
+def _write_part(cache_dir: str, index: int, df: pd.DataFrame):
+    part = CACHE_PART.format(index)
+    tmp_path = os.path.join(cache_dir, f".{part}.{os.getpid()}.tmp")
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, os.path.join(cache_dir, part))
 
-def load_recovery_data() -> pd.DataFrame:
+
+def _build_cache(csv_path: str, df: pd.DataFrame, date_key: str):
+    cache_dir = _cache_dir(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Signature is taken before the write so a CSV edited mid-build is picked up next time.
+    meta = {"format_version": CACHE_FORMAT_VERSION, "schema_version": SCHEMA_VERSION,
+            **_source_signature(csv_path),
+            "sha256": _source_hash(csv_path)}
+    _write_part(cache_dir, 0, df.sort_values(date_key, kind="stable"))
+    for stale in _cache_parts(cache_dir)[1:]:
+        os.remove(os.path.join(cache_dir, stale))
+    _write_meta(cache_dir, meta)
+
+
+def dataset_path(dataset: str) -> str:
+    """Path of the CSV backing `dataset`."""
+    return os.path.join(DATA_DIR, SCHEMAS[dataset]["file"])
+
+
+def dataset_signature(dataset: str) -> dict:
+    """Cheap change token for `dataset`: the source CSV's mtime and size."""
+    return _source_signature(dataset_path(dataset))
+
+
+def normalize_date_range(date_range):
     """
-    Loads Recovery Status data from /data/recovery_status.csv.
+    Turns a sidebar date range (a pair of dates, or a single date while the user is
+    still picking) into (start, end) Timestamps; either end may be None (open).
     """
-    script_dir = os.path.dirname(__file__)
-    recovery_path = os.path.join(
-        script_dir, "..", "..", "data", "csv", "recovery_status.csv"
-    )
-    return pd.read_csv(recovery_path, parse_dates=["date"])
+    if date_range is None:
+        return None, None
+    bounds = list(date_range) if isinstance(date_range, (list, tuple)) else [date_range]
+    start = pd.Timestamp(bounds[0]) if len(bounds) > 0 and bounds[0] is not None else None
+    end = pd.Timestamp(bounds[1]) if len(bounds) > 1 and bounds[1] is not None else None
+    return start, end
+
+
+def _pushdown_filters(date_key: str, players, date_range):
+    start, end = normalize_date_range(date_range)
+    filters = []
+    if players is not None:
+        filters.append(("player", "in", list(players)))
+    if start is not None:
+        filters.append((date_key, ">=", start))
+    if end is not None:
+        filters.append((date_key, "<=", end))
+    return filters or None
+
 
+def filter_frame(df: pd.DataFrame, date_key: str, players=None, date_range=None) -> pd.DataFrame:
+    """In-memory equivalent of the Parquet pushdown, for frames already loaded."""
+    start, end = normalize_date_range(date_range)
+    mask = pd.Series(True, index=df.index)
+    if players is not None:
+        mask &= df["player"].isin(list(players))
+    if start is not None:
+        mask &= df[date_key] >= start
+    if end is not None:
+        mask &= df[date_key] <= end
+    return df if mask.all() else df[mask]
 
-def load_capability_data() -> pd.DataFrame:
+
+def _empty_frame(cache_dir: str, columns=None) -> pd.DataFrame:
+    # No rows, with the cache's columns and dtypes (a cleared player selection)
+    schema = pyarrow.parquet.ParquetDataset(cache_dir).schema
+    df = schema.empty_table().to_pandas()
+    return df[columns] if columns is not None else df
+
+
+def load_dataset(dataset: str, players=None, date_range=None, columns=None) -> pd.DataFrame:
     """
-    Loads Physical Capability data from /data/physical_capability.csv.
+    Reads the CSV registered for `dataset` in analysis.schema.SCHEMAS and returns it
+    with the declared categorical / downcast dtypes. Goes through a Parquet copy kept
+    next to the CSV (<name>.parquet/) that is rebuilt only when the CSV's mtime/size
+    and content hash change, so warm loads skip text parsing and date inference.
+    Falls back to a plain CSV read when pyarrow is unavailable or the cache is unusable.
+
+    `players` and `date_range` (inclusive (start, end) on the dataset's date_key) are
+    pushed into the Parquet read, so row groups outside the range are skipped and only
+    matching rows are materialised; `columns` projects the read likewise.
     """
-    script_dir = os.path.dirname(__file__)
-    capability_path = os.path.join(
-        script_dir, "..", "..", "data", "csv", "physical_capability.csv"
-    )
-    return pd.read_csv(capability_path, parse_dates=["date"])
+    schema = SCHEMAS[dataset]
+    csv_path = dataset_path(dataset)
+    if HAS_PYARROW:
+        cache_dir = _cache_dir(csv_path)
+        if _cache_is_fresh(csv_path, _read_meta(cache_dir)):
+            try:
+                if players is not None and not len(players):
+                    # An empty "in" filter is rejected by pyarrow; nothing can match anyway
+                    df = _empty_frame(cache_dir, columns)
+                else:
+                    df = pd.read_parquet(
+                        cache_dir,
+                        columns=columns,
+                        filters=_pushdown_filters(schema["date_key"], players, date_range),
+                    )
+                # Re-applying the schema rebinds 'player' to the shared dictionary
+                return apply_schema(df, dataset)
+            except (OSError, pyarrow.ArrowInvalid):
+                pass  # Corrupt, half-written or missing cache: rebuild below
+
+    df = apply_schema(pd.read_csv(csv_path, parse_dates=schema["dates"]), dataset)
+    if HAS_PYARROW:
+        try:
+            _build_cache(csv_path, df, schema["date_key"])
+        except OSError:
+            pass  # Read-only data directory: serve the parsed CSV uncached
+    df = filter_frame(df, schema["date_key"], players, date_range)
+    return df[columns] if columns is not None else df
+
+
+def appended_rows(dataset: str, since: str):
+    """
+    (rows, version): the rows append_rows() added to `dataset` after version `since`,
+    read from their cache parts only, and the version they bring it to. None when the
+    cache can't tell (it was rebuilt or compacted since, or `since` is unknown to it).
+    """
+    if not HAS_PYARROW:
+        return None
+    csv_path = dataset_path(dataset)
+    cache_dir = _cache_dir(csv_path)
+    meta = _read_meta(cache_dir)
+    if not _cache_is_fresh(csv_path, meta):
+        return None
+    appends = meta.get("appends", [])
+    starts = [i for i, step in enumerate(appends) if step["after"] == since]
+    if not starts:
+        return None
+    try:
+        parts = [pd.read_parquet(os.path.join(cache_dir, step["part"])) for step in appends[starts[-1]:]]
+    except (OSError, pyarrow.ArrowInvalid):
+        return None
+    return apply_schema(pd.concat(parts, ignore_index=True), dataset), version_token(meta)
 
 
-def load_ipa_data() -> pd.DataFrame:
+def persist_best_effort(path: str, writer) -> bool:
+    """
+    Writes `path` through `writer(tmp_path)` and moves it into place, creating its
+    directory. For files that only save work (derived tables, fitted models): a failed
+    write is logged and left to be rebuilt after a restart. Returns whether it was written.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, ImportError):
+        _log.warning("Could not persist %s", path, exc_info=True)
+        return False
+
+
+def _dump_json(payload: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+
+
+def write_derived(name: str, df: pd.DataFrame, version: str):
+    """Persists a derived table as output/cache/<name>.parquet tagged with `version`."""
+    if not HAS_PYARROW:
+        return
+    cache_dir = os.path.join(DERIVED_DIR, name + CACHE_SUFFIX)
+    part = os.path.join(cache_dir, CACHE_PART.format(0))
+    if persist_best_effort(part, lambda path: df.to_parquet(path, index=False, row_group_size=ROW_GROUP_SIZE)):
+        meta = {"format_version": CACHE_FORMAT_VERSION, "version": version}
+        persist_best_effort(os.path.join(cache_dir, CACHE_META), lambda path: _dump_json(meta, path))
+
+
+def load_derived(name: str, version: str):
+    """The persisted derived table `name` if it was built at `version`, else None."""
+    if not HAS_PYARROW:
+        return None
+    cache_dir = os.path.join(DERIVED_DIR, name + CACHE_SUFFIX)
+    meta = _read_meta(cache_dir)
+    if not meta or meta.get("format_version") != CACHE_FORMAT_VERSION or meta.get("version") != version:
+        return None
+    try:
+        df = pd.read_parquet(os.path.join(cache_dir, CACHE_PART.format(0)))
+    except Exception:
+        return None
+    if "player" in df.columns:
+        df["player"] = df["player"].astype(player_dtype(df["player"].dropna().unique()))
+    return df
+
+
+# ===================== LOADERS =========================
+
+def load_gps_data(players=None, date_range=None) -> pd.DataFrame:
+    """
+    Loads GPS data from /data/gps_data.csv, optionally only the given players / dates.
+    """
+    return load_dataset("gps", players=players, date_range=date_range)
+
+
+def load_recovery_data(players=None, date_range=None) -> pd.DataFrame:
+    """
+    Loads Recovery Status data from /data/recovery_status.csv, optionally filtered.
+    """
+    return load_dataset("recovery", players=players, date_range=date_range)
+
+
+def load_capability_data(players=None, date_range=None) -> pd.DataFrame:
+    """
+    Loads Physical Capability data from /data/physical_capability.csv, optionally filtered.
+    """
+    return load_dataset("capability", players=players, date_range=date_range)
+
+
+def load_ipa_data(players=None, date_range=None) -> pd.DataFrame:
     """
     Loads Individual Priority Areas data from /data/individual_priority_areas.csv.
+    `date_range` applies to target_set_date.
     """
-    script_dir = os.path.dirname(__file__)
-    ipa_path = os.path.join(
-        script_dir, "..", "..", "data", "csv", "individual_priority_areas.csv"
-    )
-    return pd.read_csv(ipa_path, parse_dates=["target_set_date", "review_date"])
+    return load_dataset("ipa", players=players, date_range=date_range)
 
-def load_calendar_data() -> pd.DataFrame:
+def load_calendar_data(players=None, date_range=None) -> pd.DataFrame:
     # Newly added function for Chelsea FC calendar
-    script_dir = os.path.dirname(__file__)
-    ipa_path = os.path.join(
-        script_dir, "..", "..", "data", "csv", "chelsea_fc_calendar.csv"
-    )
-    return pd.read_csv(ipa_path, parse_dates=["event_date"])
+    return load_dataset("calendar", players=players, date_range=date_range)
+
+
+DATASETS = ("gps", "recovery", "capability", "ipa", "calendar")
 
 
-def load_all_data():
+def run_timed(load, datasets, parallel: bool = True, timings: dict = None) -> dict:
     """
-    Convenience function that loads all four datasets and returns them
-    as a tuple: (gps_df, recovery_df, capability_df, ipa_df).
+    Calls `load(dataset)` for each dataset, concurrently on a thread pool when
+    `parallel` (pyarrow and the pandas CSV parser release the GIL), and returns
+    {dataset: result} once all are ready. Wall-clock seconds per dataset go into `timings`.
+    """
+    def timed(dataset):
+        start = time.perf_counter()
+        result = load(dataset)
+        return dataset, result, time.perf_counter() - start
+
+    datasets = list(datasets)
+    if parallel and len(datasets) > 1:
+        with ThreadPoolExecutor(max_workers=len(datasets), thread_name_prefix="load") as pool:
+            results = list(pool.map(timed, datasets))
+    else:
+        results = [timed(dataset) for dataset in datasets]
+
+    if timings is not None:
+        timings.update({dataset: seconds for dataset, _, seconds in results})
+    return {dataset: result for dataset, result, _ in results}
+
+
+def load_all_data(parallel: bool = True, timings: dict = None):
     """
-    gps_df = load_gps_data()
-    recovery_df = load_recovery_data()
-    capability_df = load_capability_data()
-    ipa_df = load_ipa_data()
-    calendar_data = load_calendar_data()
+    Convenience function that loads all five datasets and returns them
+    as a tuple: (gps_df, recovery_df, capability_df, ipa_df, calendar_df).
+    Datasets are read concurrently unless `parallel=False`; pass a dict as
+    `timings` to get the seconds each one took.
+    """
+    frames = run_timed(load_dataset, DATASETS, parallel=parallel, timings=timings)
+    return tuple(frames[dataset] for dataset in DATASETS)
+
+
+def memory_report() -> pd.DataFrame:
+    """
+    Compares each dataset's in-memory footprint under pandas' default dtype inference
+    with the typed schema, returning bytes saved per dataset.
+    """
+    rows = []
+    for dataset, schema in SCHEMAS.items():
+        inferred = pd.read_csv(os.path.join(DATA_DIR, schema["file"]), parse_dates=schema["dates"])
+        inferred_bytes = memory_usage_bytes(inferred)
+        typed_bytes = memory_usage_bytes(load_dataset(dataset))
+        rows.append({
+            "dataset": dataset,
+            "inferred_bytes": inferred_bytes,
+            "typed_bytes": typed_bytes,
+            "bytes_saved": inferred_bytes - typed_bytes,
+            "reduction": inferred_bytes / typed_bytes if typed_bytes else float("nan"),
+        })
+    return pd.DataFrame(rows)
+
+
+def append_rows(dataset: str, rows: pd.DataFrame) -> dict:
+    """
+    Appends typed `rows` to the dataset's CSV and, when the columnar cache was fresh,
+    adds them as a new cache part instead of rebuilding it, so the cost is O(rows).
+    Returns the CSV's new signature. The caller is responsible for de-duplication.
+    """
+    schema = SCHEMAS[dataset]
+    csv_path = dataset_path(dataset)
+    cache_dir = _cache_dir(csv_path)
+    cache_fresh = HAS_PYARROW and _cache_is_fresh(csv_path, _read_meta(cache_dir))
+    before = version_token(_source_signature(csv_path))
+
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    with open(csv_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    rows = rows.sort_values(schema["date_key"], kind="stable")
+    # float32 holds ~7 significant digits; "%.7g" writes them back as the source had them
+    rows[header].to_csv(csv_path, mode="a", header=False, index=False,
+                        date_format="%Y-%m-%d", float_format="%.7g")
+    signature = _source_signature(csv_path)
 
-    return gps_df, recovery_df, capability_df, ipa_df, calendar_data
+    if cache_fresh:
+        try:
+            parts = _cache_parts(cache_dir)
+            if len(parts) >= MAX_CACHE_PARTS:
+                load_dataset(dataset)  # Stale signature: re-parses and compacts into one part
+            else:
+                index = int(parts[-1][5:10]) + 1 if parts else 0
+                _write_part(cache_dir, index, rows[header])
+                # The content hash would need a full re-read; mtime/size now vouch for it.
+                # Each part records the version it extends, so readers holding that
+                # version can load just the parts after it (appended_rows()).
+                meta = _read_meta(cache_dir)
+                appends = meta.get("appends", []) + [{"part": CACHE_PART.format(index), "after": before}]
+                _write_meta(cache_dir, {**meta, **signature, "sha256": None, "appends": appends})
+        except OSError:
+            pass  # Stale cache is rebuilt on the next load
+    return signature
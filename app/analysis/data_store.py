@@ -0,0 +1,280 @@
+# app/analysis/data_store.py
+
+import threading
+import pandas as pd
+
+from analysis.data_loader import (
+    DATASETS, load_dataset, dataset_signature, normalize_date_range, run_timed,
+    load_derived, write_derived, appended_rows, version_token,
+)
+from analysis.filter_index import GROUP_COLUMNS, filter_index
+from analysis.schema import SCHEMAS, concat_typed
+from feature_engineering.data_wrangler import key_index
+from feature_engineering.player_day import register_player_day
+from feature_engineering.workload import register_workload
+from utils.lru import LRUCache
+
+# Frames handed out by the store share memory with the cached copy; Copy-on-Write
+# guarantees a page writing to its frame never leaks into other sessions.
+# (Always on from pandas 3, where the option is deprecated.)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Datasets that grow daily: filtered reads are pushed down into the columnar cache
+# instead of slicing a resident copy of every season.
+PUSHDOWN_DATASETS = ("gps", "recovery")
+FILTERED_CACHE_SIZE = 32
+# Appends remembered per dataset, for derived tables catching up incrementally
+APPEND_HISTORY = 8
+
+
+class DataStore:
+    """
+    Process-wide holder for the dashboard datasets.
+
+    Each dataset is loaded once and shared by every Streamlit session. `get()` hands
+    out a shallow (non-copied) view of the cached frame; the source CSV's mtime/size
+    is checked on every call and, when it changed, the dataset is reloaded once and
+    swapped in atomically, so concurrent readers see either the old or the new frame.
+    When the change was an append (analysis.ingest), only the appended rows are read
+    and added to the resident frame.
+
+    Filtered requests (`players=` / `date_range=`) on datasets in `pushdown` are
+    answered by a filtered read of the columnar cache, memoised per
+    (version, filter) in a small LRU; other datasets are sliced from the resident frame
+    by row position through its filter index.
+
+    Derived tables (see `register_derived()`) are versioned by the versions of their
+    sources, rebuilt (or updated from the rows appended to their sources) only when
+    one of those changes, and persisted so a restart reuses the last build without
+    touching the sources.
+    """
+
+    def __init__(self, loader=load_dataset, signature=dataset_signature,
+                 pushdown=PUSHDOWN_DATASETS, appended=appended_rows):
+        self._loader = loader
+        self._signature = signature
+        self._appended = appended
+        self._pushdown = set(pushdown)
+        self._derived = {}        # name -> (sources, build, date_key, build version, update)
+        self._entries = {}        # dataset -> (version, frame)
+        self._built_from = {}     # derived name -> source versions of its resident build
+        self._appends = {}        # dataset -> [(from version, to version, rows added or replaced)]
+        self._filtered = LRUCache(max_size=FILTERED_CACHE_SIZE)  # (dataset, version, filter key) -> frame
+        self._locks = {}          # dataset -> lock serialising reloads
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, dataset: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(dataset, threading.Lock())
+
+    @staticmethod
+    def _version_of(signature: dict) -> str:
+        return version_token(signature)
+
+    def register_derived(self, name: str, sources, build, date_key: str = "date", version: str = "1",
+                         update=None):
+        """
+        Registers a table computed from other datasets: `build(store)` returns it,
+        reading its `sources` through the store. Bump `version` when `build` changes.
+        If given, `update(store, previous, appended)` is tried first when sources changed
+        only by appends while a previous build is resident: `appended` maps each changed
+        source to its rows added (or replaced) since. It returns (new table, its rows
+        added or replaced), or None for a full build.
+        """
+        self._derived[name] = (tuple(sources), build, date_key, version, update)
+        self._pushdown.discard(name)
+
+    def _date_key(self, dataset: str) -> str:
+        if dataset in self._derived:
+            return self._derived[dataset][2]
+        return SCHEMAS[dataset]["date_key"]
+
+    def _version_now(self, dataset: str) -> str:
+        if dataset in self._derived:
+            sources, _, _, build_version, _ = self._derived[dataset]
+            return "+".join([build_version] + [self._version_now(source) for source in sources])
+        return self._version_of(self._signature(dataset))
+
+    def _record_append(self, dataset: str, old_version: str, new_version: str, rows: pd.DataFrame):
+        with self._locks_guard:
+            steps = self._appends.setdefault(dataset, [])
+            steps.append((old_version, new_version, rows))
+            del steps[:-APPEND_HISTORY]
+
+    def _appended_since(self, dataset: str, since: str, until: str):
+        # Rows appended to `dataset` between two versions, if every step was an append
+        with self._locks_guard:
+            steps = list(self._appends.get(dataset, ()))
+        rows, version = [], since
+        for old_version, new_version, added in steps:
+            if old_version == version:
+                rows.append(added)
+                version = new_version
+        if version != until or not rows:
+            return None
+        return concat_typed(rows)
+
+    def _update_derived(self, dataset: str, previous):
+        # (table, rows added or replaced) from the resident build, or None
+        sources, _, _, _, update = self._derived[dataset]
+        built_from = self._built_from.get(dataset)
+        if update is None or previous is None or built_from is None:
+            return None
+        appended = {}
+        for source, old_version in zip(sources, built_from):
+            new_version = self._current(source)[0]
+            if new_version != old_version:
+                rows = self._appended_since(source, old_version, new_version)
+                if rows is None:
+                    return None
+                appended[source] = rows
+        return update(self, previous, appended)
+
+    def _load(self, dataset: str, version: str, previous=None):
+        # (frame, rows added or replaced since `previous`, or None after a full load)
+        if dataset not in self._derived:
+            if previous is not None:
+                tail = self._appended(dataset, previous[0])
+                if tail is not None and tail[1] == version:
+                    return concat_typed([previous[1], tail[0]]), tail[0]
+            return self._loader(dataset), None
+        frame = load_derived(dataset, version)
+        if frame is not None:
+            return frame, None
+        updated = self._update_derived(dataset, previous[1] if previous is not None else None)
+        frame, changed = updated if updated is not None else (self._derived[dataset][1](self), None)
+        write_derived(dataset, frame, version)
+        return frame, changed
+
+    def _current(self, dataset: str):
+        version = self._version_now(dataset)
+        entry = self._entries.get(dataset)
+        if entry is not None and entry[0] == version:
+            return entry
+
+        with self._lock_for(dataset):
+            # Another session may have finished the reload while we waited
+            entry = self._entries.get(dataset)
+            if entry is not None and entry[0] == version:
+                return entry
+            if dataset in self._derived:
+                built_from = [self._version_now(source) for source in self._derived[dataset][0]]
+            frame, changed = self._load(dataset, version, entry)
+            if changed is not None:
+                self._record_append(dataset, entry[0], version, changed)
+            if dataset in self._derived:
+                self._built_from[dataset] = built_from
+            entry = (version, frame)
+            self._entries[dataset] = entry
+            return entry
+
+    def _memoised(self, key, load):
+        return self._filtered.get_or_create(key, load)
+
+    def get(self, dataset: str, players=None, date_range=None) -> pd.DataFrame:
+        """
+        Returns the shared frame for `dataset`, reloading it if its source changed,
+        optionally restricted to `players` and an inclusive `date_range`.
+        """
+        if players is None and date_range is None:
+            return self._current(dataset)[1].copy(deep=False)
+
+        if dataset not in self._pushdown:
+            frame = self._current(dataset)[1]
+            frame = self.filter_index(dataset).take(frame, self._date_key(dataset), players, date_range)
+            return frame.copy(deep=False)
+
+        version = self._version_now(dataset)
+        filter_key = (
+            tuple(sorted(players)) if players is not None else None,
+            normalize_date_range(date_range),
+        )
+        frame = self._memoised(
+            (dataset, version, filter_key),
+            lambda: self._loader(dataset, players=players, date_range=date_range),
+        )
+        return frame.copy(deep=False)
+
+    def _keys(self, dataset: str) -> pd.DataFrame:
+        """The player, date and grouping columns of `dataset`, for building sidebar filters."""
+        date_key = self._date_key(dataset)
+        if dataset not in self._pushdown:
+            frame = self._current(dataset)[1]
+            return frame[["player", date_key] + [c for c in GROUP_COLUMNS if c in frame]]
+        groups = [c for c in GROUP_COLUMNS if c in SCHEMAS[dataset].get("categories", ())]
+        version = self._version_now(dataset)
+        return self._memoised(
+            (dataset, version, "keys"),
+            lambda: self._loader(dataset, columns=["player", date_key] + groups),
+        )
+
+    def indexed(self, dataset: str) -> pd.DataFrame:
+        """
+        `dataset` keyed on a sorted (player, date) MultiIndex (data_wrangler.key_index),
+        built once per version, for the keyed joins in feature_engineering.
+        """
+        version = self._version_now(dataset)
+        return self._memoised(
+            (dataset, version, "indexed"),
+            lambda: key_index(self._current(dataset)[1], self._date_key(dataset)),
+        )
+
+    def filter_index(self, dataset: str):
+        """
+        Row positions of `dataset` by player, date and group (analysis.filter_index),
+        built once per version from its player and date columns, for the sidebar filters.
+        """
+        version = self._version_now(dataset)
+        return self._memoised(
+            (dataset, version, "filter_index"),
+            lambda: filter_index(self._keys(dataset), self._date_key(dataset)),
+        )
+
+    def players(self, dataset: str) -> list:
+        """Sorted player names present in `dataset`."""
+        return self.filter_index(dataset).players
+
+    def date_bounds(self, dataset: str) -> tuple:
+        """(min, max) of the date column `dataset` is range-filtered on."""
+        return self.filter_index(dataset).date_bounds()
+
+    def preload(self, datasets=DATASETS, parallel: bool = True) -> dict:
+        """
+        Makes every dataset in `datasets` resident, loading the missing or stale ones
+        concurrently. Returns seconds spent per dataset (near zero when already loaded).
+        """
+        timings = {}
+        run_timed(self._current, datasets, parallel=parallel, timings=timings)
+        return timings
+
+    def version(self, dataset: str) -> str:
+        """Version token of the frame `get(dataset)` currently returns."""
+        return self._current(dataset)[0]
+
+    def invalidate(self, dataset: str = None):
+        """Drops one (or every) cached dataset so the next `get()` reloads it."""
+        with self._locks_guard:
+            if dataset is None:
+                self._entries.clear()
+                self._filtered.discard()
+                self._appends.clear()
+            else:
+                self._entries.pop(dataset, None)
+                self._appends.pop(dataset, None)
+                self._filtered.discard(lambda key: key[0] == dataset)
+
+
+_store = None
+_store_guard = threading.Lock()
+
+
+def get_data_store() -> DataStore:
+    """Returns the DataStore shared by every session in this process."""
+    global _store
+    with _store_guard:
+        if _store is None:
+            _store = DataStore()
+            register_player_day(_store)
+            register_workload(_store)
+        return _store
@@ -0,0 +1,138 @@
+# app/analysis/filter_index.py
+
+import numpy as np
+import pandas as pd
+
+from analysis.data_loader import filter_frame, normalize_date_range
+
+# Columns whose values the index groups rows by (where a dataset has them)
+GROUP_COLUMNS = ("position", "session_type")
+
+_NO_DATE = np.iinfo(np.int64).max  # missing dates sort after every real one
+
+
+def _date_values(dates: pd.Series) -> np.ndarray:
+    # Nanoseconds since the epoch, _NO_DATE where missing
+    values = pd.to_datetime(dates).astype("datetime64[ns]").to_numpy().view(np.int64).copy()
+    values[pd.isna(dates).to_numpy()] = _NO_DATE
+    return values
+
+
+def _bound(timestamp, default: int) -> int:
+    return default if timestamp is None else pd.Timestamp(timestamp).as_unit("ns").value
+
+
+class FilterIndex:
+    """
+    Row positions of one version of a dataset by player, date and group, so the sidebar
+    filters select rows by slicing and concatenating position arrays instead of
+    comparing every row. Rows come back in frame order, as filter_frame() returns them.
+    Build one per data version with filter_index() (see DataStore.filter_index()).
+    """
+
+    def __init__(self, n_rows: int, player_codes: np.ndarray, player_rows: dict, player_dates: dict,
+                 date_rows: np.ndarray, dates: np.ndarray, groups: dict):
+        self.n_rows = n_rows
+        self.players = list(player_rows)    # sorted player names
+        self._player_codes = player_codes   # position -> index into self.players, -1 if missing
+        self._player_rows = player_rows     # player -> positions, by date (missing dates last)
+        self._player_dates = player_dates   # player -> its sorted non-missing dates (ns)
+        self._date_rows = date_rows         # all positions, by date (missing dates last)
+        self._dates = dates                 # all sorted non-missing dates (ns)
+        self.groups = groups                # column -> {value: positions}
+
+    def _date_slice(self, dates: np.ndarray, start, end) -> slice:
+        lo = np.searchsorted(dates, _bound(start, np.iinfo(np.int64).min), side="left")
+        hi = np.searchsorted(dates, _bound(end, _NO_DATE - 1), side="right")
+        return slice(lo, hi)
+
+    def date_bounds(self) -> tuple:
+        """(min, max) date, as Timestamps (NaT if there are none)."""
+        if not len(self._dates):
+            return pd.NaT, pd.NaT
+        return pd.Timestamp(self._dates[0]), pd.Timestamp(self._dates[-1])
+
+    def rows(self, players=None, date_range=None, groups: dict = None) -> np.ndarray:
+        """
+        Sorted positions of the rows of `players` within an inclusive `date_range`,
+        restricted to `groups` ({column: values}) if given.
+        """
+        start, end = normalize_date_range(date_range)
+        dated = start is not None or end is not None
+        if players is None:
+            if dated:
+                rows = self._date_rows[self._date_slice(self._dates, start, end)]
+            else:
+                rows = self._date_rows
+        else:
+            parts = []
+            for player in dict.fromkeys(players):
+                player_rows = self._player_rows.get(player)
+                if player_rows is None:
+                    continue
+                if dated:
+                    player_rows = player_rows[self._date_slice(self._player_dates[player], start, end)]
+                parts.append(player_rows)
+            rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.intp)
+        rows = np.sort(rows)
+        for column, values in (groups or {}).items():
+            by_value = self.groups[column]
+            group_rows = [by_value[value] for value in values if value in by_value]
+            keep = np.concatenate(group_rows) if group_rows else np.zeros(0, dtype=np.intp)
+            rows = np.intersect1d(rows, keep, assume_unique=True)
+        return rows
+
+    def players_in(self, column: str, values) -> list:
+        """Sorted players with at least one row whose `column` is in `values`."""
+        by_value = self.groups[column]
+        rows = [by_value[value] for value in values if value in by_value]
+        codes = np.unique(self._player_codes[np.concatenate(rows)]) if rows else []
+        return [self.players[code] for code in codes if code >= 0]
+
+    def take(self, df: pd.DataFrame, date_key: str, players=None, date_range=None) -> pd.DataFrame:
+        """
+        filter_frame() of `df` -- the frame this index was built from -- by position.
+        Falls back to filter_frame() if `df` doesn't have the indexed number of rows.
+        """
+        if len(df) != self.n_rows:
+            return filter_frame(df, date_key, players, date_range)
+        if players is None and date_range is None:
+            return df
+        rows = self.rows(players, date_range)
+        return df if len(rows) == self.n_rows else df.iloc[rows]
+
+
+def filter_index(df: pd.DataFrame, date_key: str) -> FilterIndex:
+    """Builds the FilterIndex of `df`, filtered on `date_key`; one sort for all players."""
+    codes, names = pd.factorize(df["player"].astype(object), sort=True)
+    dates = _date_values(df[date_key])
+
+    # Positions by player, then date: each player's rows are one contiguous run
+    order = np.lexsort((dates, codes))
+    order = order[codes[order] >= 0]
+    sorted_codes = codes[order]
+    bounds = np.searchsorted(sorted_codes, np.arange(len(names) + 1))
+    player_rows, player_dates = {}, {}
+    for code, name in enumerate(names):
+        rows = order[bounds[code]:bounds[code + 1]]
+        player_dates[name] = dates[rows][dates[rows] != _NO_DATE]
+        player_rows[name] = rows
+
+    date_rows = np.argsort(dates, kind="stable")
+    groups = {}
+    for column in GROUP_COLUMNS:
+        if column in df:
+            group_codes, values = pd.factorize(df[column].astype(object))
+            order = np.argsort(group_codes, kind="stable")
+            bounds = np.searchsorted(group_codes[order], np.arange(len(values) + 1))
+            groups[column] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(values)}
+
+    return FilterIndex(
+        n_rows=len(df),
+        player_codes=codes,
+        player_rows=player_rows,
+        player_dates=player_dates,
+        date_rows=date_rows,
+        dates=dates[date_rows][dates[date_rows] != _NO_DATE],
+        groups=groups,
+    )
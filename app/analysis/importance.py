@@ -0,0 +1,150 @@
+# app/analysis/importance.py
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import (
+    ExtraTreesClassifier, ExtraTreesRegressor, RandomForestClassifier, RandomForestRegressor,
+)
+
+from analysis import model_cache
+from analysis.training import get_training_scheduler
+
+# "exact": the full random forest the charts always used, for reports.
+# "fast": shallow, subsampled extra-trees grown until the time budget runs out.
+IMPORTANCE_MODES = ("fast", "exact")
+FAST_TIME_BUDGET = 0.5   # seconds per chart
+FAST_TREES_STEP = 10
+FAST_MAX_TREES = 100
+FAST_MAX_DEPTH = 8
+FAST_MAX_SAMPLES = 0.5   # share of rows each tree is grown on
+
+# Bootstrap intervals: the importance model is refitted on this many resamples of the
+# rows (each with its own seed). Override with VIZATHON_BOOTSTRAP_RESAMPLES=<n>.
+BOOTSTRAP_RESAMPLES = int(os.environ.get("VIZATHON_BOOTSTRAP_RESAMPLES", 0)) or 30
+BOOTSTRAP_CI = 0.95
+BOOTSTRAP_FAST_TREES = 20  # fixed-size fast model per resample (no time budget)
+
+
+def _exact_model(task: str):
+    cls = RandomForestRegressor if task == "regression" else RandomForestClassifier
+    return cls(random_state=42)
+
+
+def _fast_model(task: str):
+    cls = ExtraTreesRegressor if task == "regression" else ExtraTreesClassifier
+    return cls(
+        n_estimators=FAST_TREES_STEP, max_depth=FAST_MAX_DEPTH, bootstrap=True,
+        max_samples=FAST_MAX_SAMPLES, warm_start=True, random_state=42, n_jobs=1,
+    )
+
+
+def _fit_within(model, X, y, time_budget: float):
+    # Adds FAST_TREES_STEP trees at a time while another step still fits in the budget
+    start = time.perf_counter()
+    model.fit(X, y)
+    steps = 1
+    while model.n_estimators < FAST_MAX_TREES:
+        elapsed = time.perf_counter() - start
+        if elapsed + elapsed / steps > time_budget:
+            break
+        model.set_params(n_estimators=model.n_estimators + FAST_TREES_STEP)
+        model.fit(X, y)
+        steps += 1
+    return model
+
+
+def describe(model, mode: str) -> str:
+    """Human-readable label for the model that produced a set of importances."""
+    label = f"{mode}: {type(model).__name__}, {model.n_estimators} trees"
+    if mode == "fast":
+        label += f", depth ≤ {FAST_MAX_DEPTH}, {FAST_MAX_SAMPLES:.0%} row samples"
+    return label
+
+
+def feature_importances(chart_id: str, X, y, task: str = "regression", mode: str = "exact",
+                        time_budget: float = FAST_TIME_BUDGET, scope=None):
+    """
+    Impurity feature importances of X for predicting y, and a label saying which mode
+    (and model) produced them. Fits are cached in model_cache either way; a fast fit
+    is keyed on its time budget too, since that decides how many trees it grows.
+    """
+    if mode not in IMPORTANCE_MODES:
+        raise ValueError(f"Unknown importance mode '{mode}', expected one of {IMPORTANCE_MODES}")
+    if mode == "exact":
+        model = model_cache.fit_cached(chart_id, _exact_model(task), X, y, scope)
+        return model.feature_importances_, describe(model, mode)
+
+    template = _fast_model(task)
+    key = model_cache.model_key(f"{chart_id}:fast:{time_budget}", template, X, y, scope)
+    model = model_cache.lookup(key)
+    if model is None:
+        model = _fit_within(clone(template), X, y, time_budget)
+        model_cache.store(key, model)
+    return np.asarray(model.feature_importances_), describe(model, mode)
+
+
+# ===================== BOOTSTRAP =========================
+
+def resample_indices(n_rows: int, n_resamples: int, seed: int = 42) -> np.ndarray:
+    """(n_resamples, n_rows) row indices drawn with replacement, in one call."""
+    return np.random.default_rng(seed).integers(0, n_rows, size=(n_resamples, n_rows))
+
+
+def _bootstrap_model(task: str, mode: str):
+    if mode == "exact":
+        return _exact_model(task)
+    return _fast_model(task).set_params(warm_start=False, n_estimators=BOOTSTRAP_FAST_TREES)
+
+
+def _refit_resamples(template, X, y, indices, seeds) -> np.ndarray:
+    # Runs in a worker process: one refit per row of `indices`
+    out = np.empty((len(indices), X.shape[1]))
+    for i, (rows, seed) in enumerate(zip(indices, seeds)):
+        model = clone(template).set_params(random_state=int(seed))
+        out[i] = model.fit(X[rows], y[rows]).feature_importances_
+    return out
+
+
+def bootstrap_importances(chart_id: str, X, y, task: str = "regression", mode: str = "fast",
+                          n_resamples: int = BOOTSTRAP_RESAMPLES, ci: float = BOOTSTRAP_CI, scope=None):
+    """
+    Feature importances with bootstrap confidence intervals. The `mode` model is
+    refitted on `n_resamples` resamples of the rows, each with its own seed. The
+    resamples are split across the workers of the shared training pool
+    (analysis.training, bounded by its core budget). The (resamples × features)
+    distribution is cached in model_cache, so a rerun or another `ci` costs nothing.
+
+    Returns a frame with feature, mean, std, lower and upper (percentile interval),
+    and a label saying what produced it.
+    """
+    if mode not in IMPORTANCE_MODES:
+        raise ValueError(f"Unknown importance mode '{mode}', expected one of {IMPORTANCE_MODES}")
+    template = _bootstrap_model(task, mode)
+    key = model_cache.model_key(f"{chart_id}:bootstrap:{n_resamples}", template, X, y, scope)
+    samples = model_cache.lookup(key)
+    if samples is None:
+        X_values = np.asarray(X, dtype=np.float64)
+        y_values = np.asarray(y)
+        indices = resample_indices(len(X_values), n_resamples)
+        seeds = np.arange(n_resamples) + 42
+        scheduler = get_training_scheduler()
+        chunks = np.array_split(np.arange(n_resamples), min(scheduler.workers, n_resamples))
+        futures = [scheduler.run(_refit_resamples, template, X_values, y_values, indices[chunk], seeds[chunk])
+                   for chunk in chunks if len(chunk)]
+        samples = np.vstack([future.result() for future in futures])
+        model_cache.store(key, samples)
+
+    tail = (1 - ci) / 2 * 100
+    features = list(X.columns) if hasattr(X, "columns") else [f"x{i}" for i in range(samples.shape[1])]
+    interval = pd.DataFrame({
+        "feature": features,
+        "mean": samples.mean(axis=0),
+        "std": samples.std(axis=0, ddof=1) if len(samples) > 1 else np.nan,
+        "lower": np.percentile(samples, tail, axis=0),
+        "upper": np.percentile(samples, 100 - tail, axis=0),
+    })
+    label = f"{describe(template, mode)}; mean and {ci:.0%} interval of {len(samples)} bootstrap refits"
+    return interval, label
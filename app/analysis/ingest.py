@@ -0,0 +1,149 @@
+# app/analysis/ingest.py
+#
+# Daily ingestion of new GPS sessions / recovery screenings. Run from app/:
+#     python -m analysis.ingest gps path/to/gps_2024-09-01.csv
+#     python -m analysis.ingest recovery path/to/recovery_2024-09-01.csv
+# Add --precompute to publish a fresh artifact run (analysis/precompute.py) afterwards.
+# A running dashboard needs no restart: its DataStore reads only the appended rows
+# on its next request, and updates the player-day and workload tables from them.
+
+import argparse
+import json
+import os
+import threading
+import pandas as pd
+
+from analysis import sql_backend
+from analysis.data_loader import DATA_DIR, append_rows, dataset_signature, load_dataset, version_token
+from analysis.schema import SCHEMAS, apply_schema
+
+INGEST_DATASETS = ("gps", "recovery")
+WATERMARKS_PATH = os.path.join(DATA_DIR, "_watermarks.json")
+
+_ingest_lock = threading.Lock()
+
+
+# ===================== WATERMARKS =========================
+
+def _read_watermarks() -> dict:
+    try:
+        with open(WATERMARKS_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_watermarks(watermarks: dict):
+    tmp_path = f"{WATERMARKS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, WATERMARKS_PATH)
+
+
+def get_watermarks(dataset: str) -> dict:
+    """
+    Last ingested date per player for `dataset`, as {player: Timestamp}. Rebuilt
+    from the stored data (one column-projected read) if no watermark was recorded yet.
+    """
+    date_key = SCHEMAS[dataset]["date_key"]
+    marks = _read_watermarks().get(dataset)
+    if marks is None:
+        keys = load_dataset(dataset, columns=["player", date_key])
+        latest = keys.groupby("player", observed=True)[date_key].max()
+        marks = {player: str(date.date()) for player, date in latest.items()}
+    return {player: pd.Timestamp(date) for player, date in marks.items()}
+
+
+# ===================== INGESTION =========================
+
+def _read_batch(dataset: str, batch) -> pd.DataFrame:
+    schema = SCHEMAS[dataset]
+    if isinstance(batch, str):
+        df = pd.read_csv(batch, parse_dates=schema["dates"])
+    else:
+        df = batch.copy()
+        for col in schema["dates"]:
+            df[col] = pd.to_datetime(df[col])
+    return apply_schema(df, dataset)
+
+
+def ingest_batch(dataset: str, batch) -> dict:
+    """
+    Appends a daily batch (a CSV path or DataFrame with the dataset's columns) to the
+    stored `dataset`. Rows are de-duplicated on (player, date), within the batch and
+    against what is stored: anything after a player's watermark is new by construction,
+    and only rows at or before it are checked against a pushdown read of those days.
+    The CSV, its columnar cache and the SQLite mirror are extended in place, so
+    ingesting a day costs O(rows in that day). The cache records the appended part,
+    so DataStores (in this or the dashboard's process) read just those rows next time.
+
+    Returns a report: received / appended / duplicates and the updated watermarks.
+    """
+    if dataset not in INGEST_DATASETS:
+        raise ValueError(f"Incremental ingestion supports {INGEST_DATASETS}, not '{dataset}'")
+    date_key = SCHEMAS[dataset]["date_key"]
+
+    with _ingest_lock:
+        rows = _read_batch(dataset, batch)
+        received = len(rows)
+        rows = rows.dropna(subset=["player", date_key])
+        rows = rows.drop_duplicates(subset=["player", date_key], keep="last")
+
+        marks = get_watermarks(dataset)
+        last_seen = pd.to_datetime(rows["player"].astype(object).map(marks))
+        is_late = last_seen.notna() & (rows[date_key] <= last_seen)
+        late = rows[is_late]
+        if not late.empty:
+            stored = load_dataset(
+                dataset,
+                players=late["player"].astype(object).unique(),
+                date_range=(late[date_key].min(), late[date_key].max()),
+                columns=["player", date_key],
+            )
+            stored_keys = pd.MultiIndex.from_frame(stored.astype({"player": object}))
+            late_keys = pd.MultiIndex.from_frame(late[["player", date_key]].astype({"player": object}))
+            late = late[~late_keys.isin(stored_keys)]
+        new_rows = pd.concat([rows[~is_late], late]) if not late.empty else rows[~is_late]
+
+        report = {"dataset": dataset, "received": received, "appended": len(new_rows),
+                  "duplicates": received - len(new_rows)}
+        if new_rows.empty:
+            return report
+
+        old_signature = dataset_signature(dataset)
+        new_signature = append_rows(dataset, new_rows)
+        sql_backend.apply_append(
+            dataset, new_rows, version_token(old_signature), version_token(new_signature)
+        )
+
+        latest = new_rows.groupby("player", observed=True)[date_key].max()
+        for player, date in latest.items():
+            if player not in marks or date > marks[player]:
+                marks[player] = date
+        watermarks = _read_watermarks()
+        watermarks[dataset] = {player: str(date.date()) for player, date in marks.items()}
+        _write_watermarks(watermarks)
+
+        report["watermarks"] = {player: str(marks[player].date()) for player in latest.index}
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append daily batches to a stored dataset.")
+    parser.add_argument("dataset", choices=INGEST_DATASETS)
+    parser.add_argument("batches", nargs="+", help="CSV files with the dataset's columns")
+    parser.add_argument("--precompute", action="store_true",
+                        help="publish a new artifact run once the batches are in")
+    args = parser.parse_args()
+    for path in args.batches:
+        report = ingest_batch(args.dataset, path)
+        print(f"{path}: appended {report['appended']} of {report['received']} rows "
+              f"({report['duplicates']} duplicates)")
+    if args.precompute:
+        # Imported here: the precompute pulls in the chart and model modules
+        from analysis import precompute
+        print(f"Published artifact run {precompute.run()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# app/analysis/ipa_cube.py
+
+import numpy as np
+import pandas as pd
+
+from utils.lru import LRUCache
+
+ACHIEVED = "Achieved"
+IPA_CUBE_CACHE_SIZE = 4
+
+_cubes = LRUCache(max_size=IPA_CUBE_CACHE_SIZE)  # (dataset, version) -> IPACube
+
+
+class IPACube:
+    """
+    Counts of IPA goals per (priority category, area, player, tracking status), as one
+    dense integer array. Every IPA chart is a slice or a sum of it, so the goals are
+    grouped once per data version instead of once per chart and area.
+    """
+
+    DIMS = ("priority_category", "area", "player", "tracking_status")
+
+    def __init__(self, counts: np.ndarray, labels: dict, first: np.ndarray):
+        self.counts = counts      # (categories, areas, players, statuses)
+        self.labels = labels      # dim -> Index of its labels, in axis order
+        self.first = first        # (categories, areas, players): row of the first such goal
+
+    def select(self, players=None) -> "IPACube":
+        """The goals of `players` only."""
+        if players is None:
+            return self
+        keep = self.labels["player"].isin(list(players))
+        labels = {**self.labels, "player": self.labels["player"][keep]}
+        return IPACube(self.counts[:, :, keep], labels, self.first[:, :, keep])
+
+    def _category(self, category: str) -> int:
+        # Charts name categories in lower case ("performance")
+        names = self.labels["priority_category"].astype(str).str.lower()
+        matches = np.flatnonzero(names == category.lower())
+        return int(matches[0]) if len(matches) else None
+
+    def areas(self, category: str = None) -> list:
+        """Areas with at least one goal (in `category`), in the order they first appear."""
+        if category is None:
+            first = self.first.min(axis=(0, 2), initial=np.iinfo(np.intp).max)
+        else:
+            c = self._category(category)
+            if c is None:
+                return []
+            first = self.first[c].min(axis=1, initial=np.iinfo(np.intp).max)
+        present = np.flatnonzero(first < np.iinfo(np.intp).max)
+        return list(self.labels["area"][present[np.argsort(first[present], kind="stable")]])
+
+    def tracking_counts(self, category: str, area: str) -> pd.DataFrame:
+        """Goals per player (rows) and tracking status (columns) in one area of `category`."""
+        c = self._category(category)
+        a = self.labels["area"].get_loc(area)
+        counts = self.counts[c, a]
+        players, statuses = counts.sum(axis=1) > 0, counts.sum(axis=0) > 0
+        return pd.DataFrame(
+            counts[players][:, statuses].astype(float),
+            index=pd.Index(self.labels["player"][players], name="player"),
+            columns=pd.Index(self.labels["tracking_status"][statuses], name="tracking_status"),
+        )
+
+    def achievement_rates(self) -> pd.DataFrame:
+        """Share of each player's goals marked Achieved, as (player, achievement_rate), best first."""
+        by_player = self.counts.sum(axis=(0, 1))
+        totals = by_player.sum(axis=1)
+        achieved = self._achieved(by_player)
+        has_goals = totals > 0
+        rates = pd.DataFrame({
+            "player": self.labels["player"][has_goals],
+            "achievement_rate": achieved[has_goals] / totals[has_goals],
+        })
+        # Ties stay in player order, as after a groupby
+        return rates.sort_values(by="player").sort_values(by="achievement_rate", ascending=False, kind="stable")
+
+    def achieved_by_area(self, player: str) -> pd.Series:
+        """Achieved goals of `player` per area (zero for areas they have none in)."""
+        players = self.labels["player"]
+        if player not in players:
+            return pd.Series(0, index=self.labels["area"])
+        by_area = self.counts[:, :, players.get_loc(player)].sum(axis=0)
+        return pd.Series(self._achieved(by_area), index=self.labels["area"])
+
+    def _achieved(self, counts: np.ndarray) -> np.ndarray:
+        # The Achieved column of a (..., statuses) array
+        statuses = self.labels["tracking_status"]
+        if ACHIEVED not in statuses:
+            return np.zeros(counts.shape[:-1], dtype=counts.dtype)
+        return counts[..., statuses.get_loc(ACHIEVED)]
+
+
+def _codes(values: pd.Series):
+    # (codes, labels): category order for categoricals, first appearance otherwise
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), pd.Index(values.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Index(uniques)
+
+
+def ipa_cube(df: pd.DataFrame) -> IPACube:
+    """Builds the IPACube of an IPA frame in one pass: a bincount of the combined codes."""
+    codes, labels = zip(*(_codes(df[dim]) for dim in IPACube.DIMS))
+    shape = tuple(len(index) for index in labels)
+    # Goals missing any of the four keys aren't counted, as groupby drops them
+    complete = np.logical_and.reduce([c >= 0 for c in codes])
+    flat = np.ravel_multi_index([c[complete] for c in codes], shape) if np.prod(shape) else np.zeros(0, dtype=np.intp)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+    # Charts list areas in the order the (selected players') goals first mention them
+    first = np.full(shape[:3], np.iinfo(np.intp).max, dtype=np.intp)
+    np.minimum.at(first, tuple(c[complete] for c in codes[:3]), np.flatnonzero(complete))
+    return IPACube(counts, dict(zip(IPACube.DIMS, labels)), first)
+
+
+def store_cube(source, dataset: str = "ipa") -> IPACube:
+    """ipa_cube() of all of `dataset` from a DataStore or an ArtifactRun, kept per data version."""
+    key = (dataset, source.version(dataset))
+    return _cubes.get_or_create(key, lambda: ipa_cube(source.get(dataset)))
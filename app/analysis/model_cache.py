@@ -0,0 +1,87 @@
+# app/analysis/model_cache.py
+
+import hashlib
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+
+from analysis.data_loader import DERIVED_DIR, normalize_date_range, persist_best_effort
+from utils.lru import LRUCache
+
+# Fitted chart models, shared by every session and persisted across restarts
+MODEL_CACHE_DIR = os.path.join(DERIVED_DIR, "models")
+MODEL_CACHE_SIZE = 64
+
+_models = LRUCache(max_size=MODEL_CACHE_SIZE)  # key -> fitted model
+
+
+def data_fingerprint(X, y) -> str:
+    """Content hash of a training set (values, column names and target)."""
+    digest = hashlib.sha1()
+    for part in (X, y):
+        part = pd.DataFrame(part) if not isinstance(part, (pd.DataFrame, pd.Series)) else part
+        digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        if isinstance(part, pd.DataFrame):
+            digest.update(repr(list(part.columns)).encode())
+    return digest.hexdigest()
+
+
+def _scope_of(frame) -> tuple:
+    # The selected players and date range a chart's frame covers
+    if frame is None:
+        return None, None
+    players = tuple(sorted(map(str, frame["player"].dropna().unique()))) if "player" in frame else None
+    dates = (frame["date"].min(), frame["date"].max()) if "date" in frame else None
+    return players, normalize_date_range(dates)
+
+
+def model_key(chart_id: str, model, X, y, scope: pd.DataFrame = None) -> str:
+    """
+    Cache key of a fit: (chart id, data fingerprint, selected players, date range,
+    hyperparameters). `scope` is the chart's frame, from which players/dates are read.
+    """
+    players, date_range = _scope_of(scope)
+    return joblib.hash((chart_id, data_fingerprint(X, y), players, date_range, model.get_params(deep=True)))
+
+
+def _path(key: str) -> str:
+    return os.path.join(MODEL_CACHE_DIR, f"{key}.joblib")
+
+
+def lookup(key: str):
+    """The fitted model stored under `key` (memory first, then disk), or None."""
+    model = _models.get(key)
+    if model is not None:
+        return model
+    try:
+        model = joblib.load(_path(key))
+    except Exception:
+        return None
+    _models.put(key, model)
+    return model
+
+
+def store(key: str, model):
+    """Keeps a fitted model under `key` in memory and on disk."""
+    _models.put(key, model)
+    persist_best_effort(_path(key), lambda path: joblib.dump(model, path))
+
+
+def fit_cached(chart_id: str, model, X, y, scope: pd.DataFrame = None):
+    """
+    Returns `model` fitted on (X, y), reusing an identical earlier fit from this
+    process or a previous run. `model` itself is left unfitted.
+    """
+    key = model_key(chart_id, model, X, y, scope)
+    fitted = lookup(key)
+    if fitted is None:
+        fitted = clone(model).fit(X, y)
+        store(key, fitted)
+    return fitted
+
+
+def cached_importances(chart_id: str, model, X, y, scope: pd.DataFrame = None) -> np.ndarray:
+    """feature_importances_ of fit_cached(...)."""
+    return fit_cached(chart_id, model, X, y, scope).feature_importances_
@@ -0,0 +1,204 @@
+# app/analysis/precompute.py
+#
+# Offline precompute of everything the dashboard pages show, published to the
+# artifact store (analysis/artifacts.py). Run from app/, nightly or after ingestion:
+#     python -m analysis.precompute
+# and serve the published run with:
+#     VIZATHON_ARTIFACTS=1 streamlit run vizathon_dashboard.py
+
+import argparse
+import time
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from analysis import artifacts
+from analysis.clustering import update_clusters
+from analysis.correlation import moment_grain, store_moments
+from analysis.data_loader import DATASETS
+from analysis.data_store import get_data_store
+from analysis.importance import IMPORTANCE_MODES, feature_importances
+from analysis.ipa_cube import store_cube
+from analysis.model_cache import cached_importances, fit_cached
+from analysis.regression import store_pair_stats
+from analysis.schema import SCHEMAS
+from charts import capability_charts, gps_charts, ipa_charts, recovery_charts
+from feature_engineering.player_day import PLAYER_DAY, attach_player_day
+from feature_engineering.workload import WORKLOAD
+
+# Frames the pages plot, snapshotted into every run
+ARTIFACT_FRAMES = ("gps", PLAYER_DAY, WORKLOAD, "recovery", "capability", "ipa")
+# Ranking charts: dataset -> metric averaged per player
+RANKINGS = {
+    "recovery": "emboss_baseline_score",
+    "capability": "BenchmarkPct",
+    "ipa": "achievement_rate",
+}
+# Recovery heatmaps: artifact name -> features correlated
+HEATMAP_MOMENTS = {
+    "moments.completeness": recovery_charts.COMPLETENESS_HEATMAP_FEATURES,
+    "moments.composite": recovery_charts.COMPOSITE_HEATMAP_FEATURES,
+}
+PRECOMPUTED_LABEL = "precomputed over all players and dates"
+
+
+# ===================== HOME =========================
+
+def latest_acwr_summary(store) -> pd.Series:
+    """Highest latest-day training load ACWRs, by player."""
+    workload_df = store.get(WORKLOAD)
+    return (
+        workload_df.sort_values("date").groupby("player").tail(1)
+        .set_index("player")["training_load_acwr"].sort_values(ascending=False).head()
+    )
+
+
+def home_summaries(store) -> dict:
+    """The top-5 player summaries show_home() charts, computed with pandas."""
+    recovery_df = store.get("recovery")
+    capability_df = store.get("capability")
+    player_day = store.get(PLAYER_DAY)
+
+    # Training load on GPS session days, from the player-day table
+    gps_days = player_day.dropna(subset=["distance"])
+    return {
+        "gps": gps_days.groupby("player", observed=True)["training_load"].mean().sort_values(ascending=False).head(),
+        "recovery": recovery_df.groupby("player", observed=True)["emboss_baseline_score"].mean().sort_values(ascending=False).head(),
+        "capability": capability_df.groupby("player", observed=True)["BenchmarkPct"].mean().sort_values(ascending=False).head(),
+        "ipa": store_cube(store).achievement_rates().set_index("player")["achievement_rate"].head(),
+        "acwr": latest_acwr_summary(store),
+    }
+
+
+def _summaries_frame(store) -> pd.DataFrame:
+    return pd.concat([
+        pd.DataFrame({"summary": name, "player": series.index.astype(object), "value": series.to_numpy(dtype=float)})
+        for name, series in home_summaries(store).items()
+    ], ignore_index=True)
+
+
+# ===================== RANKINGS =========================
+
+def _rankings_frame(store) -> pd.DataFrame:
+    # Per-(player, date) sums and counts, so a page's player/date filter only adds them up
+    parts = []
+    for dataset, metric in RANKINGS.items():
+        df = store.get(dataset)
+        if metric == "achievement_rate":
+            values = (df["tracking_status"] == "Achieved").astype(float)
+        else:
+            values = df[metric].astype(float)
+        frame = pd.DataFrame({
+            "player": df["player"].astype(object),
+            "date": df[SCHEMAS[dataset]["date_key"]],
+            "value": values,
+        })
+        totals = frame.groupby(["player", "date"], dropna=False)["value"].agg(total="sum", count="count")
+        parts.append(totals.reset_index().assign(dataset=dataset, metric=metric))
+    return pd.concat(parts, ignore_index=True)
+
+
+# ===================== IMPORTANCES =========================
+
+def _importance_rows(chart_id: str, importances: pd.Series, mode: str, label: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        "chart_id": chart_id,
+        "mode": mode,
+        "feature": importances.index.astype(str),
+        "importance": importances.to_numpy(dtype=float),
+        "label": f"{label}; {PRECOMPUTED_LABEL}",
+    })
+
+
+def _importances_frame(store) -> pd.DataFrame:
+    rows = []
+
+    gps_df = store.get(PLAYER_DAY).dropna(subset=["distance", "training_load"])
+    recovery_df = store.get("recovery")
+    for mode in IMPORTANCE_MODES:
+        for chart_id in gps_charts.GPS_RADARS:
+            X, y = gps_charts.radar_training_set(gps_df, chart_id)
+            importances, label = feature_importances(chart_id, X, y, mode=mode, scope=gps_df)
+            rows.append(_importance_rows(chart_id, pd.Series(importances, index=X.columns), mode, label))
+        for chart_id in recovery_charts.RECOVERY_RADARS:
+            X, y, scope = recovery_charts.radar_training_set(recovery_df, chart_id)
+            importances, label = feature_importances(chart_id, X, y, mode=mode, scope=scope)
+            rows.append(_importance_rows(chart_id, pd.Series(importances, index=X.columns), mode, label))
+
+    ipa_df = store.get("ipa")
+    for chart_id in ipa_charts.IPA_RADARS:
+        X, y, scope = ipa_charts.radar_training_set(ipa_df, chart_id)
+        if scope.empty:
+            continue
+        model = RandomForestClassifier(random_state=42)
+        importances = cached_importances(chart_id, model, X, y, scope=scope)
+        rows.append(_importance_rows(chart_id, pd.Series(importances, index=X.columns), "exact",
+                                     type(model).__name__))
+
+    cap_df = attach_player_day(store.get("capability"), store.indexed(PLAYER_DAY), ["is_md_minus_1", "position"])
+    for movement in capability_charts.MOVEMENT_TYPES:
+        job = capability_charts.movement_importance_job(cap_df, movement)
+        if job is None:
+            continue
+        model = fit_cached(*job)
+        rows.append(_importance_rows(job[0], capability_charts.movement_importances(model), "exact",
+                                     type(model.named_steps["rf"]).__name__))
+
+    return pd.concat(rows, ignore_index=True)
+
+
+# ===================== RUN =========================
+
+def build_artifacts(store=None, timings: dict = None) -> dict:
+    """Computes every artifact a run publishes, as name -> DataFrame or object."""
+    store = store or get_data_store()
+    timings = {} if timings is None else timings
+    store.preload()
+
+    steps = {name: (lambda name=name: store.get(name)) for name in ARTIFACT_FRAMES}
+    steps.update({
+        "summaries": lambda: _summaries_frame(store),
+        "rankings": lambda: _rankings_frame(store),
+        "importances": lambda: _importances_frame(store),
+        "trendline_stats": lambda: store_pair_stats(
+            PLAYER_DAY, gps_charts.GPS_TRENDLINE_PAIRS, prepare=gps_charts.gps_ratios, name="gps_ratios"
+        ),
+        "clusters": update_clusters,
+    })
+    steps.update({
+        name: (lambda features=features: store_moments("recovery", features, by=moment_grain(), dropna=True))
+        for name, features in HEATMAP_MOMENTS.items()
+    })
+
+    results = {}
+    for name, compute in steps.items():
+        start = time.perf_counter()
+        results[name] = compute()
+        timings[name] = time.perf_counter() - start
+    return results
+
+
+def run(keep: int = artifacts.ARTIFACT_KEEP) -> str:
+    """Computes and publishes one run; returns its id."""
+    store = get_data_store()
+    timings = {}
+    results = build_artifacts(store, timings)
+    sources = {name: store.version(name) for name in DATASETS + (PLAYER_DAY, WORKLOAD)}
+    date_keys = {name: SCHEMAS[name]["date_key"] if name in SCHEMAS else "date"
+                 for name in ARTIFACT_FRAMES + ("clusters",)}
+    run_id = artifacts.publish(results, sources, date_keys, keep=keep)
+    for name, secs in timings.items():
+        print(f"{name}: {secs * 1000:.0f} ms")
+    return run_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the dashboard's analytics into the artifact store.")
+    parser.add_argument("--keep", type=int, default=artifacts.ARTIFACT_KEEP,
+                        help="published runs to keep on disk (default: %(default)s)")
+    args = parser.parse_args()
+    run_id = run(keep=max(args.keep, 1))
+    print(f"Published artifact run {run_id} to {artifacts.ARTIFACT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# app/analysis/regression.py
+
+import threading
+import numpy as np
+import pandas as pd
+
+from analysis.data_loader import filter_frame
+from analysis.data_store import get_data_store
+
+
+class LinearStats:
+    """
+    Sufficient statistics of the least-squares fit y ~ 1 + X, per group: XᵀX, Xᵀy,
+    yᵀy, the row count and the range of each predictor, over rows where X and y are
+    all present and finite.
+
+    The statistics are additive, so a subset of groups (`select()`), a coarser
+    grouping (`rollup()`) or newly arrived rows (`append()`) never revisit old rows.
+    """
+
+    def __init__(self, keys: pd.DataFrame, x_cols, y_col: str, xtx, xty, yty, n, x_min, x_max):
+        self.keys = keys.reset_index(drop=True)   # one row per group
+        self.x_cols = list(x_cols)
+        self.y_col = y_col
+        self.xtx, self.xty, self.yty, self.n = xtx, xty, yty, n   # (g, k+1, k+1), (g, k+1), (g,), (g,)
+        self.x_min, self.x_max = x_min, x_max                      # (g, k)
+
+    def _take(self, keys, index):
+        return LinearStats(keys, self.x_cols, self.y_col, self.xtx[index], self.xty[index],
+                           self.yty[index], self.n[index], self.x_min[index], self.x_max[index])
+
+    def select(self, mask) -> "LinearStats":
+        """The groups where `mask` (aligned to `keys`) is true."""
+        mask = np.asarray(mask, dtype=bool)
+        return self._take(self.keys[mask], mask)
+
+    def append(self, other: "LinearStats") -> "LinearStats":
+        """Groups of both (e.g. stats of days that arrived since `self` was built)."""
+        keys = pd.concat([self.keys, other.keys], ignore_index=True)
+        return LinearStats(
+            keys, self.x_cols, self.y_col,
+            *(np.concatenate([a, b]) for a, b in (
+                (self.xtx, other.xtx), (self.xty, other.xty), (self.yty, other.yty),
+                (self.n, other.n), (self.x_min, other.x_min), (self.x_max, other.x_max),
+            )),
+        )
+
+    def rollup(self, by=()) -> "LinearStats":
+        """Sums the statistics over every key not in `by` (all of them by default)."""
+        codes, keys = _group_codes(self.keys, by)
+        g = len(keys)
+        k = len(self.x_cols)
+        xtx = np.zeros((g, k + 1, k + 1))
+        xty = np.zeros((g, k + 1))
+        yty = np.zeros(g)
+        n = np.zeros(g)
+        x_min = np.full((g, k), np.inf)
+        x_max = np.full((g, k), -np.inf)
+        np.add.at(xtx, codes, self.xtx)
+        np.add.at(xty, codes, self.xty)
+        np.add.at(yty, codes, self.yty)
+        np.add.at(n, codes, self.n)
+        np.minimum.at(x_min, codes, self.x_min)
+        np.maximum.at(x_max, codes, self.x_max)
+        return LinearStats(keys, self.x_cols, self.y_col, xtx, xty, yty, n, x_min, x_max)
+
+
+def _group_codes(df: pd.DataFrame, by):
+    by = list(by)
+    if not by:
+        return np.zeros(len(df), dtype=np.intp), pd.DataFrame(index=[0])
+    codes, uniques = pd.MultiIndex.from_frame(df[by]).factorize(sort=True)
+    return codes, uniques.to_frame(index=False, name=by)
+
+
+def linear_stats(df: pd.DataFrame, x_cols, y_col: str, by=()) -> LinearStats:
+    """LinearStats of `df` per `by` group, in one pass over the rows."""
+    x_cols = list(x_cols)
+    X = df[x_cols].to_numpy(dtype=np.float64)
+    y = df[y_col].to_numpy(dtype=np.float64)
+    complete = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    if by:
+        complete &= df[list(by)].notna().all(axis=1).to_numpy()
+    df, X, y = df[complete], X[complete], y[complete]
+
+    codes, keys = _group_codes(df, by)
+    order = np.argsort(codes, kind="stable")
+    starts = np.searchsorted(codes[order], np.arange(len(keys)))
+    Z = np.column_stack([np.ones(len(X)), X])[order]
+    X, y = X[order], y[order]
+    k = len(x_cols)
+    if len(Z) == 0:
+        g = len(keys) if by else 1
+        return LinearStats(keys, x_cols, y_col, np.zeros((g, k + 1, k + 1)), np.zeros((g, k + 1)),
+                           np.zeros(g), np.zeros(g), np.full((g, k), np.inf), np.full((g, k), -np.inf))
+
+    # Every group has at least one row, so reduceat sums exactly its rows
+    xtx = np.add.reduceat(Z[:, :, None] * Z[:, None, :], starts)
+    xty = np.add.reduceat(Z * y[:, None], starts)
+    yty = np.add.reduceat(y * y, starts)
+    n = np.add.reduceat(np.ones(len(y)), starts)
+    x_min = np.minimum.reduceat(X, starts)
+    x_max = np.maximum.reduceat(X, starts)
+    return LinearStats(keys, x_cols, y_col, xtx, xty, yty, n, x_min, x_max)
+
+
+def solve(stats_list) -> list:
+    """
+    Coefficients (intercept first) and R² of every group of every LinearStats, from
+    one batched solve of the stacked normal equations. Returns one (coef, r2) pair of
+    arrays per input; NaN where a group has too few rows or a constant predictor.
+    """
+    xtx = np.concatenate([s.xtx for s in stats_list])
+    xty = np.concatenate([s.xty for s in stats_list])
+    yty = np.concatenate([s.yty for s in stats_list])
+    n = np.concatenate([s.n for s in stats_list])
+
+    # Well-posed systems only; the rest stay NaN
+    k1 = xtx.shape[1]
+    ok = n >= k1
+    if ok.any():
+        ok[ok] = np.linalg.matrix_rank(xtx[ok]) == k1
+    coef = np.full(xty.shape, np.nan)
+    if ok.any():
+        coef[ok] = np.linalg.solve(xtx[ok], xty[ok][:, :, None])[:, :, 0]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sse = yty - 2 * np.einsum("gi,gi->g", coef, xty) + np.einsum("gi,gij,gj->g", coef, xtx, coef)
+        sst = yty - xty[:, 0] ** 2 / n
+        r2 = 1 - sse / sst
+
+    out, start = [], 0
+    for s in stats_list:
+        stop = start + len(s.n)
+        out.append((coef[start:stop], r2[start:stop]))
+        start = stop
+    return out
+
+
+def trendlines(stats_list) -> list:
+    """
+    Line coordinates for single-predictor LinearStats (one group each, e.g. after
+    rollup()), fitted in one batched solve: dicts with x, y (the two end points over
+    the data's x range), slope, intercept, r2 and n; None where no line can be fitted.
+    """
+    lines = []
+    for s, (coef, r2) in zip(stats_list, solve(stats_list)):
+        intercept, slope = coef[0]
+        if np.isnan(slope):
+            lines.append(None)
+            continue
+        x = np.array([s.x_min[0, 0], s.x_max[0, 0]])
+        lines.append({"x": x, "y": intercept + slope * x, "slope": slope, "intercept": intercept,
+                      "r2": r2[0], "n": int(s.n[0])})
+    return lines
+
+
+# ===================== DATASTORE =========================
+
+_pair_stats = {}  # (dataset, name, pairs) -> (version, frame row count, [LinearStats])
+_pair_stats_lock = threading.Lock()
+
+
+def store_pair_stats(dataset: str, pairs, prepare=None, name: str = None, date_key: str = "date") -> list:
+    """
+    Per-(player, date) LinearStats of y ~ x for each (x, y) in `pairs` over a DataStore
+    dataset, after `prepare(df)` (a row-wise function adding the x / y columns; give it
+    a `name`). Kept per dataset version; when new days are appended only their rows are
+    added (the statistics of days already covered are reused as-is).
+    """
+    store = get_data_store()
+    pairs = [tuple(pair) for pair in pairs]
+    key = (dataset, name, tuple(pairs))
+    version = store.version(dataset)
+    with _pair_stats_lock:
+        cached = _pair_stats.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[2]
+
+    df = store.get(dataset)
+    stats = None
+    if cached is not None:
+        # Online update: only rows whose (player, date) the cached stats don't cover
+        covered = pd.MultiIndex.from_frame(cached[2][0].keys[["player", date_key]].astype({"player": object}))
+        keys = pd.MultiIndex.from_frame(df[["player", date_key]].astype({"player": object}))
+        is_new = ~keys.isin(covered)
+        if len(df) - is_new.sum() == cached[1]:
+            new_rows = df[is_new]
+            if prepare is not None:
+                new_rows = prepare(new_rows)
+            stats = [old.append(_player_date_stats(new_rows, x, y, date_key))
+                     for old, (x, y) in zip(cached[2], pairs)]
+    if stats is None:
+        frame = prepare(df) if prepare is not None else df
+        stats = [_player_date_stats(frame, x, y, date_key) for x, y in pairs]
+
+    with _pair_stats_lock:
+        _pair_stats[key] = (version, len(df), stats)
+    return stats
+
+
+def _player_date_stats(df, x, y, date_key) -> LinearStats:
+    # Groups for every (player, date) in df -- including rows without a complete pair --
+    # so the covered keys always match the frame's rows.
+    keys = df[["player", date_key]].drop_duplicates().reset_index(drop=True)
+    stats = linear_stats(df, [x], y, by=["player", date_key])
+    missing = ~pd.MultiIndex.from_frame(keys).isin(pd.MultiIndex.from_frame(stats.keys))
+    if missing.any():
+        extra = keys[missing]
+        g = len(extra)
+        empty = LinearStats(extra, [x], y, np.zeros((g, 2, 2)), np.zeros((g, 2)), np.zeros(g),
+                            np.zeros(g), np.full((g, 1), np.inf), np.full((g, 1), -np.inf))
+        stats = stats.append(empty)
+    return stats
+
+
+def filtered_trendlines(stats_list, players=None, date_range=None, date_key: str = "date") -> list:
+    """Trendlines of store_pair_stats() over the selected players and inclusive date range."""
+    lines_input = []
+    for stats in stats_list:
+        view = filter_frame(stats.keys, date_key, players, date_range)
+        lines_input.append(stats.select(stats.keys.index.isin(view.index)).rollup())
+    return trendlines(lines_input)
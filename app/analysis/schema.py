@@ -0,0 +1,143 @@
+# app/analysis/schema.py
+
+import threading
+import numpy as np
+import pandas as pd
+
+# Bump whenever a dataset's schema changes so cached columnar copies are rebuilt.
+SCHEMA_VERSION = 1
+
+ACCEL_COUNTS = ["accel_decel_over_2_5", "accel_decel_over_3_5", "accel_decel_over_4_5"]
+HR_ZONE_COUNTS = [f"hr_zone_{i}_hms" for i in range(1, 6)]
+RECOVERY_METRICS = [
+    f"{area}_{kind}"
+    for area in ["Bio", "Msk_joint_range", "Msk_load_tolerance", "Subjective", "Soreness", "Sleep"]
+    for kind in ["completeness", "composite"]
+] + ["emboss_baseline_score"]
+
+# Each dataset declares its source file, the date column range filters apply to
+# ("date_key"), all date columns, string dimensions loaded as categoricals, and
+# metric columns with the narrowest dtype that holds them.
+# "player" is always cast to the shared player dictionary (see player_dtype()).
+SCHEMAS = {
+    "gps": {
+        "file": "gps_data.csv",
+        "date_key": "date",
+        "dates": ["date"],
+        "categories": ["session_type", "opposition_code", "opposition_full", "season"],
+        "float32": ["distance", "distance_over_21", "distance_over_24", "distance_over_27",
+                    "day_duration", "peak_speed"],
+        "int16": ACCEL_COUNTS + HR_ZONE_COUNTS,
+    },
+    "recovery": {
+        "file": "recovery_status.csv",
+        "date_key": "date",
+        "dates": ["date"],
+        "categories": [],
+        "float32": RECOVERY_METRICS,
+        "int16": [],
+    },
+    "capability": {
+        "file": "physical_capability.csv",
+        "date_key": "date",
+        "dates": ["date"],
+        "categories": ["movement", "quality", "expression"],
+        "float32": ["BenchmarkPct"],
+        "int16": [],
+    },
+    "ipa": {
+        "file": "individual_priority_areas.csv",
+        "date_key": "target_set_date",
+        "dates": ["target_set_date", "review_date"],
+        "categories": ["priority_category", "tracking_status"],
+        "float32": [],
+        "int16": [],
+    },
+    # Capability tests joined with the same day's recovery screening (prebuilt CSV)
+    "capability_recovery": {
+        "file": "advanced_capability_recovery_merged.csv",
+        "date_key": "date",
+        "dates": ["date"],
+        "categories": ["movement", "quality", "expression"],
+        "float32": ["BenchmarkPct"] + RECOVERY_METRICS,
+        "int16": ["md_minus_1"],
+    },
+    "calendar": {
+        "file": "chelsea_fc_calendar.csv",
+        "date_key": "event_date",
+        "dates": ["event_date"],
+        "categories": ["event_type", "formation", "position", "playing_status"],
+        "float32": [],
+        "int16": ["training_load"],
+    },
+}
+
+_player_categories = []
+_player_lock = threading.Lock()
+
+
+def player_dtype(players=()) -> pd.CategoricalDtype:
+    """
+    Returns the categorical dtype shared by the 'player' column of every dataset,
+    first extending it with any names in `players` it hasn't seen yet.
+    Categories are only ever appended, so codes stay stable across datasets and
+    merges on 'player' keep the categorical instead of falling back to strings.
+    """
+    with _player_lock:
+        known = set(_player_categories)
+        unseen = sorted({p for p in players if isinstance(p, str)} - known)
+        _player_categories.extend(unseen)
+        return pd.CategoricalDtype(list(_player_categories))
+
+
+def apply_schema(df: pd.DataFrame, dataset: str) -> pd.DataFrame:
+    """
+    Casts a freshly loaded frame to the dtypes declared in SCHEMAS[dataset].
+    Integer columns that contain missing values fall back to float32.
+    """
+    schema = SCHEMAS[dataset]
+    casts = {}
+    if "player" in df.columns:
+        casts["player"] = player_dtype(df["player"].dropna().unique())
+    for col in schema["categories"]:
+        if col in df.columns:
+            casts[col] = "category"
+    for col in schema["float32"]:
+        if col in df.columns:
+            casts[col] = np.float32
+    for col in schema["int16"]:
+        if col in df.columns:
+            casts[col] = np.float32 if df[col].isna().any() else np.int16
+    return df.astype(casts)
+
+
+def memory_usage_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def concat_typed(frames: list) -> pd.DataFrame:
+    """
+    Concatenates frames of one dataset without losing categoricals: each categorical
+    column is first brought to the union of the frames' categories (the shared
+    dictionary for 'player'), since pandas falls back to strings when they differ.
+    """
+    first = frames[0]
+    casts = {}
+    for col in first.columns:
+        if not isinstance(first[col].dtype, pd.CategoricalDtype):
+            continue
+        if col == "player":
+            casts[col] = player_dtype(v for f in frames for v in f[col].cat.categories)
+            continue
+        categories = list(first[col].cat.categories)
+        seen = set(categories)
+        for frame in frames[1:]:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                values = frame[col].cat.categories
+            else:
+                values = frame[col].dropna().unique()
+            new = [v for v in values if v not in seen]
+            categories.extend(new)
+            seen.update(new)
+        casts[col] = pd.CategoricalDtype(categories)
+    return pd.concat([frame.astype(casts) for frame in frames], ignore_index=True)
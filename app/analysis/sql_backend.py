@@ -0,0 +1,197 @@
+# app/analysis/sql_backend.py
+
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+
+from analysis.data_loader import DATA_DIR, normalize_date_range
+from analysis.data_store import get_data_store
+from analysis.schema import SCHEMAS, apply_schema
+
+# Optional embedded backend: a local SQLite file next to the CSVs, no server.
+# Enable with VIZATHON_SQL_BACKEND=1; pages fall back to pandas otherwise.
+DB_PATH = os.path.normpath(os.path.join(DATA_DIR, "..", "vizathon.sqlite"))
+SQL_DATASETS = ("gps", "recovery", "capability", "ipa", "calendar")
+
+_sync_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return os.environ.get("VIZATHON_SQL_BACKEND", "0") == "1"
+
+
+@contextmanager
+def _connect():
+    # One short-lived connection per call: cheap for a local file and safe across
+    # the threads Streamlit runs sessions on. Autocommit mode, so table swaps can be
+    # wrapped in explicit BEGIN/COMMIT.
+    con = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    try:
+        yield con
+    finally:
+        con.close()
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _table_columns(con: sqlite3.Connection, dataset: str) -> list:
+    return [row[1] for row in con.execute(f"PRAGMA table_info({_quote(dataset)})")]
+
+
+def _checked_columns(con: sqlite3.Connection, dataset: str, columns) -> list:
+    known = _table_columns(con, dataset)
+    unknown = [c for c in columns if c not in known]
+    if unknown:
+        raise KeyError(f"Unknown column(s) for {dataset}: {unknown}")
+    return list(columns)
+
+
+def sync(datasets=SQL_DATASETS):
+    """
+    Brings the SQLite copy of each dataset in line with the DataStore. A dataset is
+    re-ingested only when its store version changed; the new table is built under a
+    temporary name and swapped in inside one transaction, with an index on
+    (player, date) so filtered slices and per-player aggregates are index scans.
+    """
+    store = get_data_store()
+    with _sync_lock, _connect() as con:
+        con.execute("CREATE TABLE IF NOT EXISTS _ingest_meta (dataset TEXT PRIMARY KEY, version TEXT)")
+        for dataset in datasets:
+            version = store.version(dataset)
+            row = con.execute("SELECT version FROM _ingest_meta WHERE dataset = ?", (dataset,)).fetchone()
+            if row is not None and row[0] == version:
+                continue
+
+            df = store.get(dataset)
+            staging = f"{dataset}__staging"
+            df.to_sql(staging, con, if_exists="replace", index=False)
+            date_key = SCHEMAS[dataset]["date_key"]
+            # Index names are schema-global, so each build gets a fresh one
+            con.execute(
+                f"CREATE INDEX {_quote(f'ix_{dataset}_player_date_{uuid.uuid4().hex[:12]}')} "
+                f"ON {_quote(staging)} (player, {_quote(date_key)})"
+            )
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute(f"DROP TABLE IF EXISTS {_quote(dataset)}")
+                con.execute(f"ALTER TABLE {_quote(staging)} RENAME TO {_quote(dataset)}")
+                con.execute(
+                    "INSERT OR REPLACE INTO _ingest_meta (dataset, version) VALUES (?, ?)",
+                    (dataset, version),
+                )
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+
+
+def _where(dataset: str, players, date_range, alias: str = ""):
+    prefix = f"{alias}." if alias else ""
+    date_key = prefix + _quote(SCHEMAS[dataset]["date_key"])
+    start, end = normalize_date_range(date_range)
+    clauses, params = [], []
+    if players is not None:
+        players = list(players)
+        if not players:
+            return "WHERE 0", []
+        clauses.append(f"{prefix}player IN ({', '.join('?' * len(players))})")
+        params.extend(players)
+    if start is not None:
+        clauses.append(f"{date_key} >= ?")
+        params.append(str(start))
+    if end is not None:
+        clauses.append(f"{date_key} <= ?")
+        params.append(str(end))
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def query_slice(dataset: str, players=None, date_range=None, columns=None) -> pd.DataFrame:
+    """Filtered rows of `dataset`, typed as the pandas loaders type them."""
+    sync([dataset])
+    where, params = _where(dataset, players, date_range)
+    with _connect() as con:
+        selected = _checked_columns(con, dataset, columns) if columns else _table_columns(con, dataset)
+        sql = f"SELECT {', '.join(map(_quote, selected))} FROM {_quote(dataset)} {where}"
+        df = pd.read_sql_query(sql, con, params=params)
+    for col in SCHEMAS[dataset]["dates"]:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    return apply_schema(df, dataset)
+
+
+def player_means(dataset: str, metric: str, players=None, date_range=None) -> pd.DataFrame:
+    """
+    Mean of `metric` per player with its descending rank, computed in the engine.
+    Returns columns: player, <metric>, rank (best first).
+    """
+    sync([dataset])
+    where, params = _where(dataset, players, date_range)
+    with _connect() as con:
+        (metric,) = _checked_columns(con, dataset, [metric])
+        sql = (
+            f"SELECT player, AVG({_quote(metric)}) AS {_quote(metric)}, "
+            f"RANK() OVER (ORDER BY AVG({_quote(metric)}) DESC) AS rank "
+            f"FROM {_quote(dataset)} {where} GROUP BY player ORDER BY rank"
+        )
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def achievement_rates(players=None) -> pd.DataFrame:
+    """Share of IPA goals marked 'Achieved' per player, best first."""
+    sync(["ipa"])
+    where, params = _where("ipa", players, None)
+    with _connect() as con:
+        sql = (
+            "SELECT player, AVG(tracking_status = 'Achieved') AS achievement_rate "
+            f"FROM ipa {where} GROUP BY player ORDER BY achievement_rate DESC"
+        )
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def training_load_means(players=None, date_range=None) -> pd.DataFrame:
+    """Mean calendar training_load over each player's GPS sessions, best first."""
+    sync(["gps", "calendar"])
+    where, params = _where("gps", players, date_range, alias="g")
+    with _connect() as con:
+        sql = (
+            "SELECT g.player, AVG(c.training_load) AS training_load FROM gps g "
+            "JOIN calendar c ON c.player = g.player AND c.event_date = g.\"date\" "
+            f"{where} GROUP BY g.player ORDER BY training_load DESC"
+        )
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def apply_append(dataset: str, rows: pd.DataFrame, old_version: str, new_version: str):
+    """
+    Inserts rows just appended to `dataset`'s source into its table, provided the
+    table is at `old_version`; otherwise the next sync() re-ingests it as usual.
+    """
+    if not os.path.exists(DB_PATH):
+        return
+    with _sync_lock, _connect() as con:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            row = con.execute("SELECT version FROM _ingest_meta WHERE dataset = ?", (dataset,)).fetchone()
+            if row is None or row[0] != old_version:
+                con.execute("ROLLBACK")
+                return
+            # Plain INSERTs: DataFrame.to_sql would commit mid-transaction
+            columns = _table_columns(con, dataset)
+            records = rows[columns].astype(object).where(rows[columns].notna(), None)
+            for col in SCHEMAS[dataset]["dates"]:
+                records[col] = rows[col].dt.strftime("%Y-%m-%d %H:%M:%S").astype(object)
+            con.executemany(
+                f"INSERT INTO {_quote(dataset)} ({', '.join(map(_quote, columns))}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                records.itertuples(index=False, name=None),
+            )
+            con.execute("UPDATE _ingest_meta SET version = ? WHERE dataset = ?", (new_version, dataset))
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
@@ -0,0 +1,111 @@
+# app/analysis/training.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from sklearn.base import clone
+
+from analysis import model_cache
+
+# Cores the dashboard may use for model fits, across all sessions.
+# Override with VIZATHON_CORE_BUDGET=<n>.
+CORE_BUDGET = int(os.environ.get("VIZATHON_CORE_BUDGET", 0)) or os.cpu_count() or 1
+# Fits of one page run side by side; the rest of the budget goes to each forest's n_jobs
+MAX_WORKERS = 4
+
+
+def in_training_worker() -> bool:
+    """
+    True in the pool's worker processes. Spawned workers re-run the parent's __main__
+    as __mp_main__ while starting -- under Streamlit, the page script -- so module-level
+    Streamlit calls check this to stay out of them.
+    """
+    return multiprocessing.current_process().name != "MainProcess"
+
+
+def _fit(model, X, y):
+    # Runs in a worker process
+    return model.fit(X, y)
+
+
+def _with_n_jobs(model, n_jobs: int):
+    params = {name: n_jobs for name in model.get_params(deep=True) if name.split("__")[-1] == "n_jobs"}
+    return model.set_params(**params) if params else model
+
+
+class TrainingScheduler:
+    """
+    Fits chart models in a process pool so a page can render placeholders at once and
+    fill each chart as its model completes.
+
+    `submit()` returns a Future of the fitted model. Fits already in model_cache come
+    back as completed futures; identical fits requested while one is in flight (e.g.
+    by two sessions on the same view) share its future. Finished fits are stored in
+    model_cache, so the next rerun never reaches the pool.
+    """
+
+    def __init__(self, core_budget: int = CORE_BUDGET, max_workers: int = MAX_WORKERS):
+        self.workers = max(1, min(core_budget, max_workers))
+        self.threads_per_fit = max(1, core_budget // self.workers)
+        self._pool = None
+        self._in_flight = {}  # model_cache key -> Future
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: Streamlit's script threads make fork unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(self, chart_id: str, model, X, y, scope=None) -> Future:
+        # n_jobs doesn't change the fitted model, so it isn't part of the key
+        key = model_cache.model_key(chart_id, model, X, y, scope)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            fitted = model_cache.lookup(key)
+            if fitted is not None:
+                future = Future()
+                future.set_result(fitted)
+                return future
+
+            job = _with_n_jobs(clone(model), self.threads_per_fit)
+            future = self._executor().submit(_fit, job, X, y)
+            self._in_flight[key] = future
+
+        def _done(done: Future):
+            if not done.cancelled() and done.exception() is None:
+                model_cache.store(key, done.result())
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+        future.add_done_callback(_done)
+        return future
+
+    def run(self, fn, *args) -> Future:
+        """Runs a picklable `fn(*args)` in the pool; unlike submit(), nothing is cached."""
+        with self._lock:
+            return self._executor().submit(fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_scheduler = None
+_scheduler_guard = threading.Lock()
+
+
+def get_training_scheduler() -> TrainingScheduler:
+    """Returns the TrainingScheduler shared by every session in this process."""
+    global _scheduler
+    with _scheduler_guard:
+        if _scheduler is None:
+            _scheduler = TrainingScheduler()
+        return _scheduler
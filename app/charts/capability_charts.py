@@ -6,15 +6,22 @@ from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
+from analysis.model_cache import fit_cached
+from charts.downsampling import downsample_lines, render_mode
+from charts.figure_cache import cached_figure
+
+MOVEMENT_TYPES = ["Agility", "Sprint", "Upper Body", "Jump"]
+
 # ========= 1. Feature Importance by Movement Type =========
 
-def plot_feature_importance_by_movement(df: pd.DataFrame, movement_type: str):
-    st.markdown(f"##### Feature Importance for BenchmarkPct — {movement_type}")
-    
+def movement_importance_job(df: pd.DataFrame, movement_type: str):
+    """
+    The fit behind plot_feature_importance_by_movement(), as (chart_id, model, X, y, scope)
+    for model_cache.fit_cached() / TrainingScheduler.submit(); None if there is no data.
+    """
     filtered_df = df[df["movement"].str.lower() == movement_type.lower()].dropna(subset=["BenchmarkPct"])
     if filtered_df.empty:
-        st.warning(f"No data available for movement: {movement_type}")
-        return
+        return None
     
     features = ["quality", "expression", "position", "is_md_minus_1"]
     target = "BenchmarkPct"
@@ -28,29 +35,55 @@ def plot_feature_importance_by_movement(df: pd.DataFrame, movement_type: str):
         ("pre", preprocessor),
         ("rf", RandomForestRegressor(random_state=42))
     ])
+    chart_id = f"capability.importance.{movement_type.lower()}"
+    return chart_id, model, filtered_df[features], filtered_df[target], filtered_df
 
-    model.fit(filtered_df[features], filtered_df[target])
+def movement_importances(model) -> pd.Series:
+    """Importances of a fitted movement_importance_job() model, by encoded feature."""
     rf = model.named_steps["rf"]
 
     # Get feature names from transformer
     ohe = model.named_steps["pre"].named_transformers_["cat"]
     encoded_labels = ohe.get_feature_names_out(["quality", "expression", "position"])
     final_features = list(encoded_labels) + ["is_md_minus_1"]
+    return pd.Series(rf.feature_importances_, index=final_features)
 
-    fig = px.bar(
-        x=rf.feature_importances_,
-        y=final_features,
+def plot_importance_bars(importances: pd.Series, movement_type: str):
+    """Draws movement importance bars, e.g. precomputed ones from the artifact store."""
+    fig = cached_figure(f"capability.importance.{movement_type.lower()}", lambda: px.bar(
+        x=importances.to_numpy(),
+        y=importances.index,
         orientation="h",
         title=f"Random Forest Feature Importance for {movement_type}"
-    )
+    ), importances)
     st.plotly_chart(fig, use_container_width=True)
 
+def render_feature_importance(model, movement_type: str):
+    """Draws the importance bars of a fitted movement_importance_job() model."""
+    plot_importance_bars(movement_importances(model), movement_type)
+
+def plot_feature_importance_by_movement(df: pd.DataFrame, movement_type: str):
+    st.markdown(f"##### Feature Importance for BenchmarkPct — {movement_type}")
+
+    job = movement_importance_job(df, movement_type)
+    if job is None:
+        st.warning(f"No data available for movement: {movement_type}")
+        return
+    render_feature_importance(fit_cached(*job), movement_type)
+
 # ========= 2. Player Rankings =========
 
-def plot_player_rankings(df: pd.DataFrame):
+def plot_player_rankings(df: pd.DataFrame, ranking_df: pd.DataFrame = None):
+    """`ranking_df` (player, BenchmarkPct) may be precomputed, e.g. by the SQL backend."""
     st.markdown("##### Player Rankings by Avg. BenchmarkPct")
-    ranking_df = df.groupby("player")["BenchmarkPct"].mean().sort_values(ascending=False).reset_index()
-    fig = px.bar(ranking_df, x="player", y="BenchmarkPct", title="Avg. BenchmarkPct by Player")
+
+    def build():
+        ranking = ranking_df
+        if ranking is None:
+            ranking = df.groupby("player", observed=True)["BenchmarkPct"].mean().sort_values(ascending=False).reset_index()
+        return px.bar(ranking, x="player", y="BenchmarkPct", title="Avg. BenchmarkPct by Player")
+
+    fig = cached_figure("capability.rankings", build, ranking_df)
     st.plotly_chart(fig, use_container_width=True)
 
 # ========= 3. Player Comparison =========
@@ -60,8 +93,13 @@ def plot_player_comparison(df: pd.DataFrame):
     players = sorted(df["player"].unique())
     p1 = st.selectbox("Player 1", players, key="cap_p1")
     p2 = st.selectbox("Player 2", players, key="cap_p2")
-    compare_df = df[df["player"].isin([p1, p2])].sort_values("date")
-    fig = px.line(compare_df, x="date", y="BenchmarkPct", color="player", title="BenchmarkPct Timeline")
+
+    def build():
+        compare_df = downsample_lines(df[df["player"].isin([p1, p2])], "date", "BenchmarkPct")
+        return px.line(compare_df, x="date", y="BenchmarkPct", color="player", title="BenchmarkPct Timeline",
+                       render_mode=render_mode(len(compare_df)))
+
+    fig = cached_figure("capability.player_comparison", build, p1, p2)
     st.plotly_chart(fig, use_container_width=True)
 
 # ========= 4. Merged Capability + Recovery Analysis =========
@@ -73,14 +111,17 @@ def plot_merged_capability_recovery(df: pd.DataFrame):
         st.warning("Merged recovery metrics not found.")
         return
 
-    # Drop rows with missing values in key metrics
-    sub = df.dropna(subset=["BenchmarkPct", "Sleep_composite"])
+    def build():
+        # Drop rows with missing values in key metrics
+        sub = df.dropna(subset=["BenchmarkPct", "Sleep_composite"])
+
+        return px.scatter(
+            sub,
+            x="Sleep_composite",
+            y="BenchmarkPct",
+            color="movement",
+            title="BenchmarkPct vs Sleep Composite (by Movement)"
+        )
 
-    fig = px.scatter(
-        sub,
-        x="Sleep_composite",
-        y="BenchmarkPct",
-        color="movement",
-        title="BenchmarkPct vs Sleep Composite (by Movement)"
-    )
+    fig = cached_figure("capability.merged_recovery", build)
     st.plotly_chart(fig, use_container_width=True)
@@ -3,15 +3,23 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from analysis.clustering import update_clusters
+from charts.trendline import add_trendline, ols_lines
+
 def show_gps_vs_recovery(gps_df, recovery_df):
     merged = pd.merge(gps_df, recovery_df, on=["player", "date"], how="inner")
-    fig = px.scatter(merged, x="distance", y="emboss_baseline_score", trendline="ols", title="GPS Load vs Recovery")
+    fig = px.scatter(merged, x="distance", y="emboss_baseline_score", title="GPS Load vs Recovery")
+    add_trendline(fig, ols_lines(merged, ["distance"], "emboss_baseline_score")["distance"])
     st.plotly_chart(fig)
 
-def show_cluster_profile(clustered_df):
+def show_cluster_profile(clustered_df=None):
     """
     Example: We assume advanced_analysis provides a cluster_data with 'cluster', 'PC1', 'PC2'
+    Without `clustered_df`, renders the cached projection of the incremental models
+    (analysis.clustering), which only fits sessions it hasn't seen yet.
     """
+    if clustered_df is None:
+        clustered_df = update_clusters()
     fig = px.scatter(clustered_df, x="PC1", y="PC2", color=clustered_df["cluster"].astype(str),
                      hover_name="player", title="PCA Projection of Load Clusters")
     st.plotly_chart(fig)
@@ -0,0 +1,74 @@
+# app/charts/downsampling.py
+
+import os
+import numpy as np
+import pandas as pd
+
+# Above this many points, scatter and line charts are drawn with WebGL (scattergl)
+# instead of SVG. Override with VIZATHON_WEBGL_THRESHOLD=<n>.
+WEBGL_THRESHOLD = int(os.environ.get("VIZATHON_WEBGL_THRESHOLD", 0)) or 2000
+# Points kept per line of a time-series chart (largest-triangle-three-buckets).
+# Override with VIZATHON_LINE_POINTS=<n>.
+LINE_POINTS = int(os.environ.get("VIZATHON_LINE_POINTS", 0)) or 500
+
+
+def render_mode(n_points: int, threshold: int = None) -> str:
+    """Plotly Express render_mode for a chart of `n_points`: "webgl" above the threshold."""
+    threshold = WEBGL_THRESHOLD if threshold is None else threshold
+    return "webgl" if n_points > threshold else "svg"
+
+
+def _as_float(values) -> np.ndarray:
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]").astype(np.int64)
+    return values.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Positions of the `n_out` points largest-triangle-three-buckets keeps from the
+    series (x, y), x ascending and without missing values: the first and last point,
+    and from each of the n_out - 2 equal buckets in between, the point spanning the
+    largest triangle with the point kept before it and the mean of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _as_float(x), _as_float(y)
+
+    # Buckets split points 1 .. n-2; bucket i is edges[i] <= position < edges[i + 1]
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # The point after the last bucket is the series' last point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample_lines(df: pd.DataFrame, x: str, y: str, by: str = "player", n_out: int = None) -> pd.DataFrame:
+    """
+    The rows of `df` to draw for a line chart of `y` over `x` per `by`, sorted by `x`:
+    lines longer than `n_out` points are reduced with LTTB (dropping missing values
+    first); shorter ones are kept whole.
+    """
+    n_out = LINE_POINTS if n_out is None else n_out
+    df = df.sort_values(x, kind="stable")
+    parts = []
+    for _, line in df.groupby(by, observed=True, sort=False):
+        if len(line) > n_out:
+            line = line.dropna(subset=[x, y])
+            line = line.iloc[lttb_indices(line[x].to_numpy(), line[y].to_numpy(), n_out)]
+        parts.append(line)
+    return pd.concat(parts) if parts else df
@@ -0,0 +1,57 @@
+# app/charts/figure_cache.py
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+import joblib
+import plotly.graph_objects as go
+
+from utils.lru import LRUCache
+
+# Serialised figures kept across reruns and sessions, least recently used evicted first.
+# Override the memory cap with VIZATHON_FIGURE_CACHE_MB=<n>.
+FIGURE_CACHE_BYTES = (int(os.environ.get("VIZATHON_FIGURE_CACHE_MB", 0)) or 64) * 2**20
+
+_figures = LRUCache(max_weight=FIGURE_CACHE_BYTES, weigh=len)  # key -> figure JSON
+_scope = threading.local()
+
+
+@contextmanager
+def figure_scope(*parts):
+    """
+    Turns on cached_figure() for the charts drawn inside the block. `parts` identify the
+    frames those charts are handed: the versions of the datasets they come from and the
+    sidebar filters applied to them. Outside a scope every figure is built afresh.
+    """
+    previous = getattr(_scope, "parts", None)
+    _scope.parts = parts
+    try:
+        yield
+    finally:
+        _scope.parts = previous
+
+
+def current_scope():
+    """The `parts` of the innermost active figure_scope(), None outside one."""
+    return getattr(_scope, "parts", None)
+
+
+def cached_figure(chart_id: str, build, *params) -> go.Figure:
+    """
+    The figure `build()` returns, re-created from its cached JSON when the same chart
+    was built before for the current figure_scope() and `params` (everything else the
+    figure depends on: widget selections, precomputed inputs such as importances).
+    """
+    parts = getattr(_scope, "parts", None)
+    if parts is None:
+        return build()
+    key = joblib.hash((chart_id, parts, params))
+    spec = _figures.get(key)
+    if spec is not None:
+        # Validated when it was first built; skipping validation is what makes a hit cheap
+        return go.Figure(json.loads(spec), _validate=False)
+
+    fig = build()
+    _figures.put(key, fig.to_json(validate=False))
+    return fig
@@ -4,129 +4,170 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 
+from analysis.importance import bootstrap_importances, feature_importances
+from feature_engineering.metrics import evaluate_metrics
+from charts.downsampling import downsample_lines, render_mode
+from charts.figure_cache import cached_figure
+from charts.trendline import add_trendline, ols_lines
+from charts.uncertainty import add_importance_interval
+
+# Derived metrics (feature_engineering.metrics) the GPS charts read from the page's
+# frame; charts never add columns themselves
+DISTANCE_RATIOS = ["over_21_ratio", "over_24_ratio", "over_27_ratio"]
+ACCEL_RATIOS = ["accel_2_5_ratio", "accel_3_5_ratio", "accel_4_5_ratio"]
+HR_RATIOS = [f"hr_zone_{i}_hms_ratio" for i in range(1, 6)]
+GPS_METRICS = DISTANCE_RATIOS + ["accel_decel_total"] + ACCEL_RATIOS + HR_RATIOS
+# Trendline regressions on the GPS page: (ratio column, training_load)
+GPS_TRENDLINE_PAIRS = [(ratio, "training_load") for ratio in DISTANCE_RATIOS + ACCEL_RATIOS + HR_RATIOS]
+
+
+def gps_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """The GPS_METRICS columns, added row-wise to a copy of `df`."""
+    return evaluate_metrics(df, GPS_METRICS)
+
+# Importance radars: chart id -> the metrics whose importance for training_load they show
+GPS_RADARS = {
+    "gps.distance_radar": ["distance_over_21", "distance_over_24", "distance_over_27"],
+    "gps.acceleration_radar": ["accel_decel_over_2_5", "accel_decel_over_3_5", "accel_decel_over_4_5"],
+    "gps.heart_rate_radar": [f"hr_zone_{i}_hms" for i in range(1, 6)],
+}
+
+
+def radar_training_set(df: pd.DataFrame, chart_id: str):
+    """(X, y) the importance radar `chart_id` is fitted on."""
+    return df[GPS_RADARS[chart_id]].fillna(0), df["training_load"]
+
+
+def radar_importances(df: pd.DataFrame, chart_id: str, mode: str = "exact", precomputed: tuple = None,
+                      bootstrap: bool = False):
+    """(importances by feature, label, bootstrap interval or None) the radar `chart_id` draws."""
+    if precomputed is not None:
+        return precomputed + (None,)
+    X, y = radar_training_set(df, chart_id)
+    if bootstrap:
+        interval, source = bootstrap_importances(chart_id, X, y, mode=mode, scope=df)
+        return interval.set_index("feature")["mean"], source, interval
+    importances, source = feature_importances(chart_id, X, y, mode=mode, scope=df)
+    return pd.Series(importances, index=X.columns), source, None
+
+
+def _importance_radar(df: pd.DataFrame, chart_id: str, mode: str, precomputed: tuple = None,
+                      bootstrap: bool = False):
+    importances, source, interval = radar_importances(df, chart_id, mode, precomputed, bootstrap)
+
+    def build():
+        fig = go.Figure(go.Scatterpolar(
+            r=importances.to_numpy(),
+            theta=importances.index,
+            fill='toself',
+            name='Feature Importance'
+        ))
+        add_importance_interval(fig, interval)
+        fig.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False)
+        return fig
+
+    fig = cached_figure(chart_id, build, importances, interval)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Importances — {source}")
+
+
+def _regression_figure(df: pd.DataFrame, col: str, title: str, line: dict):
+    fig = px.scatter(df, x=col, y="training_load", title=title, render_mode=render_mode(len(df)))
+    return add_trendline(fig, line)
+
 # ===================== DISTANCE =========================
 
 def plot_distance_stacked_bar(df: pd.DataFrame):
     st.markdown("##### Distance Ratios per Player")
-    df["over_21_ratio"] = df["distance_over_21"] / df["distance"]
-    df["over_24_ratio"] = df["distance_over_24"] / df["distance"]
-    df["over_27_ratio"] = df["distance_over_27"] / df["distance"]
-    
-    bar_df = df.groupby("player")[["over_21_ratio", "over_24_ratio", "over_27_ratio"]].mean().reset_index()
-    fig = px.bar(bar_df, x="player", y=["over_21_ratio", "over_24_ratio", "over_27_ratio"],
-                 title="High-Speed Distance Proportions", barmode="stack")
+
+    def build():
+        bar_df = df.groupby("player", observed=True)[DISTANCE_RATIOS].mean().reset_index()
+        return px.bar(bar_df, x="player", y=DISTANCE_RATIOS,
+                      title="High-Speed Distance Proportions", barmode="stack")
+
+    fig = cached_figure("gps.distance_bar", build)
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_distance_regression(df: pd.DataFrame):
+def plot_distance_regression(df: pd.DataFrame, lines: dict = None):
+    """`lines` (ratio column -> trendline) may be precomputed for the whole page."""
     st.markdown("##### Regression: Distance Ratios vs. Training Load")
-    for ratio, label in zip(["distance_over_21", "distance_over_24", "distance_over_27"],
-                            ["Over 21", "Over 24", "Over 27"]):
-        df[f"{label}_ratio"] = df[ratio] / df["distance"]
-        fig = px.scatter(df, x=f"{label}_ratio", y="training_load",
-                         trendline="ols", title=f"{label} Ratio vs. Training Load")
+    if lines is None:
+        lines = ols_lines(df, DISTANCE_RATIOS, "training_load")
+    for col, label in zip(DISTANCE_RATIOS, ["Over 21", "Over 24", "Over 27"]):
+        line = lines.get(col)
+        fig = cached_figure(f"gps.regression.{col}", lambda: _regression_figure(
+            df, col, f"{label} Ratio vs. Training Load", line), line)
         st.plotly_chart(fig, use_container_width=True)
 
-def plot_distance_radar(df: pd.DataFrame):
+def plot_distance_radar(df: pd.DataFrame, mode: str = "exact", precomputed: tuple = None,
+                        bootstrap: bool = False):
     st.markdown("##### Radar: Distance Metrics Feature Importance")
-    X = df[["distance_over_21", "distance_over_24", "distance_over_27"]].fillna(0)
-    y = df["training_load"]
-    
-    model = RandomForestRegressor()
-    model.fit(X, y)
-    importances = model.feature_importances_
-
-    fig = go.Figure(go.Scatterpolar(
-        r=importances,
-        theta=X.columns,
-        fill='toself',
-        name='Feature Importance'
-    ))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    _importance_radar(df, "gps.distance_radar", mode, precomputed, bootstrap)
 
 # ================== ACCELERATION ========================
 
 def plot_acceleration_stacked_bar(df: pd.DataFrame):
-    print(df.columns)
     st.markdown("##### Acceleration Ratios per Player")
-    df["accel_decel_total"] = df["accel_decel_over_2_5"] + df["accel_decel_over_3_5"] + df["accel_decel_over_4_5"]
-    df["accel_2_5_ratio"] = df["accel_decel_over_2_5"] / df["accel_decel_total"]
-    df["accel_3_5_ratio"] = df["accel_decel_over_3_5"] / df["accel_decel_total"]
-    df["accel_4_5_ratio"] = df["accel_decel_over_4_5"] / df["accel_decel_total"]
-
-    bar_df = df.groupby("player")[["accel_2_5_ratio", "accel_3_5_ratio", "accel_4_5_ratio"]].mean().reset_index()
-    fig = px.bar(bar_df, x="player", y=["accel_2_5_ratio", "accel_3_5_ratio", "accel_4_5_ratio"],
-                 title="Acceleration Ratios", barmode="stack")
+
+    def build():
+        bar_df = df.groupby("player", observed=True)[ACCEL_RATIOS].mean().reset_index()
+        return px.bar(bar_df, x="player", y=ACCEL_RATIOS,
+                      title="Acceleration Ratios", barmode="stack")
+
+    fig = cached_figure("gps.acceleration_bar", build)
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_acceleration_regression(df: pd.DataFrame):
+def plot_acceleration_regression(df: pd.DataFrame, lines: dict = None):
+    """`lines` (ratio column -> trendline) may be precomputed for the whole page."""
     st.markdown("##### Regression: Acceleration Ratios vs. Training Load")
-    for col, label in zip(["accel_2_5_ratio", "accel_3_5_ratio", "accel_4_5_ratio"],
-                          [">2.5", ">3.5", ">4.5"]):
-        fig = px.scatter(df, x=col, y="training_load",
-                         trendline="ols", title=f"{label} Ratio vs. Training Load")
+    if lines is None:
+        lines = ols_lines(df, ACCEL_RATIOS, "training_load")
+    for col, label in zip(ACCEL_RATIOS, [">2.5", ">3.5", ">4.5"]):
+        line = lines.get(col)
+        fig = cached_figure(f"gps.regression.{col}", lambda: _regression_figure(
+            df, col, f"{label} Ratio vs. Training Load", line), line)
         st.plotly_chart(fig, use_container_width=True)
 
-def plot_acceleration_radar(df: pd.DataFrame):
+def plot_acceleration_radar(df: pd.DataFrame, mode: str = "exact", precomputed: tuple = None,
+                            bootstrap: bool = False):
     st.markdown("##### Radar: Acceleration Feature Importance")
-    X = df[["accel_decel_over_2_5", "accel_decel_over_3_5", "accel_decel_over_4_5"]].fillna(0)
-    y = df["training_load"]
-    model = RandomForestRegressor()
-    model.fit(X, y)
-    importances = model.feature_importances_
-
-    fig = go.Figure(go.Scatterpolar(
-        r=importances,
-        theta=X.columns,
-        fill='toself',
-        name='Feature Importance'
-    ))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    _importance_radar(df, "gps.acceleration_radar", mode, precomputed, bootstrap)
 
 # ================== HEART RATE ========================
 
 def plot_heart_rate_stacked_bar(df: pd.DataFrame):
     st.markdown("##### Heart Rate Zone Ratios")
-    zones = [f"hr_zone_{i}_hms" for i in range(1, 6)]
-    for z in zones:
-        df[f"{z}_ratio"] = df[z] / df["day_duration"]
-    bar_df = df.groupby("player")[[f"{z}_ratio" for z in zones]].mean().reset_index()
-    fig = px.bar(bar_df, x="player", y=[f"{z}_ratio" for z in zones],
-                 title="Heart Rate Zone Distribution", barmode="stack")
+
+    def build():
+        bar_df = df.groupby("player", observed=True)[HR_RATIOS].mean().reset_index()
+        return px.bar(bar_df, x="player", y=HR_RATIOS,
+                      title="Heart Rate Zone Distribution", barmode="stack")
+
+    fig = cached_figure("gps.heart_rate_bar", build)
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_heart_rate_regression(df: pd.DataFrame):
+def plot_heart_rate_regression(df: pd.DataFrame, lines: dict = None):
+    """`lines` (ratio column -> trendline) may be precomputed for the whole page."""
     st.markdown("##### Regression: Heart Rate Zones vs. Training Load")
-    for i in range(1, 6):
-        col = f"hr_zone_{i}_hms"
-        df[f"{col}_ratio"] = df[col] / df["day_duration"]
-        fig = px.scatter(df, x=f"{col}_ratio", y="training_load",
-                         trendline="ols", title=f"Zone {i} Ratio vs. Training Load")
+    if lines is None:
+        lines = ols_lines(df, HR_RATIOS, "training_load")
+    for i, col in enumerate(HR_RATIOS, start=1):
+        line = lines.get(col)
+        fig = cached_figure(f"gps.regression.{col}", lambda: _regression_figure(
+            df, col, f"Zone {i} Ratio vs. Training Load", line), line)
         st.plotly_chart(fig, use_container_width=True)
 
-def plot_heart_rate_radar(df: pd.DataFrame):
+def plot_heart_rate_radar(df: pd.DataFrame, mode: str = "exact", precomputed: tuple = None,
+                          bootstrap: bool = False):
     st.markdown("##### Radar: Heart Rate Feature Importance")
-    X = df[[f"hr_zone_{i}_hms" for i in range(1, 6)]].fillna(0)
-    y = df["training_load"]
-    model = RandomForestRegressor()
-    model.fit(X, y)
-    importances = model.feature_importances_
-    fig = go.Figure(go.Scatterpolar(
-        r=importances,
-        theta=X.columns,
-        fill='toself',
-        name='Feature Importance'
-    ))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    _importance_radar(df, "gps.heart_rate_radar", mode, precomputed, bootstrap)
 
 # ============= PLAYER COMPARISON ======================
 
-def plot_gps_player_comparison(df: pd.DataFrame):
+def plot_gps_player_comparison(df: pd.DataFrame, extra_metrics=()):
+    """`extra_metrics`: further columns of `df` to compare on, e.g. user-defined metrics."""
     st.markdown("### Compare Two Players Over Time")
     player_list = sorted(df["player"].unique())
     player1 = st.selectbox("Player 1", player_list, key="gps_comp_1")
@@ -135,7 +176,40 @@ def plot_gps_player_comparison(df: pd.DataFrame):
     compare_df = df[df["player"].isin([player1, player2])]
     compare_df = compare_df.sort_values("date")
     
-    metrics = ["distance", "accel_decel_total", "day_duration", "training_load"]
+    def build(metric):
+        line_df = downsample_lines(compare_df, "date", metric)
+        return px.line(line_df, x="date", y=metric, color="player", title=f"{metric} over Time",
+                       render_mode=render_mode(len(line_df)))
+
+    metrics = ["distance", "accel_decel_total", "day_duration", "training_load"] + list(extra_metrics)
     for metric in metrics:
-        fig = px.line(compare_df, x="date", y=metric, color="player", title=f"{metric} over Time")
+        fig = cached_figure(f"gps.player_comparison.{metric}", lambda: build(metric), player1, player2)
         st.plotly_chart(fig, use_container_width=True)
+
+# ================= WORKLOAD ===========================
+
+def plot_acwr_trend(workload_df: pd.DataFrame, load: str = "training_load", ewma: bool = False):
+    """Daily acute:chronic ratio per player, with the 0.8-1.3 'sweet spot' shaded."""
+    st.markdown("##### Acute:Chronic Workload Ratio")
+    col = f"{load}_ewma_acwr" if ewma else f"{load}_acwr"
+
+    def build():
+        fig = px.line(workload_df.sort_values("date"), x="date", y=col, color="player",
+                      title=f"{'EWMA ' if ewma else ''}ACWR ({load}) over Time")
+        fig.add_hrect(y0=0.8, y1=1.3, fillcolor="green", opacity=0.1, line_width=0)
+        return fig
+
+    fig = cached_figure("gps.acwr_trend", build, load, ewma)
+    st.plotly_chart(fig, use_container_width=True)
+
+def plot_acute_chronic_latest(workload_df: pd.DataFrame, load: str = "training_load", ewma: bool = False):
+    """Acute vs. chronic load per player on their latest day."""
+    st.markdown("##### Latest Acute vs. Chronic Load")
+    prefix = f"{load}_ewma" if ewma else load
+    def build():
+        latest = workload_df.sort_values("date").groupby("player", observed=True).tail(1)
+        return px.bar(latest, x="player", y=[f"{prefix}_acute", f"{prefix}_chronic"],
+                      title=f"Acute (7d) vs. Chronic (28d) {load}", barmode="group")
+
+    fig = cached_figure("gps.acute_chronic_latest", build, load, ewma)
+    st.plotly_chart(fig, use_container_width=True)
@@ -5,133 +5,176 @@ import plotly.graph_objects as go
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import OneHotEncoder
 
+from analysis.importance import bootstrap_importances
+from analysis.ipa_cube import IPACube, ipa_cube
+from analysis.model_cache import cached_importances
+from charts.figure_cache import cached_figure
+from charts.uncertainty import add_importance_interval
+
+# Importance radars: chart id -> the IPA priority category whose goals they fit
+IPA_RADARS = {
+    "ipa.performance_radar": "performance",
+    "ipa.recovery_radar": "recovery",
+}
+
+
+def radar_training_set(df: pd.DataFrame, chart_id: str):
+    """(X, y, goals used) the importance radar `chart_id` is fitted on."""
+    filtered = df[df["priority_category"].str.lower() == IPA_RADARS[chart_id]]
+    categorical_features = ["area", "type"]
+    encoded = pd.get_dummies(filtered[categorical_features], drop_first=False)
+    y = filtered["tracking_status"].astype("category").cat.codes
+    return encoded, y, filtered
+
+
+def radar_importances(df: pd.DataFrame, chart_id: str, precomputed: tuple = None, bootstrap: bool = False):
+    """
+    (importances by feature, label or None, bootstrap interval or None) the radar
+    `chart_id` draws; None if there are no goals in its category.
+    """
+    if precomputed is not None:
+        return precomputed + (None,)
+    X, y, filtered = radar_training_set(df, chart_id)
+    if filtered.empty:
+        return None
+    if bootstrap:
+        interval, source = bootstrap_importances(chart_id, X, y, task="classification", mode="exact", scope=filtered)
+        return interval.set_index("feature")["mean"], source, interval
+    importances = cached_importances(chart_id, RandomForestClassifier(random_state=42), X, y, scope=filtered)
+    return pd.Series(importances, index=X.columns), None, None
+
+
+def _radar_figure(importances: pd.Series, interval, title: str):
+    fig = go.Figure(go.Scatterpolar(
+        r=importances.to_numpy(),
+        theta=importances.index,
+        fill='toself'
+    ))
+    add_importance_interval(fig, interval)
+    fig.update_layout(title=title, polar=dict(radialaxis=dict(visible=True)))
+    return fig
+
 # ============ 1. Performance Tracking Charts ============
 
-def plot_performance_stacked_charts(df: pd.DataFrame):
+def plot_performance_stacked_charts(df: pd.DataFrame, cube: IPACube = None):
+    """`cube` may be the page's IPACube of `df`; one is built from `df` otherwise."""
     st.markdown("##### Tracking Distribution for Performance Areas")
 
-    performance_df = df[df["priority_category"].str.lower() == "performance"]
+    if cube is None:
+        cube = ipa_cube(df)
+    areas = cube.areas("performance")
 
-    if performance_df.empty:
+    if not areas:
         st.warning("No performance IPA data available.")
         return
 
-    for area in performance_df["area"].unique():
-        area_df = performance_df[performance_df["area"] == area]
-        plot = area_df.groupby(["player", "tracking_status"]).size().unstack().fillna(0)
-        fig = px.bar(plot, title=f"{area} Tracking Status", barmode="stack")
+    def build(area):
+        plot = cube.tracking_counts("performance", area)
+        return px.bar(plot, title=f"{area} Tracking Status", barmode="stack")
+
+    for area in areas:
+        fig = cached_figure(f"ipa.performance_stacked.{area}", lambda: build(area))
         st.plotly_chart(fig, use_container_width=True)
 
 # ============ 2. Performance Radar ============
 
-def plot_performance_importance_radar(df: pd.DataFrame):
+def plot_performance_importance_radar(df: pd.DataFrame, precomputed: tuple = None, bootstrap: bool = False):
     st.markdown("##### Feature Importance Radar (Performance IPAs → Target Performance)")
 
-    filtered = df[df["priority_category"].str.lower() == "performance"].copy()
-
-    if filtered.empty:
+    radar = radar_importances(df, "ipa.performance_radar", precomputed, bootstrap)
+    if radar is None:
         st.warning("No performance IPAs found.")
         return
+    importances, source, interval = radar
 
-    categorical_features = ["area", "type"]
-    encoded = pd.get_dummies(filtered[categorical_features], drop_first=False)
-
-    y = filtered["tracking_status"].astype("category").cat.codes
-
-    model = RandomForestClassifier()
-    model.fit(encoded, y)
-
-    fig = go.Figure(go.Scatterpolar(
-        r=model.feature_importances_,
-        theta=encoded.columns,
-        fill='toself'
-    ))
-    fig.update_layout(title="Performance IPA Importance", polar=dict(radialaxis=dict(visible=True)))
+    fig = cached_figure("ipa.performance_radar", lambda: _radar_figure(importances, interval, "Performance IPA Importance"),
+                        importances, interval)
     st.plotly_chart(fig, use_container_width=True)
+    if source is not None:
+        st.caption(f"Importances — {source}")
 
 # ============ 3. Recovery Tracking Charts ============
 
-def plot_recovery_stacked_charts(df: pd.DataFrame):
+def plot_recovery_stacked_charts(df: pd.DataFrame, cube: IPACube = None):
+    """`cube` may be the page's IPACube of `df`; one is built from `df` otherwise."""
     st.markdown("##### Tracking Distribution for Recovery Areas")
 
-    recovery_df = df[df["priority_category"].str.lower() == "recovery"]
+    if cube is None:
+        cube = ipa_cube(df)
+    areas = cube.areas("recovery")
 
-    if recovery_df.empty:
+    if not areas:
         st.warning("No recovery IPA data available.")
         return
 
-    for area in recovery_df["area"].unique():
-        area_df = recovery_df[recovery_df["area"] == area]
-        plot = area_df.groupby(["player", "tracking_status"]).size().unstack().fillna(0)
-        fig = px.bar(plot, title=f"{area} Tracking Status", barmode="stack")
+    def build(area):
+        plot = cube.tracking_counts("recovery", area)
+        return px.bar(plot, title=f"{area} Tracking Status", barmode="stack")
+
+    for area in areas:
+        fig = cached_figure(f"ipa.recovery_stacked.{area}", lambda: build(area))
         st.plotly_chart(fig, use_container_width=True)
 
 # ============ 4. Recovery Radar ============
 
-def plot_recovery_importance_radar(df: pd.DataFrame):
+def plot_recovery_importance_radar(df: pd.DataFrame, precomputed: tuple = None, bootstrap: bool = False):
     st.markdown("##### Feature Importance Radar (Recovery IPAs → Target Performance)")
 
-    filtered = df[df["priority_category"].str.lower() == "recovery"].copy()
-
-    if filtered.empty:
+    radar = radar_importances(df, "ipa.recovery_radar", precomputed, bootstrap)
+    if radar is None:
         st.warning("No recovery IPAs found.")
         return
+    importances, source, interval = radar
 
-    categorical_features = ["area", "type"]
-    encoded = pd.get_dummies(filtered[categorical_features], drop_first=False)
-
-    y = filtered["tracking_status"].astype("category").cat.codes
-
-    model = RandomForestClassifier()
-    model.fit(encoded, y)
-
-    fig = go.Figure(go.Scatterpolar(
-        r=model.feature_importances_,
-        theta=encoded.columns,
-        fill='toself'
-    ))
-    fig.update_layout(title="Recovery IPA Importance", polar=dict(radialaxis=dict(visible=True)))
+    fig = cached_figure("ipa.recovery_radar", lambda: _radar_figure(importances, interval, "Recovery IPA Importance"),
+                        importances, interval)
     st.plotly_chart(fig, use_container_width=True)
+    if source is not None:
+        st.caption(f"Importances — {source}")
 
 # ============ 5. Player Rankings ============
 
-def plot_ipa_player_rankings(df: pd.DataFrame):
+def plot_ipa_player_rankings(df: pd.DataFrame, achievement_rates: pd.DataFrame = None, cube: IPACube = None):
+    """
+    `achievement_rates` (player, achievement_rate) may be precomputed, e.g. by the SQL
+    backend; otherwise they come from `cube` (built from `df` if not given).
+    """
     st.markdown("##### Player Rankings by IPA Achievement Rate")
-    
-    print(df.columns)
 
-    achievement_rates = (
-        df.groupby("player")["tracking_status"]
-        .apply(lambda x: (x == "Achieved").sum() / len(x))
-        .reset_index(name="achievement_rate")
-        .sort_values(by="achievement_rate", ascending=False)
-    )
+    def build():
+        rates = achievement_rates
+        if rates is None:
+            rates = (cube if cube is not None else ipa_cube(df)).achievement_rates()
+        return px.bar(rates, x="player", y="achievement_rate", title="Goal Achievement Rate by Player")
 
-    fig = px.bar(achievement_rates, x="player", y="achievement_rate", title="Goal Achievement Rate by Player")
+    fig = cached_figure("ipa.rankings", build, achievement_rates)
     st.plotly_chart(fig, use_container_width=True)
 
 # ============ 6. Player Comparison ============
 
-def plot_ipa_comparison_view(df: pd.DataFrame):
+def plot_ipa_comparison_view(df: pd.DataFrame, cube: IPACube = None):
+    """`cube` may be the page's IPACube of `df`; one is built from `df` otherwise."""
     st.markdown("##### Compare Two Players on IPA Goal Achievements")
-    
-    print(df.columns)
 
     players = sorted(df["player"].unique())
     p1 = st.selectbox("Player 1", players, key="ipa_p1")
     p2 = st.selectbox("Player 2", players, key="ipa_p2")
 
-    goals = df["area"].unique()
+    def build():
+        counts = cube if cube is not None else ipa_cube(df)
+        goals = counts.areas()
+
+        p1_data = counts.achieved_by_area(p1)
+        p2_data = counts.achieved_by_area(p2)
 
-    p1_data = df[(df["player"] == p1) & (df["tracking_status"] == "Achieved")]["area"].value_counts()
-    p2_data = df[(df["player"] == p2) & (df["tracking_status"] == "Achieved")]["area"].value_counts()
+        compare_df = pd.DataFrame({
+            "area": goals,
+            p1: [p1_data.get(area, 0) for area in goals],
+            p2: [p2_data.get(area, 0) for area in goals]
+        })
 
-    compare_df = pd.DataFrame({
-        "area": goals,
-        p1: [p1_data.get(area, 0) for area in goals],
-        p2: [p2_data.get(area, 0) for area in goals]
-    })
+        compare_df = compare_df.melt(id_vars="area", var_name="Player", value_name="Achieved Count")
+        return px.bar(compare_df, x="area", y="Achieved Count", color="Player", barmode="group", title="IPA Area Achievement Comparison")
 
-    compare_df = compare_df.melt(id_vars="area", var_name="Player", value_name="Achieved Count")
-    fig = px.bar(compare_df, x="area", y="Achieved Count", color="Player", barmode="group", title="IPA Area Achievement Comparison")
+    fig = cached_figure("ipa.player_comparison", build, p1, p2)
     st.plotly_chart(fig, use_container_width=True)
@@ -4,99 +4,137 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.ensemble import RandomForestRegressor
 
-# ============ COMPLETENESS ==================
-
-def plot_completeness_radar(df):
-    st.markdown("##### Feature Importance Radar (Completeness → EMBOSS)")
-    features = [
-        "Bio_completeness", "Msk_joint_range_completeness", "Msk_load_tolerance_completeness",
-        "Subjective_completeness", "Soreness_completeness", "Sleep_completeness"
-    ]
+from analysis.correlation import grouped_moments
+from analysis.importance import bootstrap_importances, feature_importances
+from charts.downsampling import downsample_lines, render_mode
+from charts.figure_cache import cached_figure
+from charts.uncertainty import add_importance_interval
+
+COMPLETENESS_HEATMAP_FEATURES = [
+    "Bio_completeness", "Msk_joint_range_completeness", "Msk_load_tolerance_completeness",
+    "Subjective_completeness", "Soreness_completeness", "Sleep_completeness",
+    "emboss_baseline_score"
+]
+COMPOSITE_HEATMAP_FEATURES = [
+    "Bio_composite", "Msk_joint_range_composite", "Msk_load_tolerance_composite",
+    "Subjective_composite", "Soreness_composite", "Sleep_composite",
+    "emboss_baseline_score"
+]
+
+# Importance radars: chart id -> the metrics whose importance for emboss_baseline_score they show
+RECOVERY_RADARS = {
+    "recovery.completeness_radar": COMPLETENESS_HEATMAP_FEATURES[:-1],
+    "recovery.composite_radar": COMPOSITE_HEATMAP_FEATURES[:-1],
+}
+
+
+def radar_training_set(df, chart_id: str):
+    """(X, y, rows used) the importance radar `chart_id` is fitted on."""
+    features = RECOVERY_RADARS[chart_id]
     df = df.dropna(subset=features + ["emboss_baseline_score"])
-    X = df[features]
-    y = df["emboss_baseline_score"]
+    return df[features], df["emboss_baseline_score"], df
 
-    model = RandomForestRegressor()
-    model.fit(X, y)
-    importances = model.feature_importances_
 
+def radar_importances(df, chart_id: str, mode: str = "exact", precomputed: tuple = None,
+                      bootstrap: bool = False):
+    """(importances by feature, label, bootstrap interval or None) the radar `chart_id` draws."""
+    if precomputed is not None:
+        return precomputed + (None,)
+    X, y, df = radar_training_set(df, chart_id)
+    if bootstrap:
+        interval, source = bootstrap_importances(chart_id, X, y, mode=mode, scope=df)
+        return interval.set_index("feature")["mean"], source, interval
+    importances, source = feature_importances(chart_id, X, y, mode=mode, scope=df)
+    return pd.Series(importances, index=X.columns), source, None
+
+
+def _radar_figure(importances: pd.Series, interval, title: str):
     fig = go.Figure(go.Scatterpolar(
-        r=importances,
-        theta=features,
+        r=importances.to_numpy(),
+        theta=importances.index,
         fill='toself'
     ))
-    fig.update_layout(title="Completeness Metrics Importance", polar=dict(radialaxis=dict(visible=True)))
+    add_importance_interval(fig, interval)
+    fig.update_layout(title=title, polar=dict(radialaxis=dict(visible=True)))
+    return fig
+
+# ============ COMPLETENESS ==================
+
+def plot_completeness_radar(df, mode: str = "exact", precomputed: tuple = None, bootstrap: bool = False):
+    st.markdown("##### Feature Importance Radar (Completeness → EMBOSS)")
+    importances, source, interval = radar_importances(df, "recovery.completeness_radar", mode, precomputed, bootstrap)
+    fig = cached_figure("recovery.completeness_radar",
+                        lambda: _radar_figure(importances, interval, "Completeness Metrics Importance"),
+                        importances, interval)
     st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Importances — {source}")
 
 
-def plot_completeness_heatmap(df):
+def plot_completeness_heatmap(df, corr=None):
+    """`corr` may be precomputed, e.g. from cached moments (analysis.correlation)."""
     st.markdown("##### Correlation Heatmap")
-    features = [
-        "Bio_completeness", "Msk_joint_range_completeness", "Msk_load_tolerance_completeness",
-        "Subjective_completeness", "Soreness_completeness", "Sleep_completeness",
-        "emboss_baseline_score"
-    ]
-    subset = df[features].dropna()
-    fig = px.imshow(subset.corr(), text_auto=True, title="Completeness vs. EMBOSS Correlation")
+
+    def build():
+        heatmap = corr if corr is not None else grouped_moments(df, COMPLETENESS_HEATMAP_FEATURES, dropna=True).to_frame()
+        return px.imshow(heatmap, text_auto=True, title="Completeness vs. EMBOSS Correlation")
+
+    fig = cached_figure("recovery.completeness_heatmap", build, corr)
     st.plotly_chart(fig, use_container_width=True)
 
 
 def plot_completeness_scatter(df):
     st.markdown("##### Subjective Completeness vs. EMBOSS")
-    fig = px.scatter(df, x="Subjective_completeness", y="emboss_baseline_score", color="player")
+    fig = cached_figure("recovery.completeness_scatter", lambda: px.scatter(
+        df, x="Subjective_completeness", y="emboss_baseline_score", color="player", render_mode=render_mode(len(df))
+    ))
     st.plotly_chart(fig, use_container_width=True)
 
 
 # ============ COMPOSITE ==================
 
-def plot_composite_radar(df):
+def plot_composite_radar(df, mode: str = "exact", precomputed: tuple = None, bootstrap: bool = False):
     st.markdown("##### Feature Importance Radar (Composite → EMBOSS)")
-    features = [
-        "Bio_composite", "Msk_joint_range_composite", "Msk_load_tolerance_composite",
-        "Subjective_composite", "Soreness_composite", "Sleep_composite"
-    ]
-    df = df.dropna(subset=features + ["emboss_baseline_score"])
-    X = df[features]
-    y = df["emboss_baseline_score"]
-
-    model = RandomForestRegressor()
-    model.fit(X, y)
-    importances = model.feature_importances_
-
-    fig = go.Figure(go.Scatterpolar(
-        r=importances,
-        theta=features,
-        fill='toself'
-    ))
-    fig.update_layout(title="Composite Metrics Importance", polar=dict(radialaxis=dict(visible=True)))
+    importances, source, interval = radar_importances(df, "recovery.composite_radar", mode, precomputed, bootstrap)
+    fig = cached_figure("recovery.composite_radar",
+                        lambda: _radar_figure(importances, interval, "Composite Metrics Importance"),
+                        importances, interval)
     st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Importances — {source}")
 
 
-def plot_composite_heatmap(df):
+def plot_composite_heatmap(df, corr=None):
+    """`corr` may be precomputed, e.g. from cached moments (analysis.correlation)."""
     st.markdown("##### Correlation Heatmap")
-    features = [
-        "Bio_composite", "Msk_joint_range_composite", "Msk_load_tolerance_composite",
-        "Subjective_composite", "Soreness_composite", "Sleep_composite",
-        "emboss_baseline_score"
-    ]
-    subset = df[features].dropna()
-    fig = px.imshow(subset.corr(), text_auto=True, title="Composite vs. EMBOSS Correlation")
+
+    def build():
+        heatmap = corr if corr is not None else grouped_moments(df, COMPOSITE_HEATMAP_FEATURES, dropna=True).to_frame()
+        return px.imshow(heatmap, text_auto=True, title="Composite vs. EMBOSS Correlation")
+
+    fig = cached_figure("recovery.composite_heatmap", build, corr)
     st.plotly_chart(fig, use_container_width=True)
 
 
 def plot_composite_scatter(df):
     st.markdown("##### Subjective Composite vs. EMBOSS")
-    fig = px.scatter(df, x="Subjective_composite", y="emboss_baseline_score", color="player")
+    fig = cached_figure("recovery.composite_scatter", lambda: px.scatter(
+        df, x="Subjective_composite", y="emboss_baseline_score", color="player", render_mode=render_mode(len(df))
+    ))
     st.plotly_chart(fig, use_container_width=True)
 
 # ============ COMPARISON ==================
 
-def plot_recovery_rankings(df):
+def plot_recovery_rankings(df, ranking_df=None):
+    """`ranking_df` (player, emboss_baseline_score) may be precomputed, e.g. by the SQL backend."""
     st.markdown("##### Player Rankings (Avg. EMBOSS)")
-    ranking_df = df.groupby("player")["emboss_baseline_score"].mean().sort_values(ascending=False).reset_index()
-    fig = px.bar(ranking_df, x="player", y="emboss_baseline_score", title="Player Recovery Rankings")
+
+    def build():
+        ranking = ranking_df
+        if ranking is None:
+            ranking = df.groupby("player", observed=True)["emboss_baseline_score"].mean().sort_values(ascending=False).reset_index()
+        return px.bar(ranking, x="player", y="emboss_baseline_score", title="Player Recovery Rankings")
+
+    fig = cached_figure("recovery.rankings", build, ranking_df)
     st.plotly_chart(fig, use_container_width=True)
 
 def plot_recovery_player_comparison(df):
@@ -105,6 +143,10 @@ def plot_recovery_player_comparison(df):
     p1 = st.selectbox("Player 1", players, key="rec_p1")
     p2 = st.selectbox("Player 2", players, key="rec_p2")
 
-    compare_df = df[df["player"].isin([p1, p2])].sort_values("date")
-    fig = px.line(compare_df, x="date", y="emboss_baseline_score", color="player", title="EMBOSS Score Over Time")
+    def build():
+        compare_df = downsample_lines(df[df["player"].isin([p1, p2])], "date", "emboss_baseline_score")
+        return px.line(compare_df, x="date", y="emboss_baseline_score", color="player", title="EMBOSS Score Over Time",
+                       render_mode=render_mode(len(compare_df)))
+
+    fig = cached_figure("recovery.player_comparison", build, p1, p2)
     st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
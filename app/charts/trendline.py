@@ -0,0 +1,21 @@
+# app/charts/trendline.py
+
+import plotly.graph_objects as go
+
+from analysis.regression import linear_stats, trendlines
+
+
+def ols_lines(df, x_cols, y_col: str) -> dict:
+    """Trendline (analysis.regression) of `y_col` on each of `x_cols`, fitted in one batched solve."""
+    return dict(zip(x_cols, trendlines([linear_stats(df, [x], y_col) for x in x_cols])))
+
+
+def add_trendline(fig, line: dict, name: str = "OLS trendline"):
+    """Draws a precomputed trendline on a scatter figure, in place of Plotly's own fit."""
+    if line is None:
+        return fig
+    fig.add_trace(go.Scatter(
+        x=line["x"], y=line["y"], mode="lines", name=name, showlegend=False,
+        hovertemplate=f"y = {line['slope']:.4g}·x + {line['intercept']:.4g}<br>R² = {line['r2']:.3f}<extra></extra>",
+    ))
+    return fig
@@ -0,0 +1,18 @@
+# app/charts/uncertainty.py
+
+import plotly.graph_objects as go
+
+
+def add_importance_interval(fig, interval):
+    """
+    Draws the bootstrap interval of a radar's importances (lower / upper per feature,
+    from analysis.importance.bootstrap_importances) as dashed rings around its trace.
+    """
+    if interval is None:
+        return fig
+    for bound in ("upper", "lower"):
+        fig.add_trace(go.Scatterpolar(
+            r=interval[bound].to_numpy(), theta=interval["feature"], mode="lines",
+            line=dict(dash="dash", width=1), name=f"{bound} bound", showlegend=False,
+        ))
+    return fig
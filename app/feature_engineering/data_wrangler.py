@@ -2,77 +2,91 @@
 
 import pandas as pd
 
+from feature_engineering.matchday import matchday_offsets
+
+KEY_NAMES = ["player", "date"]
+
+
+# ===================== KEYED JOINS =========================
+
+def _as_datetime(values: pd.Series) -> pd.Series:
+    # Returns a converted Series; the caller's column is never reassigned
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values)
+
+
+def is_keyed(df: pd.DataFrame) -> bool:
+    """True for frames built by key_index()."""
+    return list(df.index.names) == KEY_NAMES
+
+
+def key_index(df: pd.DataFrame, date_col: str = "date") -> pd.DataFrame:
+    """
+    `df` indexed on a sorted, unique (player, date) MultiIndex -- the last row wins
+    on duplicate keys, as in a daily upload. Build it once per dataset version (see
+    DataStore.indexed()) and pass it to the merge_* functions: each join is then an
+    index lookup rather than a hash-merge. `df` is not modified.
+    """
+    keys = pd.MultiIndex.from_arrays(
+        [df["player"].astype(object), _as_datetime(df[date_col])], names=KEY_NAMES
+    )
+    indexed = df.drop(columns=["player", date_col]).set_axis(keys, axis=0)
+    indexed = indexed[~keys.duplicated(keep="last")]
+    return indexed.sort_index()
+
+
+def _keyed(df: pd.DataFrame, date_col: str) -> pd.DataFrame:
+    return df if is_keyed(df) else key_index(df, date_col)
+
+
+def join_on_key(frame: pd.DataFrame, indexed: pd.DataFrame, columns=None,
+                date_col: str = "date") -> pd.DataFrame:
+    """
+    Left-joins `columns` (default: all) of a key_index() frame onto `frame` by
+    (player, `date_col`). Rows of `frame` keep their order and index; `frame` is not
+    modified. Columns already in `frame` are not joined again.
+    """
+    columns = [c for c in (indexed.columns if columns is None else columns) if c not in frame.columns]
+    keys = pd.MultiIndex.from_arrays([frame["player"].astype(object), _as_datetime(frame[date_col])])
+    values = indexed[columns].reindex(keys)
+    values.index = frame.index
+    return pd.concat([frame, values], axis=1)
+
+
+# ===================== MERGES =========================
+# Each merge accepts the raw frames as loaded or, for the right-hand side, a
+# prebuilt key_index() frame. Inputs are never modified.
+
 def merge_gps_with_calendar(gps_df: pd.DataFrame, cal_df: pd.DataFrame) -> pd.DataFrame:
     """
     Merges GPS data with calendar to enrich it with training context (e.g., training_load).
     Args:
         gps_df: DataFrame from gps_data.csv
-        cal_df: DataFrame from chelsea_fc_calendar.csv
+        cal_df: DataFrame from chelsea_fc_calendar.csv (or its key_index())
     Returns:
         Merged DataFrame with 'training_load' and all GPS metrics.
     """
-    gps_df["date"] = pd.to_datetime(gps_df["date"])
-    cal_df["event_date"] = pd.to_datetime(cal_df["event_date"])
-    
-    # Rename to align keys
-    cal_df = cal_df.rename(columns={"event_date": "date"})
-    
-    merged = pd.merge(gps_df, cal_df[["player", "date", "training_load"]], on=["player", "date"], how="left")
-    merged = merged.dropna(subset=["training_load"])
-    return merged
+    merged = join_on_key(gps_df, _keyed(cal_df, "event_date"), ["training_load"])
+    return merged[merged["training_load"].notna()]
 
-# app/feature_engineering/data_wrangler.py
 
 def merge_recovery_with_calendar(recovery_df: pd.DataFrame, cal_df: pd.DataFrame) -> pd.DataFrame:
     """
     Merges recovery data with calendar and marks MD-1 days.
     """
-    recovery_df["date"] = pd.to_datetime(recovery_df["date"])
-    cal_df["event_date"] = pd.to_datetime(cal_df["event_date"])
+    md_minus_1 = matchday_offsets(recovery_df, cal_df)["md_minus_1"].astype(int)
+    return recovery_df.assign(is_md_minus_1=md_minus_1)
 
-    # Extract MD-1 days per player
-    md1_dates = cal_df[cal_df["event_type"].str.lower() == "match"]
-    md1_dates["md_minus_1_date"] = md1_dates["event_date"] - pd.Timedelta(days=1)
-
-    # Join on date
-    merged = pd.merge(recovery_df, md1_dates[["player", "md_minus_1_date"]], 
-                      left_on=["player", "date"], right_on=["player", "md_minus_1_date"], how="left")
-
-    merged["is_md_minus_1"] = merged["md_minus_1_date"].notnull().astype(int)
-    merged.drop(columns=["md_minus_1_date"], inplace=True)
-
-    return merged
 
 def merge_capability_with_calendar(cap_df: pd.DataFrame, cal_df: pd.DataFrame) -> pd.DataFrame:
-    cap_df["date"] = pd.to_datetime(cap_df["date"])
-    cal_df["event_date"] = pd.to_datetime(cal_df["event_date"])
-
-    md_df = cal_df[cal_df["event_type"].str.lower() == "match"].copy()
-    md_df["md_minus_1"] = md_df["event_date"] - pd.Timedelta(days=1)
-
-    # Merge for MD-1 flag
-    cap_df = pd.merge(
-        cap_df,
-        md_df[["player", "md_minus_1"]],
-        left_on=["player", "date"],
-        right_on=["player", "md_minus_1"],
-        how="left"
-    )
-    cap_df["is_md_minus_1"] = cap_df["md_minus_1"].notnull().astype(int)
-    cap_df.drop(columns=["md_minus_1"], inplace=True)
-
-    # ✅ Merge with calendar to fetch position info
-    cal_df = cal_df.rename(columns={"event_date": "date"})
-    cap_df = pd.merge(
-        cap_df,
-        cal_df[["player", "date", "position"]],
-        on=["player", "date"],
-        how="left"
-    )
+    """
+    Marks MD-1 days on the capability tests and adds the player's position that day.
+    """
+    md_minus_1 = matchday_offsets(cap_df, cal_df)["md_minus_1"].astype(int)
+    merged = join_on_key(cap_df, _keyed(cal_df, "event_date"), ["position"])
+    return merged.assign(is_md_minus_1=md_minus_1)
 
-    return cap_df
 
 def merge_capability_with_recovery(cap_df: pd.DataFrame, recovery_df: pd.DataFrame) -> pd.DataFrame:
-    cap_df["date"] = pd.to_datetime(cap_df["date"])
-    recovery_df["date"] = pd.to_datetime(recovery_df["date"])
-    return pd.merge(cap_df, recovery_df, on=["player", "date"], how="left")
+    return join_on_key(cap_df, _keyed(recovery_df, "date"))
@@ -0,0 +1,84 @@
+# app/feature_engineering/matchday.py
+
+import numpy as np
+import pandas as pd
+
+from analysis.schema import player_dtype
+
+# MD-n / MD+n indicator columns are produced for n = 1..MAX_MD_OFFSET
+MAX_MD_OFFSET = 3
+
+
+def match_dates(cal_df: pd.DataFrame) -> pd.DataFrame:
+    """(player, match_date) for every calendar entry whose event_type is a match."""
+    if "event_date" not in cal_df.columns:  # keyed on (player, date), see data_wrangler.key_index
+        cal_df = cal_df.reset_index().rename(columns={"date": "event_date"})
+    is_match = cal_df["event_type"].astype(str).str.lower() == "match"
+    matches = cal_df.loc[is_match, ["player", "event_date"]].rename(columns={"event_date": "match_date"})
+    return matches.drop_duplicates()
+
+
+def matchday_offsets(frame: pd.DataFrame, cal_df: pd.DataFrame, date_col: str = "date",
+                     max_offset: int = MAX_MD_OFFSET) -> pd.DataFrame:
+    """
+    Assigns every player-day in `frame` its position in that player's match cycle, in
+    one pass: two as-of joins (sorted arrays, binary search) against the player's
+    match dates from the calendar. Returns a frame aligned to `frame.index` with:
+      - is_matchday: the player has a match that day
+      - days_to_next_match / days_since_last_match: distance to the nearest match
+        strictly after / before the day (NaN when there is none)
+      - md_label: "MD", "MD-n" (next match is nearer) or "MD+n" (ties go to MD+)
+      - md_minus_1..md_minus_n, md_plus_1..md_plus_n: int8 indicators
+    `frame` is not modified.
+    """
+    # One dictionary for both sides, so the as-of "by" join compares category codes.
+    # Raw frames may name players the shared dtype hasn't seen: register them first,
+    # or they'd all become NaN and share one match calendar.
+    matches = match_dates(cal_df).dropna(subset=["player"])
+    dtype = player_dtype(list(frame["player"].unique()) + list(matches["player"].unique()))
+    players = pd.Categorical(frame["player"], dtype=dtype)
+    dates = pd.to_datetime(frame[date_col]).to_numpy()
+    matches = matches.astype({"player": dtype})
+    matches["match_date"] = matches["match_date"].astype(dates.dtype)
+    matches = matches.sort_values("match_date")
+
+    keys = pd.DataFrame({"player": players, "date": dates, "row": np.arange(len(frame))})
+    keys = keys[keys["date"].notna()].sort_values("date", kind="stable")
+
+    def nearest(direction):
+        joined = pd.merge_asof(
+            keys, matches, left_on="date", right_on="match_date", by="player",
+            direction=direction, allow_exact_matches=False,
+        )
+        found = np.full(len(frame), np.datetime64("NaT"), dtype=dates.dtype)
+        found[joined["row"].to_numpy()] = joined["match_date"].to_numpy()
+        return found
+
+    next_match = nearest("forward")
+    last_match = nearest("backward")
+    days_to_next = (next_match - dates) / np.timedelta64(1, "D")
+    days_since_last = (dates - last_match) / np.timedelta64(1, "D")
+
+    match_keys = pd.MultiIndex.from_frame(matches)
+    is_matchday = pd.MultiIndex.from_arrays([players, dates]).isin(match_keys)
+
+    out = pd.DataFrame({
+        "is_matchday": is_matchday.astype("int8"),
+        "days_to_next_match": days_to_next,
+        "days_since_last_match": days_since_last,
+    }, index=frame.index)
+
+    after = np.where(np.isnan(days_since_last), np.inf, days_since_last)
+    before = np.where(np.isnan(days_to_next), np.inf, days_to_next)
+    label = np.full(len(frame), None, dtype=object)
+    use_plus = (after <= before) & np.isfinite(after)
+    use_minus = (before < after) & np.isfinite(before)
+    label[use_plus] = ["MD+%d" % d for d in after[use_plus]]
+    label[use_minus] = ["MD-%d" % d for d in before[use_minus]]
+    label[is_matchday] = "MD"
+    out["md_label"] = label
+
+    for n in range(1, max_offset + 1):
+        out[f"md_minus_{n}"] = (days_to_next == n).astype("int8")
+        out[f"md_plus_{n}"] = (days_since_last == n).astype("int8")
+    return out
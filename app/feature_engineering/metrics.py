@@ -0,0 +1,115 @@
+# app/feature_engineering/metrics.py
+
+import json
+import os
+import re
+import pandas as pd
+
+from analysis.data_loader import DATA_DIR
+from feature_engineering.player_day import PLAYER_DAY
+from utils.lru import LRUCache
+
+# Metric name -> formula over the player-day table's columns (and other metrics),
+# evaluated with DataFrame.eval.
+BUILTIN_METRICS = {
+    **{f"over_{t}_ratio": f"distance_over_{t} / distance" for t in (21, 24, 27)},
+    "accel_decel_total": "accel_decel_over_2_5 + accel_decel_over_3_5 + accel_decel_over_4_5",
+    **{f"accel_{t}_ratio": f"accel_decel_over_{t} / accel_decel_total" for t in ("2_5", "3_5", "4_5")},
+    **{f"hr_zone_{i}_hms_ratio": f"hr_zone_{i}_hms / day_duration" for i in range(1, 6)},
+}
+# User-defined metrics on the player-day table, as {"name": "formula"}, e.g.
+# {"hsd_share": "distance_over_21 / distance"}. Override the path with VIZATHON_METRICS=<file>.
+USER_METRICS_PATH = os.environ.get("VIZATHON_METRICS") or os.path.join(DATA_DIR, "..", "metrics.json")
+METRIC_CACHE_SIZE = 16
+
+_NAME = re.compile(r"[A-Za-z_]\w*")
+_metrics = {}          # name -> (dataset, formula)
+_user_metrics = []     # names loaded from USER_METRICS_PATH
+_columns_cache = LRUCache(max_size=METRIC_CACHE_SIZE)  # (dataset, version, metrics) -> DataFrame of metric columns
+
+
+def register_metric(name: str, formula: str, dataset: str = PLAYER_DAY):
+    """Declares `name` as `formula` over `dataset`; formulas may refer to other metrics."""
+    if not _NAME.fullmatch(name):
+        raise ValueError(f"Metric name '{name}' must be a Python identifier")
+    _metrics[name] = (dataset, formula)
+
+
+def load_user_metrics(path: str = USER_METRICS_PATH) -> list:
+    """Registers the metrics defined in `path` (if it exists); returns their names."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            formulas = json.load(f)
+    except FileNotFoundError:
+        return []
+    for name, formula in formulas.items():
+        register_metric(name, formula)
+    _user_metrics[:] = list(formulas)
+    return list(formulas)
+
+
+def user_metrics(dataset: str = PLAYER_DAY) -> list:
+    """Names of the user-defined metrics on `dataset`, in file order."""
+    return [name for name in _user_metrics if _metrics[name][0] == dataset]
+
+
+def _dependencies(name: str, seen=()) -> list:
+    # `name` after every metric its formula refers to, transitively
+    if name in seen:
+        raise ValueError(f"Metric '{name}' is defined in terms of itself")
+    order = []
+    for ref in _NAME.findall(_metrics[name][1]):
+        if ref in _metrics:
+            order += [dep for dep in _dependencies(ref, seen + (name,)) if dep not in order]
+    return order + [name]
+
+
+def _evaluation_order(names) -> list:
+    order = []
+    for name in names:
+        order += [dep for dep in _dependencies(name) if dep not in order]
+    return order
+
+
+def evaluate_metrics(df: pd.DataFrame, names) -> pd.DataFrame:
+    """`df` with the metrics `names` (and those they depend on) added as columns, row-wise."""
+    for name in _evaluation_order(names):
+        try:
+            df = df.assign(**{name: df.eval(_metrics[name][1])})
+        except Exception as err:
+            raise ValueError(f"Metric '{name}' = {_metrics[name][1]!r} failed: {err}") from err
+    return df
+
+
+def metric_columns(source, dataset: str, names) -> pd.DataFrame:
+    """
+    The metrics `names` over all of `dataset` (a DataStore or an ArtifactRun), indexed
+    like `source.get(dataset)`. Evaluated once per dataset version and formula set.
+    """
+    names = list(names)
+    formulas = tuple((name, _metrics[name][1]) for name in _evaluation_order(names))
+    key = (dataset, source.version(dataset), tuple(names), formulas)
+    return _columns_cache.get_or_create(key, lambda: evaluate_metrics(source.get(dataset), names)[names])
+
+
+def get_with_metrics(source, dataset: str, names, players=None, date_range=None,
+                     date_key: str = "date") -> pd.DataFrame:
+    """
+    `source.get(dataset)` with the metrics `names` attached from metric_columns(),
+    restricted to `players` and an inclusive `date_range` on `date_key`.
+    """
+    names = list(names)
+    frame = source.get(dataset)
+    columns = metric_columns(source, dataset, names)
+    if columns.index.equals(frame.index):
+        frame = pd.concat([frame.drop(columns=names, errors="ignore"), columns], axis=1)
+    else:
+        # The dataset was reloaded in between; the next call finds the new version cached
+        frame = evaluate_metrics(frame, names)
+    # Rows are selected by position from the dataset's filter index
+    return source.filter_index(dataset).take(frame, date_key, players, date_range)
+
+
+for _name, _formula in BUILTIN_METRICS.items():
+    register_metric(_name, _formula)
+load_user_metrics()
@@ -0,0 +1,142 @@
+# app/feature_engineering/player_day.py
+
+import pandas as pd
+
+from analysis.schema import RECOVERY_METRICS, concat_typed
+from feature_engineering.data_wrangler import is_keyed, join_on_key, key_index
+from feature_engineering.matchday import matchday_offsets
+
+PLAYER_DAY = "player_day"
+PLAYER_DAY_SOURCES = ("gps", "calendar", "recovery", "capability")
+# Bump when build_player_day() changes shape or semantics
+PLAYER_DAY_VERSION = "2"
+
+CALENDAR_COLUMNS = ["event_type", "formation", "position", "playing_status", "training_load"]
+
+
+def _capability_column(movement: str) -> str:
+    return "capability_" + str(movement).lower().replace(" ", "_")
+
+
+def _by_player_date(df: pd.DataFrame, date_col: str = "date") -> pd.DataFrame:
+    """One row per (player, date) -- the last one wins, as in a daily upload -- indexed on the key."""
+    if date_col != "date":
+        df = df.rename(columns={date_col: "date"})
+    return df.drop_duplicates(subset=["player", "date"], keep="last").set_index(["player", "date"])
+
+
+def build_player_day(store) -> pd.DataFrame:
+    """
+    Builds the player-day fact table, keyed on (player, date) over every day that has a
+    calendar entry, a GPS session or a recovery screening:
+      - calendar context: event_type, formation, position, playing_status, training_load
+      - matchday context from feature_engineering.matchday: is_matchday,
+        days_to_next_match, days_since_last_match, md_label, md_minus_n / md_plus_n,
+        plus is_md_minus_1 (= md_minus_1) as used by the capability models
+      - every GPS metric (NaN on days without a session)
+      - every recovery completeness / composite metric and emboss_baseline_score
+      - capability_<movement>: mean BenchmarkPct of the player's latest weekly test
+        on or before the day, with capability_test_date
+    """
+    return _player_day_rows(store.get("calendar"), store.get("gps"), store.get("recovery"), store.get("capability"))
+
+
+def _player_day_rows(cal_df, gps_df, recovery_df, capability, keys=None) -> pd.DataFrame:
+    # The player-day rows of the given sources; only the (player, date) `keys` if given
+    gps = _by_player_date(gps_df)
+    calendar = _by_player_date(cal_df[["player", "event_date"] + CALENDAR_COLUMNS], "event_date")
+    recovery = _by_player_date(recovery_df)
+    if keys is not None:
+        gps, calendar, recovery = (frame[frame.index.isin(keys)] for frame in (gps, calendar, recovery))
+
+    keys = concat_typed([
+        frame.index.to_frame(index=False) for frame in (calendar, gps, recovery)
+    ]).drop_duplicates().sort_values(["date", "player"], kind="stable")
+    fact = keys.set_index(["player", "date"])
+
+    # Index-aligned joins: each source is already unique on the key
+    fact = fact.join(calendar).join(gps).join(recovery[[c for c in RECOVERY_METRICS if c in recovery.columns]])
+    fact = fact.reset_index()
+
+    offsets = matchday_offsets(fact, cal_df)
+    fact = pd.concat([fact, offsets], axis=1)
+    fact["is_md_minus_1"] = fact["md_minus_1"]
+
+    # Weekly capability results, carried forward to every day until the next test
+    weekly = (
+        capability.groupby(["player", "date", "movement"], observed=True)["BenchmarkPct"]
+        .mean()
+        .unstack("movement")
+    )
+    weekly.columns = [_capability_column(m) for m in weekly.columns]
+    weekly = weekly.reset_index().rename(columns={"date": "capability_test_date"})
+    weekly["player"] = weekly["player"].astype(fact["player"].dtype)
+    fact = fact.sort_values("date", kind="stable")
+    fact = pd.merge_asof(
+        fact,
+        weekly.sort_values("capability_test_date"),
+        left_on="date",
+        right_on="capability_test_date",
+        by="player",
+        direction="backward",
+    )
+    # Counts that picked up NaNs on days without a session can't stay int16
+    widened = fact.select_dtypes("float64").columns
+    fact[widened] = fact[widened].astype("float32")
+    return fact.sort_values(["date", "player"], kind="stable").reset_index(drop=True)
+
+
+def update_player_day(store, previous: pd.DataFrame, appended: dict):
+    """
+    Incremental update after GPS sessions or recovery screenings were appended: only
+    the (player, date) rows they touch are rebuilt, from those players' sources, and
+    replace their previous versions. Returns (table, rebuilt rows), or None (so the
+    store does a full build) when the calendar or capability data changed or the
+    rebuilt rows don't fit the previous table's columns.
+    """
+    if set(appended) - {"gps", "recovery"}:
+        return None
+    touched = concat_typed([rows[["player", "date"]] for rows in appended.values()])
+    keys = pd.MultiIndex.from_frame(touched.astype({"player": object})).unique()
+    players = list(keys.get_level_values("player").unique())
+    dates = (touched["date"].min(), touched["date"].max())
+
+    rows = _player_day_rows(
+        store.get("calendar", players=players),
+        store.get("gps", players=players, date_range=dates),
+        store.get("recovery", players=players, date_range=dates),
+        store.get("capability", players=players),
+        keys,
+    )
+    if not set(rows.columns) <= set(previous.columns):
+        return None  # e.g. a capability movement the table has no column for
+    rows = rows.reindex(columns=previous.columns)
+    casts = {
+        column: dtype for column, dtype in previous.dtypes.items()
+        if not isinstance(dtype, pd.CategoricalDtype) and rows[column].dtype != dtype
+    }
+    try:
+        rows = rows.astype(casts)
+    except (TypeError, ValueError):
+        return None  # e.g. NaNs in a column the previous build had as integers
+
+    previous_keys = pd.MultiIndex.from_arrays([previous["player"].astype(object), previous["date"]])
+    table = concat_typed([previous[~previous_keys.isin(keys)], rows])
+    return table.sort_values(["date", "player"], kind="stable").reset_index(drop=True), rows
+
+
+def register_player_day(store):
+    store.register_derived(
+        PLAYER_DAY, PLAYER_DAY_SOURCES, build_player_day, version=PLAYER_DAY_VERSION, update=update_player_day
+    )
+
+
+def attach_player_day(frame: pd.DataFrame, player_day: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """
+    Adds `columns` of the player-day table to a finer-grained `frame` (e.g. one row per
+    capability test) with a single keyed lookup on (player, date). Pass the prebuilt
+    `store.indexed(PLAYER_DAY)` to skip re-indexing. `frame` is not modified.
+    """
+    if not is_keyed(player_day):
+        player_day = key_index(player_day)
+    return join_on_key(frame, player_day, columns)
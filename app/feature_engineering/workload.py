@@ -0,0 +1,161 @@
+# app/feature_engineering/workload.py
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering.player_day import PLAYER_DAY
+
+WORKLOAD = "workload"
+WORKLOAD_VERSION = "1"
+
+# Workload name -> player-day column. High-speed distance is running above 21 km/h.
+WORKLOAD_METRICS = {
+    "training_load": "training_load",
+    "distance": "distance",
+    "hsd": "distance_over_21",
+}
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+
+def _alpha(days: int) -> float:
+    # EWMA decay as in Williams et al. (2017): lambda = 2 / (N + 1)
+    return 2 / (days + 1)
+
+
+def daily_loads(player_day: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per player per calendar day, from their first to their last player-day,
+    with each WORKLOAD_METRICS load.
+    Days without a session or calendar load count as zero load.
+    """
+    loads = player_day[["player", "date"] + list(WORKLOAD_METRICS.values())]
+    loads = loads.rename(columns={source: name for name, source in WORKLOAD_METRICS.items()})
+    loads = loads.astype({"player": object})
+
+    spans = loads.groupby("player")["date"].agg(["min", "max"])
+    lengths = ((spans["max"] - spans["min"]).dt.days + 1).to_numpy()
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    grid = pd.DataFrame({
+        "player": np.repeat(spans.index.to_numpy(), lengths),
+        "date": np.repeat(spans["min"].to_numpy(), lengths) + pd.to_timedelta(offsets, unit="D"),
+    })
+
+    daily = grid.merge(loads, on=["player", "date"], how="left")
+    daily[list(WORKLOAD_METRICS)] = daily[list(WORKLOAD_METRICS)].fillna(0).astype("float64")
+    return daily
+
+
+def _rolling(daily: pd.DataFrame) -> pd.DataFrame:
+    # Rolling daily means over the trailing window (shorter at the start of a player's history)
+    grouped = daily.groupby("player", sort=False)[list(WORKLOAD_METRICS)]
+    out = {}
+    for label, days in (("acute", ACUTE_DAYS), ("chronic", CHRONIC_DAYS)):
+        means = grouped.rolling(days, min_periods=1).mean().reset_index(level=0, drop=True)
+        for name in WORKLOAD_METRICS:
+            out[f"{name}_{label}"] = means[name]
+    return pd.DataFrame(out, index=daily.index)
+
+
+def _ewma(daily: pd.DataFrame, seeds: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    EWMA acute / chronic loads per player. `seeds` (one row per player, with the
+    previous day's *_ewma_acute / *_ewma_chronic) carries the recurrence forward
+    instead of restarting it at the first row of `daily`.
+    """
+    out = {}
+    for label, days in (("acute", ACUTE_DAYS), ("chronic", CHRONIC_DAYS)):
+        columns = {f"{name}_ewma_{label}": name for name in WORKLOAD_METRICS}
+        frame = daily[["player"] + list(WORKLOAD_METRICS)]
+        if seeds is not None:
+            seed_rows = seeds[["player"] + list(columns)].rename(columns=columns)
+            seed_rows.index = -1 - np.arange(len(seed_rows))
+            frame = pd.concat([seed_rows, frame])
+        smoothed = (
+            frame.groupby("player", sort=False)[list(WORKLOAD_METRICS)]
+            .ewm(alpha=_alpha(days), adjust=False)
+            .mean()
+            .reset_index(level=0, drop=True)
+        )
+        for column, name in columns.items():
+            out[column] = smoothed[name].reindex(daily.index)
+    return pd.DataFrame(out, index=daily.index)
+
+
+def _with_ratios(daily: pd.DataFrame) -> pd.DataFrame:
+    for name in WORKLOAD_METRICS:
+        for prefix in ("", "ewma_"):
+            chronic = daily[f"{name}_{prefix}chronic"]
+            daily[f"{name}_{prefix}acwr"] = daily[f"{name}_{prefix}acute"] / chronic.where(chronic > 0)
+    float64 = daily.select_dtypes("float64").columns
+    daily[float64] = daily[float64].astype("float32")
+    return daily
+
+
+def compute_workload(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds, for each WORKLOAD_METRICS load on a daily_loads() frame:
+      - <load>_acute / <load>_chronic: rolling 7 / 28 day mean daily load
+      - <load>_acwr: acute:chronic workload ratio (NaN while chronic load is zero)
+      - <load>_ewma_acute / <load>_ewma_chronic / <load>_ewma_acwr: the EWMA variant
+    """
+    daily = daily.sort_values(["player", "date"], kind="stable").reset_index(drop=True)
+    return _with_ratios(pd.concat([daily, _rolling(daily), _ewma(daily)], axis=1))
+
+
+def refresh_workload(previous: pd.DataFrame, recent: pd.DataFrame, start) -> tuple:
+    """
+    Brings a compute_workload() table up to date after player-days on or after `start`
+    were added or changed. `recent` holds every player-day of the affected players
+    from `start` on. Their rows from `start` are recomputed, with the rolling windows
+    warmed by the trailing CHRONIC_DAYS - 1 days of `previous` and the EWMAs seeded from
+    its last day before `start`; other rows are kept as they are. Returns (table, the
+    recomputed rows).
+    """
+    players = recent["player"].astype(object).unique()
+    affected = previous["player"].astype(object).isin(players)
+    before = previous[affected & (previous["date"] < start)].sort_values(["player", "date"], kind="stable")
+    tail = before.groupby("player", sort=False).tail(CHRONIC_DAYS - 1)
+    seeds = before.groupby("player", sort=False).tail(1)
+
+    # The retained tail already has one row per day; daily_loads() fills any gap after it
+    history = tail[["player", "date"] + list(WORKLOAD_METRICS)].rename(
+        columns={name: source for name, source in WORKLOAD_METRICS.items()}
+    )
+    window = daily_loads(pd.concat([history, recent.astype({"player": object})], ignore_index=True))
+    window = window.sort_values(["player", "date"], kind="stable").reset_index(drop=True)
+    last = window["player"].map(seeds.set_index("player")["date"])
+    is_new = last.isna() | (window["date"] > last)
+    rolled = _rolling(window)[is_new]
+
+    fresh = window[is_new].reset_index(drop=True)
+    rolled.index = fresh.index
+    rows = _with_ratios(pd.concat([fresh, rolled, _ewma(fresh, seeds)], axis=1))
+    table = pd.concat([previous[~(affected & (previous["date"] >= start))], rows], ignore_index=True)
+    return table.sort_values(["player", "date"], kind="stable").reset_index(drop=True), rows
+
+
+# ===================== DATASTORE =========================
+
+def build_workload(store) -> pd.DataFrame:
+    return compute_workload(daily_loads(store.get(PLAYER_DAY)))
+
+
+def update_workload(store, previous: pd.DataFrame, appended: dict):
+    """
+    Incremental update after player-days were added or changed: only the affected
+    players' days from the earliest changed date on are recomputed (refresh_workload()).
+    """
+    changed = appended[PLAYER_DAY]
+    if changed.empty:
+        return previous, previous.iloc[:0]
+    start = changed["date"].min()
+    players = list(changed["player"].astype(object).unique())
+    recent = store.get(PLAYER_DAY, players=players, date_range=(start, None))
+    return refresh_workload(previous, recent, start)
+
+
+def register_workload(store):
+    store.register_derived(
+        WORKLOAD, (PLAYER_DAY,), build_workload, version=WORKLOAD_VERSION, update=update_workload
+    )
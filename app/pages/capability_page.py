@@ -2,13 +2,19 @@
 
 import streamlit as st
 from utils.ui_styling import load_local_css
-from analysis.data_loader import load_capability_data, load_recovery_data, load_calendar_data
-from feature_engineering.data_wrangler import (
-    merge_capability_with_calendar,
-    merge_capability_with_recovery
-)
+from utils.filters import artifact_source
+from utils.tabs import lazy_tabs
+from analysis.data_store import get_data_store
+from analysis import sql_backend
+from analysis.schema import RECOVERY_METRICS
+from analysis.training import get_training_scheduler
+from feature_engineering.player_day import PLAYER_DAY, attach_player_day
+from charts.figure_cache import figure_scope
 from charts.capability_charts import (
-    plot_feature_importance_by_movement,
+    MOVEMENT_TYPES,
+    movement_importance_job,
+    render_feature_importance,
+    plot_importance_bars,
     plot_player_rankings,
     plot_player_comparison,
     plot_merged_capability_recovery
@@ -16,46 +22,91 @@ from charts.capability_charts import (
 
 load_local_css()
 
+# How often a movement tab checks whether its model has finished training
+FIT_POLL_SECONDS = 1.0
+
 def show_capability_page():
     st.title("🏋️ Physical Capability Dashboard")
 
-    # Load & merge data
-    cap_df = load_capability_data()
-    cal_df = load_calendar_data()
-    recovery_df = load_recovery_data()
-    cap_df = merge_capability_with_calendar(cap_df, cal_df)
-    cap_recovery_df = merge_capability_with_recovery(cap_df, recovery_df)
+    run = artifact_source()
+    store = run if run is not None else get_data_store()
 
     # Sidebar filters
-    players = sorted(cap_df["player"].unique())
+    players = store.players("capability")
     selected_players = st.sidebar.multiselect("Select Player(s)", players, default=players[:5])
-    cap_df = cap_df[cap_df["player"].isin(selected_players)]
-    cap_recovery_df = cap_recovery_df[cap_recovery_df["player"].isin(selected_players)]
 
-    # Tabs
-    tabs = st.tabs([
-        "🌀 Agility", "🚀 Sprint", "🧱 Upper Body", "🦵 Jump",
-        "📊 Player Rankings", "🔗 Capability + Recovery"
-    ])
+    # Capability tests with their day's context looked up from the player-day table
+    player_day = store.indexed(PLAYER_DAY)
+    cap_df = store.get("capability", players=selected_players)
+    cap_df = attach_player_day(cap_df, player_day, ["is_md_minus_1", "position"])
 
-    movement_types = ["Agility", "Sprint", "Upper Body", "Jump"]
+    # Movement tabs: the open tab's model is fitted in the shared training pool and
+    # drawn once ready. In artifact mode the precomputed importances are drawn instead.
+    precomputed = run.importances() if run is not None else None
+    scheduler = get_training_scheduler()
 
-    # Tab 0 to 3 — Individual Movement Tabs
-    for idx, movement in enumerate(movement_types):
-        with tabs[idx]:
+    def movement_tab(movement):
+        def render():
             st.subheader(f"{movement} Capability Analysis")
-            plot_feature_importance_by_movement(cap_df, movement)
+            st.markdown(f"##### Feature Importance for BenchmarkPct — {movement}")
+            if precomputed is not None:
+                importances = precomputed.get(f"capability.importance.{movement.lower()}")
+                if importances is None:
+                    st.warning(f"No data available for movement: {movement}")
+                    return
+                plot_importance_bars(importances[0], movement)
+                st.caption(f"Importances — {importances[1]}")
+                return
+            job = movement_importance_job(cap_df, movement)
+            if job is None:
+                st.warning(f"No data available for movement: {movement}")
+                return
+            future = scheduler.submit(*job)
+            if future.done():
+                render_feature_importance(future.result(), movement)
+                return
+
+            # Keep the rest of the page live while the fit runs: only this fragment
+            # polls, and a full rerun draws the chart once the model is ready
+            @st.fragment(run_every=FIT_POLL_SECONDS)
+            def pending():
+                if future.done():
+                    st.rerun()
+                st.info(f"Training the {movement} model…")
+            pending()
+        return render
 
-    # Player Rankings
-    with tabs[4]:
+    def rankings_tab():
         st.subheader("Compare or Rank Players")
-        plot_player_rankings(cap_df)
+        ranking_df = None
+        if run is not None:
+            ranking_df = run.ranking("capability", players=selected_players)
+        elif sql_backend.is_enabled():
+            ranking_df = sql_backend.player_means("capability", "BenchmarkPct", players=selected_players)
+        plot_player_rankings(cap_df, ranking_df)
         plot_player_comparison(cap_df)
 
-    # Merged Capability + Recovery
-    with tabs[5]:
+    def merged_tab():
         st.subheader("Capability vs. Recovery Context")
-        plot_merged_capability_recovery(cap_recovery_df)
+        plot_merged_capability_recovery(attach_player_day(cap_df, player_day, RECOVERY_METRICS))
+
+    # Background warm-up of a neighbouring movement tab: its fit, queued in the pool
+    def warm_movement(movement):
+        def warm():
+            job = movement_importance_job(cap_df, movement)
+            if job is not None:
+                scheduler.submit(*job)
+        return warm
+
+    labels = ["🌀 Agility", "🚀 Sprint", "🧱 Upper Body", "🦵 Jump"]
+    with figure_scope(store.version("capability"), store.version(PLAYER_DAY), selected_players):
+        lazy_tabs("capability_tab", {
+            **{label: movement_tab(movement) for label, movement in zip(labels, MOVEMENT_TYPES)},
+            "📊 Player Rankings": rankings_tab,
+            "🔗 Capability + Recovery": merged_tab,
+        }, prefetch={} if precomputed is not None else {
+            label: warm_movement(movement) for label, movement in zip(labels, MOVEMENT_TYPES)
+        })
 
 if __name__ == "__main__":
     show_capability_page()
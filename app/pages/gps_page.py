@@ -1,15 +1,22 @@
 # app/pages/gps_page.py
 import streamlit as st
-import pandas as pd
-from analysis.data_loader import load_gps_data, load_calendar_data
-from feature_engineering.data_wrangler import merge_gps_with_calendar
+from analysis.data_store import get_data_store
+from analysis.regression import filtered_trendlines, store_pair_stats
+from feature_engineering.metrics import get_with_metrics, user_metrics
+from feature_engineering.player_day import PLAYER_DAY
+from feature_engineering.workload import WORKLOAD, WORKLOAD_METRICS
 from utils.ui_styling import load_local_css
+from utils.filters import artifact_source, importance_interval_filter, importance_mode_filter
+from utils.tabs import lazy_tabs
+from charts.figure_cache import figure_scope
 from charts.gps_charts import (
     plot_distance_stacked_bar, plot_distance_regression,
     plot_distance_radar, plot_acceleration_stacked_bar,
     plot_acceleration_regression, plot_acceleration_radar,
     plot_heart_rate_stacked_bar, plot_heart_rate_regression,
-    plot_heart_rate_radar, plot_gps_player_comparison
+    plot_heart_rate_radar, plot_gps_player_comparison,
+    plot_acwr_trend, plot_acute_chronic_latest,
+    GPS_METRICS, GPS_TRENDLINE_PAIRS, gps_ratios, radar_importances
 )
 
 # Required before anything else
@@ -18,54 +25,101 @@ load_local_css()
 def show_gps_page():
     st.title("🛰 GPS Metrics Dashboard")
 
-    # Load and merge GPS + calendar data
-    gps_df = load_gps_data()
-    cal_df = load_calendar_data()
-    df = merge_gps_with_calendar(gps_df, cal_df)
+    run = artifact_source()
+    store = run if run is not None else get_data_store()
 
     # Sidebar filters
-    players = sorted(df["player"].unique())
+    players = store.players("gps")
     selected_players = st.sidebar.multiselect("Select Player(s)", players, default=players[:5])
-    date_range = st.sidebar.date_input("Select Date Range", [df["date"].min(), df["date"].max()])
-    
-    df = df[df["player"].isin(selected_players)]
-    df = df[(df["date"] >= pd.to_datetime(date_range[0])) & (df["date"] <= pd.to_datetime(date_range[1]))]
+    date_range = st.sidebar.date_input("Select Date Range", list(store.date_bounds("gps")))
+    importance_mode = importance_mode_filter()
+    # Precomputed importances come without intervals
+    intervals = importance_interval_filter() if run is None else False
 
-    # Tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "📏 Distance Ran", "🚀 Acceleration Bursts", "💓 Heart Rate", "👥 Player Comparison"
-    ])
+    # GPS sessions with their calendar training load, from the player-day table, and
+    # the derived metrics the charts read (evaluated once per data version)
+    extra_metrics = user_metrics(PLAYER_DAY)
+    df = get_with_metrics(store, PLAYER_DAY, GPS_METRICS + extra_metrics,
+                          players=selected_players, date_range=date_range)
+    df = df.dropna(subset=["distance", "training_load"])
 
-    with tab1:
+    radars = run.importances(importance_mode) if run is not None else {}
+
+    def trendlines() -> dict:
+        # All 11 regression trendlines in one batched solve, from per-(player, date)
+        # sufficient statistics that are kept across reruns and extended as days arrive
+        if run is not None:
+            stats = run.read("trendline_stats")
+        else:
+            stats = store_pair_stats(PLAYER_DAY, GPS_TRENDLINE_PAIRS, prepare=gps_ratios, name="gps_ratios")
+        return dict(zip(
+            [x for x, _ in GPS_TRENDLINE_PAIRS],
+            filtered_trendlines(stats, players=selected_players, date_range=date_range),
+        ))
+
+    def distance_tab():
         st.subheader("Distance Ran Analysis")
         col1, col2 = st.columns(2)
         with col1:
             plot_distance_stacked_bar(df)
         with col2:
-            plot_distance_radar(df)
-        plot_distance_regression(df)
+            plot_distance_radar(df, importance_mode, radars.get("gps.distance_radar"), intervals)
+        plot_distance_regression(df, trendlines())
 
-    with tab2:
+    def acceleration_tab():
         st.subheader("Acceleration Burst Analysis")
         col1, col2 = st.columns(2)
         with col1:
             plot_acceleration_stacked_bar(df)
         with col2:
-            plot_acceleration_radar(df)
-        plot_acceleration_regression(df)
+            plot_acceleration_radar(df, importance_mode, radars.get("gps.acceleration_radar"), intervals)
+        plot_acceleration_regression(df, trendlines())
 
-    with tab3:
+    def heart_rate_tab():
         st.subheader("Heart Rate Zone Analysis")
         col1, col2 = st.columns(2)
         with col1:
             plot_heart_rate_stacked_bar(df)
         with col2:
-            plot_heart_rate_radar(df)
-        plot_heart_rate_regression(df)
+            plot_heart_rate_radar(df, importance_mode, radars.get("gps.heart_rate_radar"), intervals)
+        plot_heart_rate_regression(df, trendlines())
 
-    with tab4:
+    def comparison_tab():
         st.subheader("Compare Player GPS Metrics")
-        plot_gps_player_comparison(df)
+        plot_gps_player_comparison(df, extra_metrics)
+
+    def workload_tab():
+        st.subheader("Acute:Chronic Workload")
+        workload_df = store.get(WORKLOAD, players=selected_players, date_range=date_range)
+        col1, col2 = st.columns(2)
+        with col1:
+            load = st.selectbox("Load", list(WORKLOAD_METRICS), key="workload_load")
+        with col2:
+            ewma = st.radio("Model", ["Rolling average", "EWMA"], key="workload_model", horizontal=True) == "EWMA"
+        with figure_scope(store.version(WORKLOAD), selected_players, date_range):
+            plot_acwr_trend(workload_df, load, ewma)
+            plot_acute_chronic_latest(workload_df, load, ewma)
+
+    # Background warm-up of a neighbouring tab: its radar's fit and the trendline statistics
+    def warm_radar_tab(chart_id):
+        def warm():
+            radar_importances(df, chart_id, importance_mode, radars.get(chart_id), intervals)
+            trendlines()
+        return warm
+
+    with figure_scope(store.version(PLAYER_DAY), selected_players, date_range):
+        lazy_tabs("gps_tab", {
+            "📏 Distance Ran": distance_tab,
+            "🚀 Acceleration Bursts": acceleration_tab,
+            "💓 Heart Rate": heart_rate_tab,
+            "👥 Player Comparison": comparison_tab,
+            "⚖️ Workload": workload_tab,
+        }, prefetch={
+            "📏 Distance Ran": warm_radar_tab("gps.distance_radar"),
+            "🚀 Acceleration Bursts": warm_radar_tab("gps.acceleration_radar"),
+            "💓 Heart Rate": warm_radar_tab("gps.heart_rate_radar"),
+            "⚖️ Workload": lambda: store.get(WORKLOAD, players=selected_players, date_range=date_range),
+        })
 
 if __name__ == "__main__":
     show_gps_page()
@@ -2,14 +2,20 @@
 
 import streamlit as st
 from utils.ui_styling import load_local_css
-from analysis.data_loader import load_ipa_data
+from utils.filters import artifact_source, importance_interval_filter
+from utils.tabs import lazy_tabs
+from analysis.data_store import get_data_store
+from analysis import sql_backend
+from analysis.ipa_cube import store_cube
+from charts.figure_cache import figure_scope
 from charts.ipa_charts import (
     plot_performance_stacked_charts,
     plot_recovery_stacked_charts,
     plot_performance_importance_radar,
     plot_recovery_importance_radar,
     plot_ipa_player_rankings,
-    plot_ipa_comparison_view
+    plot_ipa_comparison_view,
+    radar_importances
 )
 
 load_local_css()
@@ -17,29 +23,51 @@ load_local_css()
 def show_ipa_page():
     st.title("📌 Individual Priority Areas (IPA) Dashboard")
 
-    df = load_ipa_data()
-    players = sorted(df["player"].unique())
+    run = artifact_source()
+    store = run if run is not None else get_data_store()
+    players = store.players("ipa")
     selected_players = st.sidebar.multiselect("Select Player(s)", players, default=players[:5])
-    df = df[df["player"].isin(selected_players)]
+    df = store.get("ipa", players=selected_players)
+    # Goal counts by category, area, player and status, grouped once per data version
+    cube = store_cube(store).select(selected_players)
+    # Precomputed importances come without intervals
+    intervals = importance_interval_filter() if run is None else False
 
-    tab1, tab2, tab3 = st.tabs([
-        "⚽ Performance Goals", "♻️ Recovery Goals", "📊 Comparison & Rankings"
-    ])
+    radars = run.importances() if run is not None else {}
 
-    with tab1:
+    def performance_tab():
         st.subheader("Tracking Status Across Performance Goals")
-        plot_performance_stacked_charts(df)
-        plot_performance_importance_radar(df)
+        plot_performance_stacked_charts(df, cube)
+        plot_performance_importance_radar(df, radars.get("ipa.performance_radar"), intervals)
 
-    with tab2:
+    def recovery_tab():
         st.subheader("Tracking Status Across Recovery Goals")
-        plot_recovery_stacked_charts(df)
-        plot_recovery_importance_radar(df)
+        plot_recovery_stacked_charts(df, cube)
+        plot_recovery_importance_radar(df, radars.get("ipa.recovery_radar"), intervals)
 
-    with tab3:
+    def comparison_tab():
         st.subheader("IPA Ranking and Comparison")
-        plot_ipa_player_rankings(df)
-        plot_ipa_comparison_view(df)
+        rates = None
+        if run is not None:
+            rates = run.ranking("ipa", players=selected_players)
+        elif sql_backend.is_enabled():
+            rates = sql_backend.achievement_rates(players=selected_players)
+        plot_ipa_player_rankings(df, rates, cube)
+        plot_ipa_comparison_view(df, cube)
+
+    # Background warm-up of a neighbouring tab: its radar's fit
+    def warm_radar_tab(chart_id):
+        return lambda: radar_importances(df, chart_id, radars.get(chart_id), intervals)
+
+    with figure_scope(store.version("ipa"), selected_players):
+        lazy_tabs("ipa_tab", {
+            "⚽ Performance Goals": performance_tab,
+            "♻️ Recovery Goals": recovery_tab,
+            "📊 Comparison & Rankings": comparison_tab,
+        }, prefetch={
+            "⚽ Performance Goals": warm_radar_tab("ipa.performance_radar"),
+            "♻️ Recovery Goals": warm_radar_tab("ipa.recovery_radar"),
+        })
 
 if __name__ == "__main__":
     show_ipa_page()
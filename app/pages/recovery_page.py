@@ -1,13 +1,18 @@
 # app/pages/recovery_page.py
 
 import streamlit as st
-import pandas as pd
 from utils.ui_styling import load_local_css
-from analysis.data_loader import load_recovery_data
+from utils.filters import artifact_source, importance_interval_filter, importance_mode_filter
+from utils.tabs import lazy_tabs
+from analysis.data_store import get_data_store
+from analysis import sql_backend
+from analysis.correlation import filtered_correlations, select_moments
+from charts.figure_cache import figure_scope
 from charts.recovery_charts import (
     plot_completeness_radar, plot_completeness_heatmap, plot_completeness_scatter,
     plot_composite_radar, plot_composite_heatmap, plot_composite_scatter,
-    plot_recovery_rankings, plot_recovery_player_comparison
+    plot_recovery_rankings, plot_recovery_player_comparison, radar_importances,
+    COMPLETENESS_HEATMAP_FEATURES, COMPOSITE_HEATMAP_FEATURES
 )
 
 # ✅ Required: first thing in the file
@@ -16,42 +21,79 @@ load_local_css()
 def show_recovery_page():
     st.title("♻️ Recovery Dashboard")
 
-    # Load and filter data
-    df = load_recovery_data()
-    players = sorted(df["player"].unique())
+    run = artifact_source()
+    store = run if run is not None else get_data_store()
+
+    # Sidebar filters, then load only the matching rows
+    players = store.players("recovery")
     selected_players = st.sidebar.multiselect("Select Player(s)", players, default=players[:5])
-    date_range = st.sidebar.date_input("Select Date Range", [df["date"].min(), df["date"].max()])
-    
-    df = df[df["player"].isin(selected_players)]
-    df = df[(df["date"] >= pd.to_datetime(date_range[0])) & (df["date"] <= pd.to_datetime(date_range[1]))]
+    date_range = st.sidebar.date_input("Select Date Range", list(store.date_bounds("recovery")))
+    importance_mode = importance_mode_filter()
+    # Precomputed importances come without intervals
+    intervals = importance_interval_filter() if run is None else False
+
+    df = store.get("recovery", players=selected_players, date_range=date_range)
+
+    # Heatmaps: sums over the cached per-(player, date) moments of the selected rows
+    def heatmap_corr(features, artifact):
+        if run is not None:
+            return select_moments(run.read(artifact), players=selected_players, date_range=date_range).to_frame()
+        return filtered_correlations(
+            "recovery", features, players=selected_players, date_range=date_range, dropna=True
+        ).to_frame()
 
-    # Tabs
-    tab1, tab2, tab3 = st.tabs([
-        "✅ Completeness", "🧠 Composite Metrics", "👥 Comparison & Rankings"
-    ])
+    radars = run.importances(importance_mode) if run is not None else {}
 
-    with tab1:
+    def completeness_tab():
         st.subheader("Recovery Completeness Analysis")
         col1, col2 = st.columns(2)
         with col1:
-            plot_completeness_radar(df)
+            plot_completeness_radar(df, importance_mode, radars.get("recovery.completeness_radar"), intervals)
         with col2:
-            plot_completeness_heatmap(df)
+            plot_completeness_heatmap(df, heatmap_corr(COMPLETENESS_HEATMAP_FEATURES, "moments.completeness"))
         plot_completeness_scatter(df)
 
-    with tab2:
+    def composite_tab():
         st.subheader("Composite Recovery Metrics Analysis")
         col1, col2 = st.columns(2)
         with col1:
-            plot_composite_radar(df)
+            plot_composite_radar(df, importance_mode, radars.get("recovery.composite_radar"), intervals)
         with col2:
-            plot_composite_heatmap(df)
+            plot_composite_heatmap(df, heatmap_corr(COMPOSITE_HEATMAP_FEATURES, "moments.composite"))
         plot_composite_scatter(df)
 
-    with tab3:
+    def comparison_tab():
         st.subheader("Player Recovery Comparison & Rankings")
-        plot_recovery_rankings(df)
+        ranking_df = None
+        if run is not None:
+            ranking_df = run.ranking("recovery", players=selected_players, date_range=date_range)
+        elif sql_backend.is_enabled():
+            ranking_df = sql_backend.player_means(
+                "recovery", "emboss_baseline_score", players=selected_players, date_range=date_range
+            )
+        plot_recovery_rankings(df, ranking_df)
         plot_recovery_player_comparison(df)
 
+    # Background warm-up of a neighbouring tab: its radar's fit and heatmap moments
+    def warm_tab(chart_id, features, artifact):
+        def warm():
+            radar_importances(df, chart_id, importance_mode, radars.get(chart_id), intervals)
+            heatmap_corr(features, artifact)
+        return warm
+
+    with figure_scope(store.version("recovery"), selected_players, date_range):
+        lazy_tabs("recovery_tab", {
+            "✅ Completeness": completeness_tab,
+            "🧠 Composite Metrics": composite_tab,
+            "👥 Comparison & Rankings": comparison_tab,
+        }, prefetch={
+            "✅ Completeness": warm_tab(
+                "recovery.completeness_radar", COMPLETENESS_HEATMAP_FEATURES, "moments.completeness"
+            ),
+            "🧠 Composite Metrics": warm_tab(
+                "recovery.composite_radar", COMPOSITE_HEATMAP_FEATURES, "moments.composite"
+            ),
+        })
+
 if __name__ == "__main__":
     show_recovery_page()
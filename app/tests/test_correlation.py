@@ -0,0 +1,43 @@
+# app/tests/test_correlation.py
+# Run from app/: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+
+from analysis.correlation import grouped_moments
+
+
+def _frame(seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = 400
+    df = pd.DataFrame({
+        "player": rng.choice(["A", "B", "C", "D"], n),
+        "x": rng.normal(500, 50, n),
+        "y": rng.normal(0, 1, n),
+    })
+    df["z"] = 0.5 * df["x"] + rng.normal(0, 20, n)
+    # Missing values are excluded pairwise, as DataFrame.corr() does
+    df.loc[rng.choice(n, 40, replace=False), "y"] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), "z"] = np.nan
+    return df
+
+
+def test_grouped_correlations_match_dataframe_corr():
+    df = _frame()
+    cols = ["x", "y", "z"]
+
+    moments = grouped_moments(df, cols, by=("player",))
+
+    r = moments.corr()
+    for i, player in enumerate(moments.keys["player"]):
+        expected = df[df["player"] == player][cols].corr().to_numpy()
+        np.testing.assert_allclose(r[i], expected, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(moments.rollup().corr()[0], df[cols].corr().to_numpy(), rtol=1e-9, atol=1e-12)
+
+
+def test_too_few_pairs_are_nan():
+    df = pd.DataFrame({"player": ["A", "A", "B"], "x": [1.0, 2.0, 3.0], "y": [2.0, np.nan, 1.0]})
+
+    r = grouped_moments(df, ["x"], ["y"], by=("player",)).corr()
+
+    assert np.isnan(r).all()
@@ -0,0 +1,29 @@
+# app/tests/test_downsampling.py
+# Run from app/: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+
+from charts.downsampling import downsample_lines, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    rng = np.random.default_rng(0)
+    x = pd.date_range("2031-01-01", periods=1000).to_numpy()
+    y = np.cumsum(rng.normal(size=1000))
+
+    kept = lttb_indices(x, y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert (np.diff(kept) > 0).all()
+
+
+def test_short_series_come_back_unchanged():
+    y = np.arange(50.0)
+
+    np.testing.assert_array_equal(lttb_indices(np.arange(50), y, 50), np.arange(50))
+    np.testing.assert_array_equal(lttb_indices(np.arange(50), y, 80), np.arange(50))
+
+    df = pd.DataFrame({"player": ["A"] * 50, "date": pd.date_range("2031-01-01", periods=50), "v": y})
+    pd.testing.assert_frame_equal(downsample_lines(df, "date", "v", n_out=50), df)
@@ -0,0 +1,44 @@
+# app/tests/test_filter_index.py
+# Run from app/: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.filter_index import filter_index
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "player": pd.Categorical(rng.choice(["A", "B", "C", "D"], n)),
+        "date": pd.Timestamp("2031-07-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+        "value": rng.normal(size=n),
+    })
+    df.loc[rng.choice(n, 10, replace=False), "date"] = pd.NaT
+    df.loc[rng.choice(n, 10, replace=False), "player"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("players, date_range", [
+    (["A", "C"], None),
+    (None, ("2031-08-01", "2031-08-15")),
+    (["B", "Z"], ("2031-07-10", None)),
+    (["D"], (None, "2031-07-20")),
+    ([], None),
+])
+def test_take_matches_boolean_mask(players, date_range):
+    df = _frame()
+    index = filter_index(df, "date")
+
+    mask = pd.Series(True, index=df.index)
+    if players is not None:
+        mask &= df["player"].isin(players)
+    start, end = date_range or (None, None)
+    if start is not None:
+        mask &= df["date"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["date"] <= pd.Timestamp(end)
+
+    pd.testing.assert_frame_equal(index.take(df, "date", players, date_range), df[mask])
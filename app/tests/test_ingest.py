@@ -0,0 +1,96 @@
+# app/tests/test_ingest.py
+# Run from app/: python -m pytest tests
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from analysis import data_loader, ingest, sql_backend
+from analysis.data_store import DataStore
+from feature_engineering.player_day import PLAYER_DAY, build_player_day, register_player_day
+from feature_engineering.workload import WORKLOAD, build_workload, register_workload
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    # A copy of the CSVs without their Parquet caches, so nothing under data/ or output/ is touched
+    csv_dir = tmp_path / "csv"
+    shutil.copytree(data_loader.DATA_DIR, csv_dir, ignore=shutil.ignore_patterns("*.parquet", "_watermarks.json"))
+    monkeypatch.setattr(data_loader, "DATA_DIR", str(csv_dir))
+    monkeypatch.setattr(data_loader, "DERIVED_DIR", str(tmp_path / "derived"))
+    monkeypatch.setattr(ingest, "WATERMARKS_PATH", os.path.join(csv_dir, "_watermarks.json"))
+    monkeypatch.setattr(sql_backend, "DB_PATH", str(tmp_path / "vizathon.sqlite"))
+    return tmp_path
+
+
+def _store() -> DataStore:
+    store = DataStore()
+    register_player_day(store)
+    register_workload(store)
+    return store
+
+
+def _next_days(df: pd.DataFrame, players, days) -> pd.DataFrame:
+    # The players' last stored rows, moved `days` after the dataset's last date
+    last = df["date"].max()
+    latest = df[df["player"].astype(object).isin(players)].sort_values("date").groupby("player", observed=True).tail(1)
+    return pd.concat([latest.assign(date=last + pd.Timedelta(days=day)) for day in days], ignore_index=True)
+
+
+def _assert_same(actual: pd.DataFrame, expected: pd.DataFrame):
+    def tidy(df):
+        df = df.astype({c: object for c in df.select_dtypes("category").columns})
+        return df.sort_values(["player", "date"], kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(tidy(actual), tidy(expected), check_exact=False, rtol=1e-5)
+
+
+def test_duplicates_are_dropped(sandbox):
+    gps = data_loader.load_dataset("gps")
+    players = list(gps["player"].astype(object).unique()[:3])
+    stored = gps[gps["date"] == gps["date"].max()]
+    new = _next_days(gps, players, [1, 2])
+    batch = pd.concat([stored, new, new.iloc[:1]], ignore_index=True)
+
+    report = ingest.ingest_batch("gps", batch)
+
+    assert report["appended"] == len(new)
+    assert report["duplicates"] == len(stored) + 1
+    after = data_loader.load_dataset("gps")
+    assert len(after) == len(gps) + len(new)
+    assert not after.duplicated(["player", "date"]).any()
+
+
+def test_reingest_is_idempotent(sandbox):
+    gps = data_loader.load_dataset("gps")
+    batch = _next_days(gps, gps["player"].astype(object).unique()[:2], [1])
+
+    first = ingest.ingest_batch("gps", batch)
+    once = data_loader.load_dataset("gps")
+    second = ingest.ingest_batch("gps", batch)
+
+    assert first["appended"] == len(batch)
+    assert second["appended"] == 0
+    assert second["duplicates"] == len(batch)
+    _assert_same(data_loader.load_dataset("gps"), once)
+
+
+def test_derived_tables_after_append_match_rebuild(sandbox):
+    store = _store()
+    for dataset in ("gps", "recovery", PLAYER_DAY, WORKLOAD):
+        store.get(dataset)
+
+    gps = store.get("gps")
+    players = list(gps["player"].astype(object).unique()[:4])
+    ingest.ingest_batch("gps", _next_days(gps, players, [1, 3]))
+    recovery = store.get("recovery")
+    ingest.ingest_batch("recovery", _next_days(recovery, players[:2], [2]))
+    # A second step, so the derived tables catch up over more than one append
+    store.get(PLAYER_DAY)
+    ingest.ingest_batch("gps", _next_days(store.get("gps"), players[:1], [5]))
+
+    fresh = _store()
+    _assert_same(store.get("gps"), fresh.get("gps"))
+    _assert_same(store.get(PLAYER_DAY), build_player_day(fresh))
+    _assert_same(store.get(WORKLOAD), build_workload(fresh))
@@ -0,0 +1,44 @@
+# app/tests/test_ipa_cube.py
+# Run from app/: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+
+from analysis.ipa_cube import ipa_cube
+
+
+def test_achievement_rates_match_groupby_mean():
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({
+        "priority_category": rng.choice(["Performance", "Recovery"], n),
+        "area": rng.choice(["Sprint", "Sleep", "Strength", "Agility"], n),
+        "player": rng.choice(["A", "B", "C", "D", "E"], n),
+        "tracking_status": rng.choice(["Achieved", "On Track", "Behind"], n),
+    })
+    df.loc[rng.choice(n, 10, replace=False), "tracking_status"] = np.nan
+
+    rates = ipa_cube(df).achievement_rates().set_index("player")["achievement_rate"]
+
+    # Goals without a status aren't counted, as groupby drops them
+    counted = df.dropna(subset=["tracking_status"])
+    expected = (counted["tracking_status"] == "Achieved").groupby(counted["player"]).mean()
+    pd.testing.assert_series_equal(rates.sort_index(), expected.sort_index(), check_names=False)
+    assert rates.is_monotonic_decreasing
+
+
+def test_selected_players_tracking_counts_match_groupby():
+    rng = np.random.default_rng(1)
+    n = 150
+    df = pd.DataFrame({
+        "priority_category": "Performance",
+        "area": rng.choice(["Sprint", "Strength"], n),
+        "player": rng.choice(["A", "B", "C"], n),
+        "tracking_status": rng.choice(["Achieved", "Behind"], n),
+    })
+
+    counts = ipa_cube(df).select(["A", "C"]).tracking_counts("performance", "Sprint")
+
+    sprint = df[(df["area"] == "Sprint") & df["player"].isin(["A", "C"])]
+    expected = sprint.groupby(["player", "tracking_status"]).size().unstack(fill_value=0).astype(float)
+    pd.testing.assert_frame_equal(counts.sort_index(), expected.sort_index(), check_names=False)
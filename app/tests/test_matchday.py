@@ -0,0 +1,27 @@
+# app/tests/test_matchday.py
+# Run from app/: python -m pytest tests
+
+import pandas as pd
+
+from feature_engineering.matchday import matchday_offsets
+
+
+def test_player_without_matches_gets_no_md_flags():
+    # Raw frames with names the shared player dtype hasn't seen yet
+    days = pd.date_range("2031-01-01", periods=20)
+    frame = pd.DataFrame({"player": ["No Matches"] * 20 + ["Has Matches"] * 20, "date": list(days) * 2})
+    cal_df = pd.DataFrame({
+        "player": ["Has Matches"] * 3,
+        "event_date": days[[4, 10, 16]],
+        "event_type": ["Match"] * 3,
+    })
+
+    out = matchday_offsets(frame, cal_df)
+
+    flags = [c for c in out if c.startswith(("md_minus_", "md_plus_"))] + ["is_matchday"]
+    idle = out[(frame["player"] == "No Matches").to_numpy()]
+    assert idle[flags].to_numpy().sum() == 0
+    assert idle["md_label"].isna().all()
+    busy = out[(frame["player"] == "Has Matches").to_numpy()]
+    assert busy["is_matchday"].sum() == 3
+    assert busy["md_minus_1"].sum() == 3
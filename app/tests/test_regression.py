@@ -0,0 +1,37 @@
+# app/tests/test_regression.py
+# Run from app/: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+
+from analysis.regression import linear_stats, solve, trendlines
+
+
+def test_group_fits_match_polyfit():
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({"player": rng.choice(["A", "B", "C"], n), "x": rng.uniform(100, 600, n)})
+    df["y"] = 0.02 * df["x"] + df["player"].map({"A": 1.0, "B": 3.0, "C": -2.0}) + rng.normal(0, 1, n)
+    df.loc[rng.choice(n, 20, replace=False), "y"] = np.nan
+
+    stats = linear_stats(df, ["x"], "y", by=("player",))
+    ((coef, r2),) = solve([stats])
+
+    for i, player in enumerate(stats.keys["player"]):
+        rows = df[(df["player"] == player) & df["y"].notna()]
+        slope, intercept = np.polyfit(rows["x"], rows["y"], 1)
+        np.testing.assert_allclose(coef[i], [intercept, slope], rtol=1e-8)
+        np.testing.assert_allclose(r2[i], np.corrcoef(rows["x"], rows["y"])[0, 1] ** 2, rtol=1e-8)
+
+    (line,) = trendlines([stats.rollup()])
+    rows = df.dropna()
+    slope, intercept = np.polyfit(rows["x"], rows["y"], 1)
+    np.testing.assert_allclose([line["slope"], line["intercept"]], [slope, intercept], rtol=1e-8)
+    assert line["n"] == len(rows)
+    np.testing.assert_allclose(line["x"], [rows["x"].min(), rows["x"].max()])
+
+
+def test_constant_predictor_has_no_line():
+    df = pd.DataFrame({"x": [1.0, 1.0, 1.0], "y": [1.0, 2.0, 3.0]})
+
+    assert trendlines([linear_stats(df, ["x"], "y")]) == [None]
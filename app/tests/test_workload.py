@@ -0,0 +1,51 @@
+# app/tests/test_workload.py
+# Run from app/: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering.workload import compute_workload, daily_loads, refresh_workload
+
+
+def _player_days(player: str, dates, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "player": player,
+        "date": pd.to_datetime(dates),
+        "training_load": rng.integers(100, 600, len(dates)).astype("int16"),
+        "distance": rng.uniform(3000, 11000, len(dates)).astype("float32"),
+        "distance_over_21": rng.uniform(0, 900, len(dates)).astype("float32"),
+    })
+
+
+def test_refresh_matches_full_rebuild():
+    season = pd.date_range("2031-07-01", periods=90, freq="D")
+    old = pd.concat([
+        _player_days("Steady", season[:60:2], 1),
+        _player_days("Gap", season[:20], 2),
+        _player_days("Untouched", season[:60:3], 3),
+    ], ignore_index=True)
+    added = pd.concat([
+        _player_days("Steady", season[60:80], 4),
+        # Back after more than a chronic window without a session
+        _player_days("Gap", season[55:70], 5),
+        # A late upload for a day before the player's last one
+        _player_days("Steady", [season[45]], 6),
+        _player_days("Newcomer", season[70:90], 7),
+    ], ignore_index=True)
+    full_days = pd.concat([old, added], ignore_index=True)
+
+    previous = compute_workload(daily_loads(old))
+    start = added["date"].min()
+    recent = full_days[full_days["player"].isin(added["player"].unique()) & (full_days["date"] >= start)]
+    table, rows = refresh_workload(previous, recent, start)
+
+    full = compute_workload(daily_loads(full_days))
+    assert list(table.columns) == list(full.columns)
+    assert table[["player", "date"]].equals(full[["player", "date"]])
+    values = [c for c in full.columns if c not in ("player", "date")]
+    np.testing.assert_allclose(
+        table[values].to_numpy(dtype=float), full[values].to_numpy(dtype=float), rtol=1e-5, equal_nan=True
+    )
+    # Only the affected players' days are recomputed
+    assert set(rows["player"]) == {"Steady", "Gap", "Newcomer"}
@@ -1,7 +1,9 @@
 # app/utils/filters.py
 import streamlit as st
 import pandas as pd
-from analysis.data_loader import load_calendar_data
+from analysis import artifacts
+from analysis.data_store import get_data_store
+from analysis.importance import BOOTSTRAP_CI, BOOTSTRAP_RESAMPLES
 
 
 
@@ -10,8 +12,7 @@ def player_filter():
     Displays a sidebar multiselect for player names based on the calendar CSV.
     Returns the list of selected players and stores the selection in session state.
     """
-    df = load_calendar_data()
-    players = sorted(df["player"].dropna().unique())
+    players = get_data_store().players("calendar")
     
     # Initialize session state if not present
     if 'selected_players' not in st.session_state:
@@ -27,3 +28,44 @@ def player_filter():
     # Persist the selection in session state
     st.session_state['selected_players'] = selected
     return selected
+
+
+def importance_mode_filter():
+    """
+    Sidebar choice between the fast (time-budgeted) and exact feature-importance
+    models. Returns the mode name for the radar charts ("fast" or "exact").
+    """
+    choice = st.sidebar.radio(
+        "Feature Importance",
+        options=["Fast", "Exact"],
+        key="importance_mode",
+        help="Fast: shallow, subsampled trees within a time budget. Exact: the full random forest.",
+    )
+    return choice.lower()
+
+
+def importance_interval_filter():
+    """
+    Sidebar toggle for bootstrap intervals on the importance radars. Returns True to
+    show the mean and interval of repeated refits (analysis.importance) instead of one fit.
+    """
+    return st.sidebar.checkbox(
+        "Importance intervals",
+        key="importance_intervals",
+        help=f"Refits each radar's model on {BOOTSTRAP_RESAMPLES} bootstrap resamples and shows "
+             f"the {BOOTSTRAP_CI:.0%} interval. Slower on first view; cached afterwards.",
+    )
+
+
+def artifact_source():
+    """
+    In artifact mode (VIZATHON_ARTIFACTS=1), the published precompute run the page
+    reads from, noted in the sidebar. Returns None when the page computes live.
+    """
+    run = artifacts.serving_run()
+    if run is not None:
+        st.sidebar.caption(f"Precomputed run {run.run_id} ({run.created})")
+    elif artifacts.is_enabled():
+        st.sidebar.warning("No precomputed artifacts published yet; computing live. "
+                           "Run `python -m analysis.precompute` from app/.")
+    return run
@@ -0,0 +1,69 @@
+# app/utils/lru.py
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe mapping that keeps its most recently used entries. Past `max_size`
+    entries, or past `max_weight` total `weigh(value)`, the least recently used are
+    evicted first; a value weighing more than `max_weight` on its own is not kept.
+    Values are computed outside the lock, so two sessions missing the same key at
+    once may both compute it; the later put() wins.
+    """
+
+    def __init__(self, max_size: int = None, max_weight: int = None, weigh=None):
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self._weigh = weigh
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """The value under `key`, now the most recently used, or `default`."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        weight = self._weigh(value) if self._weigh is not None else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = value
+            self._weight += weight
+            while (self.max_size is not None and len(self._entries) > self.max_size) or (
+                self.max_weight is not None and self._weight > self.max_weight
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def get_or_create(self, key, create):
+        """The value under `key`, or the one `create()` returns, kept under `key`."""
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def discard(self, predicate=None):
+        """Drops every entry whose key satisfies `predicate` (all entries without one)."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate is None or predicate(k)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        value = self._entries.pop(key)
+        if self._weigh is not None:
+            self._weight -= self._weigh(value)
@@ -0,0 +1,62 @@
+# app/utils/tabs.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import streamlit as st
+
+from charts.figure_cache import current_scope
+
+# Warm-ups of the tabs next to the open one run here, one at a time, shared by every session
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tab-prefetch")
+_in_flight = {}  # (tabs key, label, figure scope hash) -> Future
+_in_flight_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+def _prefetch(key: tuple, warm):
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        if future is not None and not future.done():
+            return future
+        # Warm-ups for other data versions or filters are either running or stale
+        for stale in [k for k, f in _in_flight.items() if f.done()]:
+            del _in_flight[stale]
+        future = _prefetch_pool.submit(warm)
+        _in_flight[key] = future
+
+    def _done(done):
+        if not done.cancelled() and done.exception() is not None:
+            _log.warning("Prefetch of tab %r failed", key[1], exc_info=done.exception())
+
+    future.add_done_callback(_done)
+    return future
+
+
+def lazy_tabs(key: str, tabs: dict, prefetch: dict = None):
+    """
+    Draws `tabs` (label -> render function) with st.tabs, running only the render of the
+    open tab; switching tabs reruns the page. Called inside a figure_scope(), the open
+    tab's charts re-emit their cached figures while data and filters are unchanged.
+    Once that tab has rendered, the `prefetch` functions (label -> warm function) of the
+    tabs either side of it start in the background to fill the caches those tabs read
+    (model fits, trendlines, moments), so switching to them doesn't wait on the compute.
+    A warm-up is skipped only while one for the same tab and active figure_scope() (data
+    versions and filters) is running.
+    Warm functions run outside the script and must not call Streamlit.
+    """
+    labels = list(tabs)
+    containers = st.tabs(labels, key=key, on_change="rerun")
+    current = 0
+    for i, (container, render) in enumerate(zip(containers, tabs.values())):
+        if container.open:
+            current = i
+            with container:
+                render()
+
+    prefetch = prefetch or {}
+    scope = joblib.hash(current_scope())
+    for i in (current + 1, current - 1):
+        if 0 <= i < len(labels) and labels[i] in prefetch:
+            _prefetch((key, labels[i], scope), prefetch[labels[i]])
@@ -1,6 +1,9 @@
 # app/utils/ui_styling.py
 import streamlit as st
-st.set_page_config(layout="wide")
+from analysis.training import in_training_worker
+
+if not in_training_worker():
+    st.set_page_config(layout="wide")
 
 import os
 
@@ -12,6 +15,8 @@ def load_local_css(filename: str = "custom.css"):
     Loads the custom CSS file into the Streamlit app.
     Default path assumes static files are under app/static.
     """
+    if in_training_worker():
+        return
     full_path = os.path.join(STATIC_DIR, filename)
     try:
         with open(full_path, encoding="utf-8") as f:
@@ -2,16 +2,13 @@
 
 import streamlit as st
 import os
-import pandas as pd
 import plotly.express as px
 from utils.ui_styling import load_local_css
-from analysis.data_loader import (
-    load_gps_data,
-    load_recovery_data,
-    load_capability_data,
-    load_ipa_data,
-    load_calendar_data
-)
+from analysis.data_store import get_data_store
+from analysis import sql_backend
+from analysis.precompute import home_summaries, latest_acwr_summary
+from utils.filters import artifact_source
+from charts.figure_cache import cached_figure, figure_scope
 
 # Setup static assets
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,81 +25,98 @@ def show_home():
     Below, you’ll find visual summaries and key takeaways across all major datasets.
     """)
 
-    # Load data
-    gps_df = load_gps_data()
-    recovery_df = load_recovery_data()
-    capability_df = load_capability_data()
-    ipa_df = load_ipa_data()
-    calendar_df = load_calendar_data()
-
-    # Merge GPS with calendar for actual training load
-    gps_df["date"] = pd.to_datetime(gps_df["date"])
-    calendar_df["event_date"] = pd.to_datetime(calendar_df["event_date"])
-    merged_gps = pd.merge(
-        gps_df,
-        calendar_df[["player", "event_date", "training_load"]],
-        left_on=["player", "date"],
-        right_on=["player", "event_date"],
-        how="left"
+    # Summaries
+    run = artifact_source()
+    store = get_data_store()
+    if run is not None:
+        # Read from the last precompute run (python -m analysis.precompute)
+        summaries = run.summaries()
+    elif sql_backend.is_enabled():
+        # Aggregated in the embedded database
+        summaries = {
+            "gps": sql_backend.training_load_means().set_index("player")["training_load"].head(),
+            "recovery": sql_backend.player_means("recovery", "emboss_baseline_score").set_index("player")["emboss_baseline_score"].head(),
+            "capability": sql_backend.player_means("capability", "BenchmarkPct").set_index("player")["BenchmarkPct"].head(),
+            "ipa": sql_backend.achievement_rates().set_index("player")["achievement_rate"].head(),
+            # Latest acute:chronic ratio per player (rolling workload, updated incrementally)
+            "acwr": latest_acwr_summary(store),
+        }
+    else:
+        # Load data (shared across sessions; reloaded only when a CSV changes).
+        # All five are read concurrently before the first one is used.
+        timings = store.preload()
+        st.sidebar.caption("Data load: " + ", ".join(f"{name} {secs * 1000:.0f} ms" for name, secs in timings.items()))
+        summaries = home_summaries(store)
+    gps_summary, recovery_summary, capability_summary, ipa_summary, acwr_summary = (
+        summaries[name] for name in ("gps", "recovery", "capability", "ipa", "acwr")
     )
 
-    # Summaries
-    gps_summary = merged_gps.groupby("player")["training_load"].mean().sort_values(ascending=False).head()
-    recovery_summary = recovery_df.groupby("player")["emboss_baseline_score"].mean().sort_values(ascending=False).head()
-    capability_summary = capability_df.groupby("player")["BenchmarkPct"].mean().sort_values(ascending=False).head()
-    ipa_summary = ipa_df.groupby("player")["tracking_status"].apply(
-        lambda x: (x == "Achieved").sum() / len(x)
-    ).sort_values(ascending=False).head()
+    # Each chart is re-emitted from the figure cache while its summary is unchanged
+    with figure_scope():
+        # Tabs for each dataset
+        tab1, tab2, tab3, tab4 = st.tabs([
+            "🛰️ GPS Insights", "🛌 Recovery", "🏋️ Capability", "📌 IPA Goals"
+        ])
 
-    # Tabs for each dataset
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "🛰️ GPS Insights", "🛌 Recovery", "🏋️ Capability", "📌 IPA Goals"
-    ])
+        with tab1:
+            st.subheader("🛰️ Training Load Analysis")
+            st.markdown("""
+            - High-speed runs and HR Zone 5 minutes correlate with training load.
+            - Based on calendar data, **Callum Hudson-Odoi** and **Emerson Palmieri** logged the highest average loads.
+            """)
+            fig = cached_figure("home.gps", lambda: px.bar(
+                gps_summary, x=gps_summary.index, y=gps_summary.values,
+                labels={"x": "Player", "y": "Avg. Training Load"},
+                title="Top 5 Players by Avg. Training Load"
+            ), gps_summary)
+            st.plotly_chart(fig, use_container_width=True)
 
-    with tab1:
-        st.subheader("🛰️ Training Load Analysis")
-        st.markdown("""
-        - High-speed runs and HR Zone 5 minutes correlate with training load.
-        - Based on calendar data, **Callum Hudson-Odoi** and **Emerson Palmieri** logged the highest average loads.
-        """)
-        fig = px.bar(gps_summary, x=gps_summary.index, y=gps_summary.values,
-                     labels={"x": "Player", "y": "Avg. Training Load"},
-                     title="Top 5 Players by Avg. Training Load")
-        st.plotly_chart(fig, use_container_width=True)
+            fig = cached_figure("home.acwr", lambda: px.bar(
+                acwr_summary, x=acwr_summary.index, y=acwr_summary.values,
+                labels={"x": "Player", "y": "ACWR"},
+                title="Highest Acute:Chronic Training Load Ratios (latest day)"
+            ), acwr_summary)
+            st.plotly_chart(fig, use_container_width=True)
 
-    with tab2:
-        st.subheader("🛌 Recovery & Readiness")
-        st.markdown("""
-        - **Sleep completeness** and **subjective wellness** are the best predictors of `emboss_baseline_score`.
-        - **César Azpilicueta** consistently ranks among the top in recovery readiness.
-        """)
-        fig = px.bar(recovery_summary, x=recovery_summary.index, y=recovery_summary.values,
-                     labels={"x": "Player", "y": "Recovery Score"},
-                     title="Top 5 Players by Emboss Baseline Score")
-        st.plotly_chart(fig, use_container_width=True)
+        with tab2:
+            st.subheader("🛌 Recovery & Readiness")
+            st.markdown("""
+            - **Sleep completeness** and **subjective wellness** are the best predictors of `emboss_baseline_score`.
+            - **César Azpilicueta** consistently ranks among the top in recovery readiness.
+            """)
+            fig = cached_figure("home.recovery", lambda: px.bar(
+                recovery_summary, x=recovery_summary.index, y=recovery_summary.values,
+                labels={"x": "Player", "y": "Recovery Score"},
+                title="Top 5 Players by Emboss Baseline Score"
+            ), recovery_summary)
+            st.plotly_chart(fig, use_container_width=True)
 
-    with tab3:
-        st.subheader("🏋️ Physical Capability")
-        st.markdown("""
-        - Capability performance depends on **movement**, **quality**, **expression**, and **matchday timing**.
-        - **Ben Chilwell** leads in Sprint and Upper Body benchmarks.
-        """)
-        fig = px.bar(capability_summary, x=capability_summary.index, y=capability_summary.values,
-                     labels={"x": "Player", "y": "Benchmark %"},
-                     title="Top 5 Players by Physical Capability (BenchmarkPct)")
-        st.plotly_chart(fig, use_container_width=True)
+        with tab3:
+            st.subheader("🏋️ Physical Capability")
+            st.markdown("""
+            - Capability performance depends on **movement**, **quality**, **expression**, and **matchday timing**.
+            - **Ben Chilwell** leads in Sprint and Upper Body benchmarks.
+            """)
+            fig = cached_figure("home.capability", lambda: px.bar(
+                capability_summary, x=capability_summary.index, y=capability_summary.values,
+                labels={"x": "Player", "y": "Benchmark %"},
+                title="Top 5 Players by Physical Capability (BenchmarkPct)"
+            ), capability_summary)
+            st.plotly_chart(fig, use_container_width=True)
 
-    with tab4:
-        st.subheader("📌 Individual Priority Areas (IPA)")
-        st.markdown("""
-        - Goals like **Fitness**, **Strength**, and **Speed** are frequently achieved.
-        - Tactical and mindset areas show higher risk.
-        - **Andreas Christensen** has the highest goal achievement rate overall.
-        """)
-        fig = px.bar(ipa_summary, x=ipa_summary.index, y=ipa_summary.values,
-                     labels={"x": "Player", "y": "Achievement Rate"},
-                     title="Top 5 Players by IPA Goal Achievement Rate")
-        st.plotly_chart(fig, use_container_width=True)
+        with tab4:
+            st.subheader("📌 Individual Priority Areas (IPA)")
+            st.markdown("""
+            - Goals like **Fitness**, **Strength**, and **Speed** are frequently achieved.
+            - Tactical and mindset areas show higher risk.
+            - **Andreas Christensen** has the highest goal achievement rate overall.
+            """)
+            fig = cached_figure("home.ipa", lambda: px.bar(
+                ipa_summary, x=ipa_summary.index, y=ipa_summary.values,
+                labels={"x": "Player", "y": "Achievement Rate"},
+                title="Top 5 Players by IPA Goal Achievement Rate"
+            ), ipa_summary)
+            st.plotly_chart(fig, use_container_width=True)
 
 def main():
     load_local_css()